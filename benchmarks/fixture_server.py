@@ -0,0 +1,175 @@
+"""bioRxiv/medRxiv API与PDF下载的本地HTTP模拟服务器
+
+- /details/{server}/{start}/{end}/{cursor} 返回与api.biorxiv.org格式一致的分页JSON
+- /content/{doi}.full.pdf 返回合成PDF，支持Range请求以测试断点续传
+论文数据由固定种子生成，部分论文包含关键词以通过KEYWORD_FILTER，
+medRxiv中可按比例重复bioRxiv的论文以测试跨来源去重。
+"""
+import re
+import json
+import time
+import random
+import threading
+from datetime import datetime
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.synthetic_pdf import build_pdf
+
+_DETAILS_PATTERN = re.compile(r'^/details/(?P<server>biorxiv|medrxiv)/[^/]+/[^/]+/(?P<cursor>\d+)')
+_PDF_PATTERN = re.compile(r'^/content/(?P<doi>.+)\.full\.pdf$')
+
+_TOPIC_WORDS = ["pathology", "histology", "microscopy", "biopsy", "tissue"]
+_FILLER_WORDS = (
+    "deep learning model cohort analysis cell signal network prediction dataset clinical "
+    "spatial imaging patient outcome representation benchmark"
+).split()
+
+
+class FixtureServer:
+    """在后台线程中运行的本地HTTP模拟服务器
+
+    参数:
+        papers_per_server (int): 每个平台的论文总数
+        page_size (int): API每页返回的论文数
+        match_ratio (float): 包含过滤关键词的论文比例
+        duplicate_ratio (float): medRxiv中与bioRxiv论文重复的比例
+        pdf_pages (int): 合成PDF的页数
+        latency (float): 每个请求的额外延迟（秒）
+    """
+
+    def __init__(self, papers_per_server=100, page_size=100, match_ratio=0.8, duplicate_ratio=0.1,
+                 pdf_pages=6, latency=0.0, host="127.0.0.1", port=0):
+        self.papers_per_server = papers_per_server
+        self.page_size = page_size
+        self.pdf_pages = pdf_pages
+        self.latency = latency
+        self.collections = self._build_collections(match_ratio, duplicate_ratio)
+        self.stats = {'api_requests': 0, 'pdf_requests': 0, 'range_requests': 0, 'bytes_sent': 0}
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _build_collections(self, match_ratio, duplicate_ratio):
+        """生成两个平台的论文元数据"""
+        rng = random.Random(42)
+        today = datetime.now().strftime("%Y-%m-%d")
+        collections = {}
+        for server in ("biorxiv", "medrxiv"):
+            papers = []
+            for index in range(self.papers_per_server):
+                words = rng.sample(_FILLER_WORDS, 6)
+                if rng.random() < match_ratio:
+                    words.insert(rng.randrange(len(words)), rng.choice(_TOPIC_WORDS))
+                title = f"{' '.join(words).capitalize()} study {server} {index}"
+                abstract = " ".join(rng.choice(_FILLER_WORDS + words) for _ in range(150))
+                papers.append({
+                    "doi": f"10.1101/{today.replace('-', '.')}.{server}.{index:05d}",
+                    "title": title,
+                    "authors": "Zhang, A.; Li, B.; Wang, C.",
+                    "date": today,
+                    "version": "1",
+                    "category": "pathology",
+                    "abstract": abstract,
+                    "server": server
+                })
+            collections[server] = papers
+
+        # 部分medRxiv论文与bioRxiv论文为同一项工作
+        duplicates = int(self.papers_per_server * duplicate_ratio)
+        for index in range(duplicates):
+            source = collections["biorxiv"][index]
+            collections["medrxiv"][index].update(title=source["title"], abstract=source["abstract"])
+        return collections
+
+    def _record(self, **values):
+        with self._stats_lock:
+            for key, value in values.items():
+                self.stats[key] += value
+
+    def _details(self, server, cursor):
+        collection = self.collections[server]
+        page = collection[cursor:cursor + self.page_size]
+        return {
+            "messages": [{
+                "status": "ok",
+                "cursor": cursor,
+                "count": len(page),
+                "total": len(collection)
+            }],
+            "collection": page
+        }
+
+    def _handler_class(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type, extra_headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                fixture._record(bytes_sent=len(body))
+
+            def do_GET(self):
+                if fixture.latency:
+                    time.sleep(fixture.latency)
+
+                match = _DETAILS_PATTERN.match(self.path)
+                if match:
+                    fixture._record(api_requests=1)
+                    body = json.dumps(fixture._details(match.group("server"), int(match.group("cursor"))))
+                    self._send(200, body.encode(), "application/json")
+                    return
+
+                match = _PDF_PATTERN.match(self.path)
+                if match:
+                    fixture._record(pdf_requests=1)
+                    pdf = _cached_pdf(match.group("doi"), fixture.pdf_pages)
+                    range_header = self.headers.get("Range", "")
+                    range_match = re.match(r'bytes=(\d+)-', range_header)
+                    if range_match:
+                        fixture._record(range_requests=1)
+                        offset = int(range_match.group(1))
+                        if offset >= len(pdf):
+                            self._send(416, b"", "application/pdf")
+                            return
+                        self._send(206, pdf[offset:], "application/pdf",
+                                   {"Content-Range": f"bytes {offset}-{len(pdf) - 1}/{len(pdf)}"})
+                        return
+                    self._send(200, pdf, "application/pdf")
+                    return
+
+                self._send(404, b"not found", "text/plain")
+
+        return Handler
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@lru_cache(maxsize=1024)
+def _cached_pdf(doi, pages):
+    """按DOI生成（并缓存）合成PDF，同一DOI的内容保持一致"""
+    return build_pdf(f"Synthetic study {doi}", seed=sum(map(ord, doi)), pages=pages)
@@ -0,0 +1,236 @@
+"""讯飞星火WebSocket协议的本地模拟服务器
+
+只使用标准库实现RFC 6455的握手与帧收发，按星火协议以多个数据帧流式返回结果：
+- 批量分诊请求（包含"[论文 N]"）返回逐篇的JSON评估列表
+- 单篇价值评估请求返回带有评分和结论的文本
+- 其他请求返回与max_tokens相当长度的填充文本
+首帧延迟、分块大小和分块间隔可配置，用于模拟不同的模型响应速度。
+"""
+import re
+import json
+import time
+import base64
+import struct
+import hashlib
+import threading
+import socketserver
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_PAPER_MARKER = re.compile(r'\[论文 (\d+)\]')
+
+_OPCODE_CONTINUATION = 0x0
+_OPCODE_TEXT = 0x1
+_OPCODE_CLOSE = 0x8
+_OPCODE_PING = 0x9
+_OPCODE_PONG = 0xA
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        data += chunk
+    return bytes(data)
+
+
+def _read_frame(sock):
+    """读取一个WebSocket帧，返回 (fin, opcode, payload)"""
+    first, second = _recv_exact(sock, 2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    masked = bool(second & 0x80)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", _recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", _recv_exact(sock, 8))[0]
+    mask = _recv_exact(sock, 4) if masked else None
+    payload = _recv_exact(sock, length)
+    if mask and payload:
+        repeated = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+    return fin, opcode, payload
+
+
+def _send_frame(sock, opcode, payload):
+    """发送一个不带掩码的服务端帧"""
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 65536:
+        header.append(126)
+        header += struct.pack(">H", length)
+    else:
+        header.append(127)
+        header += struct.pack(">Q", length)
+    sock.sendall(bytes(header) + payload)
+
+
+class MockSparkServer:
+    """在后台线程中运行的星火模拟服务器
+
+    参数:
+        latency (float): 收到请求到返回首帧的延迟（秒）
+        chunk_size (int): 每个数据帧包含的字符数
+        chunk_delay (float): 相邻数据帧之间的间隔（秒）
+        close_after_response (bool): 是否在每次响应后关闭连接（与线上服务一致时设为True）
+        reject_every (int): 每隔多少篇论文给出一次"价值有限"的结论，0表示全部通过
+    """
+
+    def __init__(self, latency=0.2, chunk_size=40, chunk_delay=0.01, close_after_response=False,
+                 reject_every=5, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay = chunk_delay
+        self.close_after_response = close_after_response
+        self.reject_every = reject_every
+        self.stats = {'connections': 0, 'requests': 0}
+        self._stats_lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"ws://{host}:{port}/v4.0/chat"
+
+    def _record(self, **values):
+        with self._stats_lock:
+            for key, value in values.items():
+                self.stats[key] += value
+
+    def _is_valuable(self, prompt, number=0):
+        if not self.reject_every:
+            return True
+        digest = hashlib.md5(f"{prompt[:200]}{number}".encode()).digest()
+        return digest[0] % self.reject_every != 0
+
+    def respond(self, prompt, max_tokens):
+        """根据提示词类型生成完整的回复文本"""
+        numbers = _PAPER_MARKER.findall(prompt)
+        if numbers:
+            entries = []
+            for number in numbers:
+                sections = prompt.split(f"[论文 {number}]", 1)[1][:300]
+                valuable = self._is_valuable(sections, number)
+                entries.append({
+                    "id": int(number),
+                    "score": 7 if valuable else 3,
+                    "valuable": valuable,
+                    "reason": "方法新颖，结果可靠" if valuable else "创新性不足"
+                })
+            return json.dumps(entries, ensure_ascii=False)
+
+        if "研究价值" in prompt:
+            if self._is_valuable(prompt):
+                return "总体评分: 7/10\n结论: 有价值\n理由: 方法新颖，结果可靠。"
+            return "总体评分: 3/10\n结论: 价值有限\n理由: 创新性不足。"
+
+        filler = "本研究提出了一种新的组织病理图像分析方法，在多个数据集上取得了稳定的结果。"
+        length = min(max_tokens, 400)
+        return (filler * (length // len(filler) + 1))[:length]
+
+    def _stream(self, sock, request):
+        """按星火协议分块发送回复"""
+        parameter = request.get("parameter", {}).get("chat", {})
+        messages = request.get("payload", {}).get("message", {}).get("text", [])
+        prompt = messages[-1]["content"] if messages else ""
+        text = self.respond(prompt, parameter.get("max_tokens", 1000))
+
+        time.sleep(self.latency)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        for seq, chunk in enumerate(chunks):
+            last = seq == len(chunks) - 1
+            status = 2 if last else (0 if seq == 0 else 1)
+            payload = {
+                "choices": {
+                    "status": status,
+                    "seq": seq,
+                    "text": [{"content": chunk, "role": "assistant", "index": 0}]
+                }
+            }
+            if last:
+                prompt_tokens = len(prompt) // 2
+                completion_tokens = len(text) // 2
+                payload["usage"] = {"text": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }}
+            message = {"header": {"code": 0, "message": "Success", "sid": "mock", "status": status},
+                       "payload": payload}
+            _send_frame(sock, _OPCODE_TEXT, json.dumps(message, ensure_ascii=False).encode())
+            if not last and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def _handshake(self):
+                data = b""
+                while b"\r\n\r\n" not in data:
+                    chunk = self.request.recv(4096)
+                    if not chunk:
+                        return False
+                    data += chunk
+                headers = {}
+                for line in data.split(b"\r\n")[1:]:
+                    if b":" in line:
+                        name, value = line.split(b":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                key = headers.get(b"sec-websocket-key")
+                if not key:
+                    return False
+                accept = base64.b64encode(hashlib.sha1(key + _WEBSOCKET_GUID.encode()).digest())
+                self.request.sendall(
+                    b"HTTP/1.1 101 Switching Protocols\r\n"
+                    b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                    b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+                )
+                return True
+
+            def handle(self):
+                if not self._handshake():
+                    return
+                server._record(connections=1)
+                message = b""
+                try:
+                    while True:
+                        fin, opcode, payload = _read_frame(self.request)
+                        if opcode == _OPCODE_CLOSE:
+                            _send_frame(self.request, _OPCODE_CLOSE, payload[:2])
+                            return
+                        if opcode == _OPCODE_PING:
+                            _send_frame(self.request, _OPCODE_PONG, payload)
+                            continue
+                        if opcode not in (_OPCODE_TEXT, _OPCODE_CONTINUATION):
+                            continue
+                        message += payload
+                        if not fin:
+                            continue
+
+                        server._record(requests=1)
+                        server._stream(self.request, json.loads(message.decode()))
+                        message = b""
+                        if server.close_after_response:
+                            _send_frame(self.request, _OPCODE_CLOSE, struct.pack(">H", 1000))
+                            return
+                except (ConnectionError, OSError):
+                    return
+
+        return Handler
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,203 @@
+"""离线端到端流水线基准测试
+
+启动本地星火模拟服务器和bioRxiv/medRxiv模拟服务器，把配置中的接口地址和存储路径
+指向它们和临时目录，然后完整执行一次run_pipeline，报告：
+- 吞吐量（完成发布的论文数/分钟）
+- 各阶段耗时的分位数（p50/p90/p99）
+- 主进程与子进程的峰值内存（RSS）
+
+用法（在仓库根目录执行）:
+    python -m benchmarks.run_benchmark --papers 100 --llm-latency 0.2 --output report.json
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+from functools import wraps
+
+import config
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.mock_spark_server import MockSparkServer
+from utils.metrics import _percentile
+
+
+class StageRecorder:
+    """通过包装类方法记录各阶段每次调用的耗时"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._patched = []
+
+    def wrap(self, owner, method_name, stage):
+        original = getattr(owner, method_name)
+        recorder = self
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                with recorder._lock:
+                    recorder.samples.setdefault(stage, []).append(time.perf_counter() - start)
+
+        setattr(owner, method_name, timed)
+        self._patched.append((owner, method_name, original))
+
+    def restore(self):
+        for owner, method_name, original in reversed(self._patched):
+            setattr(owner, method_name, original)
+        self._patched = []
+
+    def report(self):
+        """返回各阶段的调用次数、平均值和分位数（毫秒）"""
+        return {stage: summarize(samples) for stage, samples in sorted(self.samples.items())}
+
+
+def summarize(samples):
+    values = sorted(samples)
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        'p50_ms': round(_percentile(values, 0.50) * 1000, 2),
+        'p90_ms': round(_percentile(values, 0.90) * 1000, 2),
+        'p99_ms': round(_percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0
+    }
+
+
+def peak_rss_mb():
+    """主进程和已结束子进程的峰值RSS（MB），Linux上ru_maxrss单位为KB"""
+    scale = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+    return {
+        'main': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def apply_overrides(workdir, fixture_url, spark_url, papers):
+    """把配置指向模拟服务器和临时目录
+
+    必须在导入流水线模块之前调用，各模块在导入时读取配置。
+    """
+    config.XUNFEI_URL = spark_url
+    config.BIORXIV_BASE_URL = fixture_url
+    config.MEDRXIV_BASE_URL = fixture_url
+    config.BIORXIV_API_URL = fixture_url
+    config.FETCH_SOURCES = ["biorxiv", "medrxiv"]
+    config.MAX_RESULTS = papers
+    config.PDF_STORAGE_PATH = os.path.join(workdir, "papers")
+    config.SUMMARY_STORAGE_PATH = os.path.join(workdir, "summaries")
+    config.SOCIAL_POST_PATH = os.path.join(workdir, "social_posts")
+    config.PAPER_INDEX_PATH = os.path.join(workdir, "summaries", "paper_index.sqlite3")
+    config.IMAGE_STORE = dict(config.IMAGE_STORE, root=os.path.join(workdir, "papers", "images"))
+    config.STORAGE = dict(config.STORAGE, db_path=os.path.join(workdir, "summaries", "storage.sqlite3"))
+    config.LLM_CACHE = dict(config.LLM_CACHE, path=os.path.join(workdir, "summaries", "llm_cache.sqlite3"))
+    config.METRICS = dict(config.METRICS, report_dir=os.path.join(workdir, "summaries", "run_reports"))
+    # 基准测试不等待人工审核
+    config.REVIEW = dict(config.REVIEW, auto_approve=True,
+                         db_path=os.path.join(workdir, "summaries", "review_queue.sqlite3"))
+    for path in (config.PDF_STORAGE_PATH, config.SUMMARY_STORAGE_PATH, config.SOCIAL_POST_PATH):
+        os.makedirs(path, exist_ok=True)
+
+
+def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    fixture = FixtureServer(papers_per_server=args.papers, pdf_pages=args.pdf_pages,
+                            latency=args.http_latency).start()
+    spark = MockSparkServer(latency=args.llm_latency, chunk_size=args.chunk_size,
+                            chunk_delay=args.chunk_delay,
+                            close_after_response=args.close_after_response).start()
+    apply_overrides(workdir, fixture.url, spark.url, args.papers)
+
+    # 配置生效后再导入流水线模块
+    import main
+    from scrapers.fetch_coordinator import FetchCoordinator
+    from processors.pdf_processor import PDFProcessor
+    from processors.pipeline_executor import StagedExecutor
+    from processors.llm_processor import LLMProcessor
+    from generators.summary_generator import SummaryGenerator
+    from generators.social_post_generator import SocialPostGenerator
+    from utils.paper_index import PaperIndex
+    from utils.metrics import get_metrics
+
+    recorder = StageRecorder()
+    recorder.wrap(FetchCoordinator, "fetch_all", "fetch")
+    recorder.wrap(StagedExecutor, "triage", "triage")
+    recorder.wrap(SummaryGenerator, "evaluate_papers", "triage_batch")
+    recorder.wrap(PDFProcessor, "download_pdf", "download")
+    recorder.wrap(StagedExecutor, "prepare", "prepare")
+    recorder.wrap(SummaryGenerator, "generate_summary", "summary")
+    recorder.wrap(SocialPostGenerator, "generate_post", "social_post")
+    recorder.wrap(LLMProcessor, "process_text", "llm_request")
+
+    start = time.perf_counter()
+    try:
+        main.run_pipeline(args.workers)
+    finally:
+        elapsed = time.perf_counter() - start
+        recorder.restore()
+        spark.stop()
+        fixture.stop()
+
+    stages = PaperIndex(config.PAPER_INDEX_PATH).count_by_stage()
+    posted = stages.get("posted", 0)
+    report = {
+        'parameters': vars(args),
+        'elapsed_seconds': round(elapsed, 2),
+        'papers_posted': posted,
+        'papers_per_minute': round(posted / elapsed * 60, 2) if elapsed else 0.0,
+        'index_stages': stages,
+        'stages': recorder.report(),
+        'metrics': get_metrics().get_report(),
+        'peak_rss_mb': peak_rss_mb(),
+        'llm_server': dict(spark.stats),
+        'http_server': dict(fixture.stats)
+    }
+
+    if args.keep_workdir:
+        report['workdir'] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_report(report):
+    print("\n===== 基准测试结果 =====")
+    print(f"耗时: {report['elapsed_seconds']} 秒, 完成 {report['papers_posted']} 篇, "
+          f"吞吐量: {report['papers_per_minute']} 篇/分钟")
+    print(f"峰值内存: 主进程 {report['peak_rss_mb']['main']} MB, 子进程 {report['peak_rss_mb']['children']} MB")
+    print(f"{'阶段':<14}{'次数':>6}{'平均(ms)':>12}{'p50':>10}{'p90':>10}{'p99':>10}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<14}{stats['count']:>6}{stats['mean_ms']:>12}{stats['p50_ms']:>10}"
+              f"{stats['p90_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="离线端到端流水线基准测试")
+    parser.add_argument("--papers", type=int, default=50, help="每个模拟平台的论文数")
+    parser.add_argument("--workers", type=int, default=None, help="流水线并发数，默认读取PIPELINE_WORKERS")
+    parser.add_argument("--pdf-pages", type=int, default=6, help="合成PDF的页数")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="模拟HTTP请求延迟（秒）")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="模拟LLM首帧延迟（秒）")
+    parser.add_argument("--chunk-size", type=int, default=40, help="LLM每个数据帧的字符数")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="LLM数据帧间隔（秒）")
+    parser.add_argument("--close-after-response", action="store_true", help="每次响应后关闭WebSocket连接")
+    parser.add_argument("--keep-workdir", action="store_true", help="保留临时工作目录")
+    parser.add_argument("--output", help="将报告写入JSON文件")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"报告已保存到 {args.output}")
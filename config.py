@@ -51,6 +51,20 @@ SOCIAL_POST_PATH = "./social_posts"
 SUMMARY_MAX_TOKENS = 500
 SOCIAL_POST_MAX_TOKENS = 300
 
+# 标题卡片配置
+TITLE_CARD = {
+    # 候选中文字体路径，按顺序使用第一个可用的字体，都不可用时使用Pillow默认字体
+    "font_paths": [
+        "C:/Windows/Fonts/msyh.ttc",  # 微软雅黑
+        "C:/Windows/Fonts/simhei.ttf",  # 黑体
+        "/System/Library/Fonts/PingFang.ttc",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc"
+    ],
+    # 批量渲染时每个进程任务包含的卡片数
+    "chunk_size": 8
+}
+
 # 社交媒体配置
 ENABLE_TWITTER = False
 TWITTER_API_KEY = ""
@@ -60,10 +74,24 @@ TWITTER_ACCESS_SECRET = ""
 
 # 运行频率 (小时)
 UPDATE_FREQUENCY = 24
-# 论文搜索时间范围（单位：天）
+# 论文搜索时间范围（单位：天），也是来源第一次运行时向前回溯的天数，之后按高水位线增量获取
 PAPER_SEARCH_DAYS = 3
 
-# 是否在控制台显示图像预览
+# 调度器配置
+SCHEDULER = {
+    # 各来源高水位线（上一次成功获取的时间点）的存储路径
+    "state_path": "./summaries/scheduler_state.sqlite3",
+    # 运行锁文件，防止守护进程和手动运行同时执行
+    "lock_path": "./summaries/pipeline.lock",
+    # 单次运行的最大时间窗口（天），停机后的缺口按此拆分为多次运行补抓
+    "max_window_days": 3,
+    # 最多补抓的天数，更早的缺口将被放弃
+    "max_catch_up_days": 30,
+    # 窗口起点向前重叠的小时数，覆盖平台延迟入库的论文（重复论文由论文索引过滤）
+    "overlap_hours": 6
+}
+
+# review.py show 查看论文时是否弹出缩略图预览窗口
 SHOW_IMAGE_PREVIEW = False
 
 
@@ -88,4 +116,183 @@ KEYWORD_FILTER = {
     "match_fields": "all",
     # 最小匹配分数 (0-100) - 用于相关性排序，分数越高表示越相关
     "min_score": 10
-}
\ No newline at end of file
+}
+
+# 并发处理配置
+# 下载与LLM调用的线程数，PDF解析与渲染的进程数不超过该值和CPU核数
+PIPELINE_WORKERS = 4
+
+# 论文来源配置
+# 启用的来源，将并行获取: "arxiv", "biorxiv", "medrxiv", "manual"(MANUAL_PDF_LINKS)
+FETCH_SOURCES = ["arxiv", "biorxiv", "medrxiv", "manual"]
+# 单个来源的最长等待时间（秒），超时的来源将被跳过，不影响其他来源
+FETCH_SOURCE_TIMEOUT = 300
+
+# bioRxiv/medRxiv API分页的最大并发请求数
+API_MAX_IN_FLIGHT = 4
+
+# 预印本平台地址（基准测试时指向本地模拟服务器）
+BIORXIV_BASE_URL = "https://www.biorxiv.org"
+MEDRXIV_BASE_URL = "https://www.medrxiv.org"
+# bioRxiv与medRxiv共用的API地址
+BIORXIV_API_URL = "https://api.biorxiv.org"
+
+# LLM连接池配置
+# 保持预热的讯飞星火WebSocket连接数，也是并发请求上限
+LLM_POOL_SIZE = 4
+# 鉴权签名的复用时长（秒），需小于服务端允许的5分钟时钟偏差
+LLM_SIGNATURE_TTL = 240
+# 空闲连接的最长保留时间（秒），超时后重新建立
+LLM_CONNECTION_MAX_IDLE = 30
+
+# LLM响应缓存配置
+LLM_CACHE = {
+    # 是否启用缓存，相同的模型、参数和提示词将直接返回缓存结果
+    "enabled": True,
+    # SQLite缓存文件路径
+    "path": "./summaries/llm_cache.sqlite3",
+    # 缓存有效期（天）
+    "ttl_days": 30,
+    # 最大缓存条目数，超出后按最近访问时间淘汰
+    "max_entries": 10000,
+    # 最大缓存容量（MB）
+    "max_size_mb": 200
+}
+
+# PDF页面图像配置（页面在首次访问时才渲染）
+# 页面图像分辨率（DPI），144相当于2倍缩放
+PAGE_IMAGE_DPI = 144
+# 预览缩略图的最大尺寸（宽, 高）
+PAGE_THUMBNAIL_SIZE = (300, 400)
+
+# 页面图像存储配置
+IMAGE_STORE = {
+    # 图像存储目录，图像按内容哈希保存，内容完全相同的页面只保存一份
+    "root": "./papers/images",
+    # 图像清单（SQLite）路径，None表示保存在存储目录下的manifest.sqlite3
+    "manifest_path": None,
+    # 图像格式: "webp"、"jpeg" 或 "png"（无损）
+    "format": "webp",
+    # WebP/JPEG的压缩质量（1-100）
+    "quality": 80,
+    # WebP编码速度与压缩率的权衡（0-6），越大文件越小但编码越慢
+    "webp_method": 2,
+    # 是否生成缩小的预览缩略图，为False时预览直接使用页面图像
+    "thumbnails": True
+}
+
+# PDF文本提取的字符预算，达到后不再解析剩余页面
+PDF_TEXT_MAX_CHARS = 30000
+
+# PDF下载配置
+PDF_DOWNLOAD = {
+    # 每个主机同时进行的最大下载数
+    "per_host_limit": 2,
+    # 连接池大小
+    "pool_size": 10,
+    # 单次请求超时（秒）
+    "timeout": 30,
+    # 失败后的最大重试次数，重试时从已下载的位置续传
+    "max_retries": 3
+}
+
+# 已处理论文索引（SQLite），记录每篇论文到达的处理阶段，避免重复处理
+PAPER_INDEX_PATH = "./summaries/paper_index.sqlite3"
+# 综述索引（SQLite），缓存每篇综述预先渲染的HTML卡片，用于生成日报、周报和月报
+SUMMARY_INDEX_PATH = "./summaries/summary_index.sqlite3"
+
+# 本地存储配额：记录每个PDF、页面图像和综述文件的大小与最近访问时间，超出配额时按LRU淘汰
+STORAGE = {
+    # 存储清单（SQLite）路径
+    "db_path": "./summaries/storage.sqlite3",
+    # 各类文件的配额（MB），None表示不限制
+    "quota_mb": {
+        "pdf": 2048,      # PDF_STORAGE_PATH中下载的PDF
+        "image": 1024,    # 页面图像和缩略图
+        "summary": None   # 综述和评估结果JSON（日报依赖这些文件）
+    },
+    # 超出配额时淘汰到配额的这一比例，避免每次运行都在配额边缘反复淘汰
+    "low_watermark": 0.9,
+    # 同一文件的访问时间最多每隔多少秒写入一次清单
+    "touch_interval": 60
+}
+
+# arXiv API客户端配置（所有查询共用一个客户端）
+ARXIV_CLIENT = {
+    # 每页结果数
+    "page_size": 100,
+    # 连续请求之间的间隔（秒），arXiv要求不低于3秒
+    "delay_seconds": 3,
+    # 请求失败时的重试次数
+    "num_retries": 3,
+    # 单个查询的最大长度，超过时拆分为多个查询
+    "max_query_length": 1000
+}
+
+# 分诊评估的批次大小，论文在下载PDF之前按批次评估价值，一个请求评估一批论文
+TRIAGE_BATCH_SIZE = 10
+# 单个分诊请求提示词的token预算（估计值），超过时拆分为多个批次
+TRIAGE_BATCH_TOKENS = 6000
+# 分诊请求中每篇论文预留的回复token数
+TRIAGE_TOKENS_PER_PAPER = 120
+
+# token估计的校准参数（字符/token），按所用模型的实际计费结果调整
+TOKEN_ESTIMATOR = {
+    # 英文等非中文文本
+    "chars_per_token": 4.0,
+    # 中文文本
+    "cjk_chars_per_token": 1.5
+}
+
+# 综述请求提示词的token预算，论文正文按章节填充剩余预算
+SUMMARY_PROMPT_TOKENS = 4000
+
+# 本地相关性排序配置，用历史评估结果训练，减少交给LLM评估的论文数量
+RELEVANCE_RANKER = {
+    "enabled": True,
+    # 至少需要的通过评估的历史论文数，不足时不启用排序
+    "min_history": 10,
+    # 每次运行交给LLM评估的论文数
+    "top_k": 50,
+    # 得分与第top_k名相差不超过该值的论文视为边界论文，同样交给LLM评估
+    "borderline_margin": 0.05,
+    # BM25参数
+    "k1": 1.5,
+    "b": 0.75
+}
+
+# 跨来源近重复检测配置（MinHash + LSH）
+DEDUP = {
+    # MinHash签名长度
+    "num_perm": 64,
+    # LSH分段数，num_perm必须是其整数倍
+    "bands": 16,
+    # 估计的Jaccard相似度达到该值时视为同一项工作
+    "threshold": 0.7,
+    # 词组长度（单词数）
+    "shingle_size": 3
+}
+
+# 运行指标配置
+METRICS = {
+    # 每次运行结束时写出JSON运行报告的目录
+    "report_dir": "./summaries/run_reports",
+    # Prometheus文本格式文件路径（可供node_exporter的textfile采集器读取），None表示不输出
+    "prometheus_path": None
+}
+
+# 人工审核队列配置
+REVIEW = {
+    # 为True时跳过人工审核，准备好的论文直接进入综述生成（无人值守运行）
+    "auto_approve": False,
+    # 审核队列数据库路径
+    "db_path": "./summaries/review_queue.sqlite3",
+    # 每篇论文预先渲染的审核缩略图页数
+    "thumbnails": 3,
+    # 本次运行提交审核后继续等待审核决定的最长时间（秒），0表示不等待，决定留到下一次运行处理
+    "wait_seconds": 0,
+    # 等待期间轮询审核决定的间隔（秒）
+    "poll_interval": 5,
+    # review.py serve 本地审核网页的端口
+    "web_port": 8765
+}
@@ -2,30 +2,37 @@ import os
 import json
 import random
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
 from config import SOCIAL_POST_PATH, SOCIAL_POST_MAX_TOKENS
 from processors.llm_processor import LLMProcessor
+from generators.title_card import TitleCardRenderer
+from utils.metrics import timed
 
 class SocialPostGenerator:
     def __init__(self):
         self.storage_path = SOCIAL_POST_PATH
         self.llm_processor = LLMProcessor()
         self.max_tokens = SOCIAL_POST_MAX_TOKENS
+        self.card_renderer = TitleCardRenderer(self.storage_path)
     
-    def _select_key_image(self, images):
-        """选择关键主图"""
+    def _select_key_image(self, images, max_pages=3):
+        """选择关键主图
+        
+        页面图像按需渲染，这里只访问前几页，避免为挑选主图而渲染整篇PDF。
+        优先选择第一页（通常包含标题、摘要和主图），跳过图像清单中与其他论文
+        完全相同的页面（期刊封面、许可声明等）。
+        """
         if not images:
             return None
-            
-        # 优先选择第一页的第一张图片（通常是主图）
-        page1_images = [img for img in images if "page_1_" in img]
-        if page1_images:
-            return page1_images[0]
-            
-        # 如果第一页没有图片，选择最大的图片文件（可能是重要图表）
-        return max(images, key=lambda x: os.path.getsize(x))
+        
+        is_shared = getattr(images, "is_shared", None)
+        if is_shared is not None:
+            for index in range(min(max_pages, len(images))):
+                image_path = images[index]
+                if not is_shared(index):
+                    return image_path
+        return images[0]
     
+    @timed("post")
     def generate_post(self, paper, summary, images):
         """生成社交媒体文案"""
         # 构建提示词
@@ -51,23 +58,15 @@ class SocialPostGenerator:
 
         # 生成一张带有论文标题和详细信息的图片
         paper_id = paper['id'].split('/')[-1] if '/' in paper['id'] else paper['id']
-        title_slug = paper['title'][:50].replace(' ', '_').replace('/', '_').replace('\\', '_')
-        title_slug = ''.join(c for c in title_slug if c.isalnum() or c in '_-')  # 只保留字母数字和下划线
-        selected_image = self._create_title_image(paper['title'], paper, f"{paper_id}_{title_slug}")
+        selected_image = self._create_title_image(paper['title'], paper, self._title_card_prefix(paper))
 
         # 选择一张图片（如果有）
         selected_images = [selected_image]
         
         # 选择关键主图
-        if images:
-            # 更新图片选择逻辑，适应新的图片命名格式
-            # 优先选择第一页的图片
-            page1_images = [img for img in images if "figure_1_" in os.path.basename(img)]
-            if page1_images:
-                selected_images.append(page1_images[0])
-            # 如果没有第一页的图片，选择最大的图片
-            elif images:
-                selected_images.append(max(images, key=lambda x: os.path.getsize(x)))
+        key_image = self._select_key_image(images)
+        if key_image:
+            selected_images.append(key_image)
                     
         # 保存文案和图片信息
         file_name = f"{paper_id.replace('.', '_').replace(':', '_')}_post.json"
@@ -92,109 +91,22 @@ class SocialPostGenerator:
         
         return post_data
     
+    def _title_card_prefix(self, paper):
+        """标题卡片文件名前缀：论文ID加标题片段"""
+        paper_id = paper['id'].split('/')[-1] if '/' in paper['id'] else paper['id']
+        title_slug = paper['title'][:50].replace(' ', '_').replace('/', '_').replace('\\', '_')
+        title_slug = ''.join(c for c in title_slug if c.isalnum() or c in '_-')  # 只保留字母数字和下划线
+        return f"{paper_id}_{title_slug}"
+    
+    def prerender_title_cards(self, papers, pool):
+        """把一批论文的标题卡片提交到进程池提前渲染，返回提交的卡片数"""
+        return self.card_renderer.submit_batch(
+            [(paper, self._title_card_prefix(paper)) for paper in papers], pool
+        )
+    
     def _create_title_image(self, title, paper, filename_prefix):
-        """创建一张带有论文标题和详细信息的图片"""
-        # 创建空白图片 - 纵向设计
-        width, height = 800, 1200
-        # 使用纯白背景
-        image = Image.new('RGB', (width, height), color=(255, 255, 255))
-        draw = ImageDraw.Draw(image)
-        
-        try:
-            # 中文字体路径
-            chinese_font_paths = [
-                "C:/Windows/Fonts/msyh.ttc",  # 微软雅黑
-                "C:/Windows/Fonts/simhei.ttf",  # 黑体
-            ]
-            
-            # 加载中文字体
-            for font_path in chinese_font_paths:
-                try:
-                    title_font = ImageFont.truetype(font_path, 48)  # 标题字体稍微小一点，留出空间给其他信息
-                    subtitle_font = ImageFont.truetype(font_path, 36)
-                    info_font = ImageFont.truetype(font_path, 28)  # 信息字体
-                    small_font = ImageFont.truetype(font_path, 24)
-                    print(f"使用中文字体: {font_path}")
-                    break
-                except IOError:
-                    continue
-            
-            if title_font is None:
-                print("使用默认字体")
-                title_font = subtitle_font = info_font = small_font = ImageFont.load_default()
-                
-        except Exception as e:
-            print(f"加载字体出错: {str(e)}")
-            title_font = subtitle_font = info_font = small_font = ImageFont.load_default()
-
-        # 添加标题框
-        title_box_margin = 40
-        title_box = [(title_box_margin, height/5), (width-title_box_margin, height*3/4)]  # 调整标题框位置，留出更多空间
-        draw.rectangle(title_box, outline=(100, 100, 100), width=3)
-        
-        # 绘制标题
-        title_wrapped = textwrap.fill(title, width=25)
-        draw.text((width/2, height/3), title_wrapped, font=title_font, fill=(0, 0, 0), anchor="mm", align="center")
-        
-        # 获取并格式化论文信息
-        authors = "作者: " + ", ".join(paper.get('authors', ['未知']))[:80]
-        if len(paper.get('authors', [])) > 3:
-            authors = "作者: " + ", ".join(paper.get('authors', ['未知'])[:3]) + " 等"
-            
-        source = f"来源: {paper.get('source', '未知')}"
-        
-        # 格式化发布时间
-        published = paper.get('published')
-        if isinstance(published, datetime):
-            published_str = f"发布时间: {published.strftime('%Y-%m-%d')}"
-        elif isinstance(published, str):
-            try:
-                # 尝试解析ISO格式的日期字符串
-                published_date = datetime.fromisoformat(published.replace('Z', '+00:00'))
-                published_str = f"发布时间: {published_date.strftime('%Y-%m-%d')}"
-            except:
-                published_str = f"发布时间: {published}"
-        else:
-            published_str = "发布时间: 未知"
-            
-        # 获取PDF链接
-        pdf_url = paper.get('pdf_url', '未提供')
-        if len(pdf_url) > 50:  # 如果链接太长，截断显示
-            pdf_url = pdf_url[:47] + "..."
-        
-        # 绘制论文信息
-        info_y_start = height/2 + 50  # 从标题下方开始绘制信息
-        line_spacing = 40  # 行间距
-        
-        # 绘制作者信息
-        draw.text((width/2, info_y_start), authors, font=info_font, fill=(50, 50, 50), anchor="mm")
-        
-        # 绘制来源信息
-        draw.text((width/2, info_y_start + line_spacing), source, font=info_font, fill=(50, 50, 50), anchor="mm")
-        
-        # 绘制发布时间
-        draw.text((width/2, info_y_start + 2*line_spacing), published_str, font=info_font, fill=(50, 50, 50), anchor="mm")
-        
-        # 绘制PDF链接
-        pdf_text = f"PDF链接: {pdf_url}"
-        draw.text((width/2, info_y_start + 3*line_spacing), pdf_text, font=small_font, fill=(100, 100, 100), anchor="mm")
-        
-        # 底部文字
-        draw.text((width/2, height-100), "由预印本文献订阅工具PDF自动生成", font=small_font, fill=(100, 100, 100), anchor="mm")
-        draw.text((width/2, height-60), "每日学术精选", font=small_font, fill=(100, 100, 100), anchor="mm")
-        
-        # 添加简单的角落装饰
-        corner_size = 50
-        corner_color = (150, 150, 150)
-        for pos in [(0, 0), (width, 0), (0, height), (width, height)]:
-            draw.line([pos, (pos[0] + (corner_size if pos[0] == 0 else -corner_size), pos[1])], 
-                     fill=corner_color, width=2)
-            draw.line([pos, (pos[0], pos[1] + (corner_size if pos[1] == 0 else -corner_size))], 
-                     fill=corner_color, width=2)
-        
-        # 保存图片
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        image_path = os.path.join(self.storage_path, f"{filename_prefix}_{timestamp}.png")
-        image.save(image_path)
+        """创建一张带有论文标题和详细信息的图片
         
-        return image_path
\ No newline at end of file
+        卡片以内容哈希命名，相同的论文信息复用已渲染的图片。
+        """
+        return self.card_renderer.render(paper, filename_prefix)
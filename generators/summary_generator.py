@@ -1,8 +1,29 @@
 import os
+import re
 import json
 from datetime import datetime
-from config import SUMMARY_STORAGE_PATH, SUMMARY_MAX_TOKENS
-from processors.llm_processor import LLMProcessor
+from concurrent.futures import ThreadPoolExecutor
+from config import (SUMMARY_STORAGE_PATH, SUMMARY_MAX_TOKENS, SUMMARY_PROMPT_TOKENS, TRIAGE_BATCH_SIZE,
+                    TRIAGE_BATCH_TOKENS, TRIAGE_TOKENS_PER_PAPER, LLM_POOL_SIZE)
+from processors.llm_processor import LLMProcessor, LLM_ERROR_RESPONSE
+from utils.token_budget import estimate_tokens, truncate_to_tokens, allocate_budget
+from utils.metrics import timed
+from utils.paper_index import paper_key
+from utils.storage_manager import get_storage_manager
+
+# 分诊提示词中单篇论文摘要的token上限
+_TRIAGE_ABSTRACT_TOKENS = 400
+
+_TRIAGE_PROMPT_HEADER = """
+请评估以下每篇学术论文的潜在研究价值和学术影响力，考虑：
+1. 研究问题的重要性和创新性
+2. 研究方法的科学性和严谨性
+3. 研究结果的可靠性和影响力
+4. 与当前研究热点的相关性
+
+请只输出一个JSON数组，不要输出其他内容。数组中每篇论文对应一个对象，格式如下：
+{"id": 论文编号, "score": 总体评分(1-10的整数), "valuable": true或false, "reason": "简短理由，不超过50字"}
+"""
 
 class SummaryGenerator:
     def __init__(self):
@@ -10,8 +31,13 @@ class SummaryGenerator:
         self.llm_processor = LLMProcessor()
         self.max_tokens = SUMMARY_MAX_TOKENS
     
+    @timed("evaluate_single")
     def evaluate_paper_value(self, paper):
-        """评估论文的潜在研究价值和学术影响力"""
+        """评估论文的潜在研究价值和学术影响力
+        
+        请求失败或回复中没有明确结论时默认视为有价值，避免错过重要论文，
+        此时结果带有 'defaulted': True，不应作为评估结论记录。
+        """
         prompt = f"""
 请评估以下学术论文的潜在研究价值和学术影响力：
 
@@ -35,8 +61,11 @@ class SummaryGenerator:
         
         # 使用LLM评估论文价值
         evaluation = self.llm_processor.process_text(prompt, self.max_tokens)
+        if evaluation == LLM_ERROR_RESPONSE:
+            return {'is_valuable': True, 'evaluation': evaluation, 'defaulted': True}
         
         # 解析评估结果
+        defaulted = False
         is_valuable = False
         if "有价值" in evaluation and "价值有限" not in evaluation:
             is_valuable = True
@@ -52,60 +81,123 @@ class SummaryGenerator:
             else:
                 # 默认为有价值，避免错过重要论文
                 is_valuable = True
+                defaulted = True
         
-        return {
+        result = {
             'is_valuable': is_valuable,
             'evaluation': evaluation
         }
+        if defaulted:
+            result['defaulted'] = True
+        return result
     
-    def generate_summary(self, paper, pdf_content):
-        """生成论文综述"""
-        # 检查是否存在缓存的摘要文件
-        paper_id = paper['id'].split('/')[-1] if '/' in paper['id'] else paper['id']
-        cache_file = f"{paper_id.replace('.', '_').replace(':', '_')}_summary.json"
-        cache_path = os.path.join(self.storage_path, cache_file)
+    def _format_triage_entry(self, number, paper):
+        """将单篇论文的元数据格式化为分诊提示词中的一项"""
+        abstract = truncate_to_tokens(paper.get('abstract', ''), _TRIAGE_ABSTRACT_TOKENS)
+        return f"""
+[论文 {number}]
+标题: {paper['title']}
+作者: {', '.join(paper['authors'][:5])}
+来源: {paper['source']}
+分类: {', '.join(paper['categories'])}
+摘要: {abstract}
+"""
+    
+    def _pack_triage_batches(self, papers):
+        """按篇数上限和token预算将论文打包为批次"""
+        header_tokens = estimate_tokens(_TRIAGE_PROMPT_HEADER)
+        batches = []
+        current, current_tokens = [], header_tokens
+        for paper in papers:
+            entry_tokens = estimate_tokens(self._format_triage_entry(len(current) + 1, paper))
+            if current and (len(current) >= TRIAGE_BATCH_SIZE or current_tokens + entry_tokens > TRIAGE_BATCH_TOKENS):
+                batches.append(current)
+                current, current_tokens = [], header_tokens
+            current.append(paper)
+            current_tokens += entry_tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _parse_triage_response(self, response, count):
+        """解析分诊回复中的JSON评估列表
         
-        # 如果存在缓存文件，直接读取返回
-        if os.path.exists(cache_path):
+        返回:
+            dict: 论文序号(从0开始) -> 评估结果，格式不正确的条目不会出现在结果中
+        """
+        text = re.sub(r'```(?:json)?', '', response)
+        start, end = text.find('['), text.rfind(']')
+        if start == -1 or end <= start:
+            return {}
+        try:
+            items = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        if not isinstance(items, list):
+            return {}
+        
+        results = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
             try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    return cache_data['summary']
-            except Exception as e:
-                print(f"读取缓存文件失败: {str(e)}")
-                # 如果读取缓存失败，继续生成新的摘要
+                index = int(item.get('id')) - 1
+            except (TypeError, ValueError):
+                continue
+            valuable = item.get('valuable')
+            if not 0 <= index < count or not isinstance(valuable, bool) or index in results:
+                continue
+            score = item.get('score')
+            reason = str(item.get('reason', '')).strip()
+            verdict = "有价值" if valuable else "价值有限"
+            evaluation = f"总体评分: {score}/10\n结论: {verdict}\n理由: {reason}" if score is not None \
+                else f"结论: {verdict}\n理由: {reason}"
+            results[index] = {
+                'is_valuable': valuable,
+                'evaluation': evaluation
+            }
+        return results
+    
+    def _select_content(self, pdf_content, sections=None, budget=None):
+        """在token预算内选择送入LLM的论文正文
         
-        # 首先评估论文价值
-        evaluation_result = self.evaluate_paper_value(paper)
+        有章节信息时使用方法、结果、结论、讨论和引言等章节，各章节分配预算时
+        较短的章节完整保留，较长的章节截断；没有可用章节时使用正文开头。
         
-        # 如果论文价值有限，返回None表示不需要继续处理
-        if not evaluation_result['is_valuable']:
-            print(f"论文 '{paper['title']}' 评估为价值有限，跳过摘要生成。")
-            print(f"评估结果: {evaluation_result['evaluation']}")
-            
-            # 保存评估结果
-            file_name = f"{paper_id.replace('.', '_').replace(':', '_')}_evaluation.json"
-            file_path = os.path.join(self.storage_path, file_name)
-            
-            paper_copy = paper.copy()
-            for key, value in paper_copy.items():
-                if isinstance(value, datetime):
-                    paper_copy[key] = value.isoformat()
-            
-            evaluation_data = {
-                'paper': paper_copy,
-                'evaluation': evaluation_result['evaluation'],
-                'is_valuable': evaluation_result['is_valuable'],
-                'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(evaluation_data, f, ensure_ascii=False, indent=2)
-                
-            return None
+        参数:
+            pdf_content (str): PDF正文文本
+            sections (dict, optional): PDFProcessor.extract_structured_content提取的章节
+            budget (int, optional): 正文的token预算，默认由SUMMARY_PROMPT_TOKENS决定
+        """
+        if budget is None:
+            budget = SUMMARY_PROMPT_TOKENS // 2
         
-        # 以下是原有的摘要生成逻辑
-        prompt = f"""
+        section_titles = [
+            ('methods', '方法'),
+            ('results', '结果'),
+            ('conclusion', '结论'),
+            ('discussion', '讨论'),
+            ('introduction', '引言'),
+        ]
+        sections = sections or {}
+        parts = [(title, sections[name]) for name, title in section_titles if sections.get(name)]
+        if not parts:
+            # 标题之前的内容已剔除作者单位等信息，优先于未清理的原始文本
+            return truncate_to_tokens(sections.get('front_matter') or pdf_content, budget)
+        
+        # 扣除章节标记占用的token后分配预算
+        headers = [f"【{title}】\n" for title, _ in parts]
+        budget -= sum(estimate_tokens(header) + 1 for header in headers)
+        allocation = allocate_budget([estimate_tokens(text) for _, text in parts], budget)
+        return "\n\n".join(
+            header + truncate_to_tokens(text, tokens)
+            for header, (_, text), tokens in zip(headers, parts, allocation)
+            if tokens > 0
+        )
+    
+    def _build_summary_prompt(self, paper, pdf_content, sections=None):
+        """构建综述请求的提示词，论文正文填充提示词模板之外的剩余token预算"""
+        template = f"""
 请对以下学术论文进行简短综述（500字以内）：
 
 标题: {paper['title']}
@@ -118,7 +210,7 @@ class SummaryGenerator:
 {paper['abstract']}
 
 论文内容:
-{pdf_content[:5000]}...
+{{content}}
 
 请提供以下内容:
 1. 研究背景和问题（1-2句话）
@@ -128,9 +220,129 @@ class SummaryGenerator:
 
 请使用学术但通俗易懂的语言，避免过于技术性的术语，以便非专业人士也能理解。
 """
+        budget = SUMMARY_PROMPT_TOKENS - estimate_tokens(template)
+        content = self._select_content(pdf_content, sections, budget) if budget > 0 else ""
+        head, _, tail = template.rpartition("{content}")
+        return head + content + tail
+    
+    def save_evaluation(self, paper, evaluation_result):
+        """保存价值有限论文的评估结果"""
+        paper_id = paper['id'].split('/')[-1] if '/' in paper['id'] else paper['id']
+        file_name = f"{paper_id.replace('.', '_').replace(':', '_')}_evaluation.json"
+        file_path = os.path.join(self.storage_path, file_name)
+        
+        paper_copy = paper.copy()
+        for key, value in paper_copy.items():
+            if isinstance(value, datetime):
+                paper_copy[key] = value.isoformat()
+        
+        evaluation_data = {
+            'paper': paper_copy,
+            'evaluation': evaluation_result['evaluation'],
+            'is_valuable': evaluation_result['is_valuable'],
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(evaluation_data, f, ensure_ascii=False, indent=2)
+        get_storage_manager().record(file_path, "summary", paper_key(paper)[0])
+    
+    @timed("evaluate")
+    def evaluate_papers(self, papers):
+        """用一个LLM请求评估一批论文的价值，返回与输入顺序一致的评估结果列表
+        
+        模型需要为每篇论文返回一个JSON评估项，缺失或格式不正确的论文
+        单独调用evaluate_paper_value重新评估。请求失败时整批返回默认结论。
+        """
+        if not papers:
+            return []
+        if len(papers) == 1:
+            return [self.evaluate_paper_value(papers[0])]
+        
+        entries = "".join(self._format_triage_entry(number, paper) for number, paper in enumerate(papers, 1))
+        prompt = _TRIAGE_PROMPT_HEADER + entries
+        response = self.llm_processor.process_text(prompt, TRIAGE_TOKENS_PER_PAPER * len(papers))
+        if response == LLM_ERROR_RESPONSE:
+            return [{'is_valuable': True, 'evaluation': response, 'defaulted': True} for _ in papers]
+        parsed = self._parse_triage_response(response, len(papers))
+        
+        if len(parsed) < len(papers):
+            print(f"批量评估返回 {len(parsed)}/{len(papers)} 篇有效结果，其余论文单独评估")
+        return [parsed[index] if index in parsed else self.evaluate_paper_value(paper)
+                for index, paper in enumerate(papers)]
+    
+    def triage_papers(self, papers, workers=None):
+        """仅根据元数据对论文进行分诊评估
+        
+        论文按篇数上限TRIAGE_BATCH_SIZE和token预算TRIAGE_BATCH_TOKENS打包为批次，
+        每个批次一个LLM请求，各批次并发评估。
+        
+        参数:
+            papers (list): 论文元数据列表
+            workers (int, optional): 并发批次数，默认与LLM连接池大小一致
+            
+        返回:
+            list: 与输入顺序一致的评估结果列表
+        """
+        if not papers:
+            return []
+        
+        batches = self._pack_triage_batches(papers)
+        print(f"分诊评估: {len(papers)} 篇论文打包为 {len(batches)} 个请求")
+        with ThreadPoolExecutor(max_workers=workers or LLM_POOL_SIZE) as executor:
+            batch_results = list(executor.map(self.evaluate_papers, batches))
+        return [result for batch in batch_results for result in batch]
+    
+    @timed("summarize")
+    def generate_summary(self, paper, pdf_content, sections=None, evaluation_result=None):
+        """生成论文综述
+        
+        参数:
+            paper (dict): 论文元数据
+            pdf_content (str): PDF正文文本
+            sections (dict, optional): PDFProcessor.extract_structured_content提取的章节
+            evaluation_result (dict, optional): 分诊阶段得到的评估结果，提供时不再重复评估
+        
+        返回:
+            str: 综述文本，论文评估为价值有限时返回None；LLM请求失败时抛出RuntimeError
+        """
+        # 检查是否存在缓存的摘要文件
+        paper_id = paper['id'].split('/')[-1] if '/' in paper['id'] else paper['id']
+        cache_file = f"{paper_id.replace('.', '_').replace(':', '_')}_summary.json"
+        cache_path = os.path.join(self.storage_path, cache_file)
+        
+        # 如果存在缓存文件，直接读取返回
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+                # 之前保存的失败结果不作为缓存使用
+                if cache_data['summary'] != LLM_ERROR_RESPONSE:
+                    get_storage_manager().record(cache_path, "summary", paper_key(paper)[0])
+                    return cache_data['summary']
+            except Exception as e:
+                print(f"读取缓存文件失败: {str(e)}")
+                # 如果读取缓存失败，继续生成新的摘要
+        
+        # 首先评估论文价值（已在分诊阶段评估过时直接使用其结论）
+        if evaluation_result is None:
+            evaluation_result = self.evaluate_paper_value(paper)
+        
+        # 如果论文价值有限，返回None表示不需要继续处理
+        if not evaluation_result['is_valuable']:
+            print(f"论文 '{paper['title']}' 评估为价值有限，跳过摘要生成。")
+            print(f"评估结果: {evaluation_result['evaluation']}")
+            self.save_evaluation(paper, evaluation_result)
+            return None
+        
+        # 在token预算内构建综述提示词
+        prompt = self._build_summary_prompt(paper, pdf_content, sections)
         
         # 使用LLM生成综述
         summary = self.llm_processor.process_text(prompt, self.max_tokens)
+        if summary == LLM_ERROR_RESPONSE:
+            # 请求失败的结果不保存，论文停留在extracted阶段，之后的运行重新生成
+            raise RuntimeError("LLM请求失败，未能生成综述")
         
         # 保存综述
         file_name = f"{paper_id.replace('.', '_').replace(':', '_')}_summary.json"
@@ -153,5 +365,6 @@ class SummaryGenerator:
         
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(summary_data, f, ensure_ascii=False, indent=2)
+        get_storage_manager().record(file_path, "summary", paper_key(paper)[0])
         
         return summary
\ No newline at end of file
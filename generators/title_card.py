@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import textwrap
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from config import TITLE_CARD
+from utils.metrics import timed
+
+# 卡片模板版本，修改版式时递增，已缓存的卡片会以新的文件名重新渲染
+CARD_VERSION = "1"
+
+WIDTH, HEIGHT = 800, 1200
+_FONT_SIZES = {'title': 48, 'subtitle': 36, 'info': 28, 'small': 24}
+
+
+@lru_cache(maxsize=1)
+def _font_path():
+    """返回第一个可用的中文字体路径，都不可用时返回None（每个进程只探测一次）"""
+    for font_path in TITLE_CARD.get("font_paths", []):
+        try:
+            ImageFont.truetype(font_path, _FONT_SIZES['small'])
+            return font_path
+        except IOError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=1)
+def _fonts():
+    """加载各字号的字体（每个进程只加载一次）"""
+    font_path = _font_path()
+    if font_path is None:
+        print("使用默认字体")
+        default = ImageFont.load_default()
+        return {name: default for name in _FONT_SIZES}
+    print(f"使用中文字体: {font_path}")
+    return {name: ImageFont.truetype(font_path, size) for name, size in _FONT_SIZES.items()}
+
+
+@lru_cache(maxsize=1)
+def _template():
+    """预先渲染所有卡片共用的静态图层：白色背景、标题框、底部文字和角落装饰"""
+    fonts = _fonts()
+    image = Image.new('RGB', (WIDTH, HEIGHT), color=(255, 255, 255))
+    draw = ImageDraw.Draw(image)
+
+    # 添加标题框
+    title_box_margin = 40
+    title_box = [(title_box_margin, HEIGHT/5), (WIDTH-title_box_margin, HEIGHT*3/4)]
+    draw.rectangle(title_box, outline=(100, 100, 100), width=3)
+
+    # 底部文字
+    draw.text((WIDTH/2, HEIGHT-100), "由预印本文献订阅工具PDF自动生成", font=fonts['small'], fill=(100, 100, 100), anchor="mm")
+    draw.text((WIDTH/2, HEIGHT-60), "每日学术精选", font=fonts['small'], fill=(100, 100, 100), anchor="mm")
+
+    # 添加简单的角落装饰
+    corner_size = 50
+    corner_color = (150, 150, 150)
+    for pos in [(0, 0), (WIDTH, 0), (0, HEIGHT), (WIDTH, HEIGHT)]:
+        draw.line([pos, (pos[0] + (corner_size if pos[0] == 0 else -corner_size), pos[1])],
+                  fill=corner_color, width=2)
+        draw.line([pos, (pos[0], pos[1] + (corner_size if pos[1] == 0 else -corner_size))],
+                  fill=corner_color, width=2)
+    return image
+
+
+def card_fields(paper):
+    """提取卡片上显示的文字，相同的论文信息总是得到相同的结果"""
+    authors_list = paper.get('authors') or ['未知']
+    if isinstance(authors_list, str):
+        authors_list = [authors_list]
+    authors = "作者: " + ", ".join(authors_list)[:80]
+    if len(authors_list) > 3:
+        authors = "作者: " + ", ".join(authors_list[:3]) + " 等"
+
+    # 格式化发布时间
+    published = paper.get('published')
+    if isinstance(published, datetime):
+        published_str = f"发布时间: {published.strftime('%Y-%m-%d')}"
+    elif isinstance(published, str):
+        try:
+            # 尝试解析ISO格式的日期字符串
+            published_date = datetime.fromisoformat(published.replace('Z', '+00:00'))
+            published_str = f"发布时间: {published_date.strftime('%Y-%m-%d')}"
+        except ValueError:
+            published_str = f"发布时间: {published}"
+    else:
+        published_str = "发布时间: 未知"
+
+    # 链接太长时截断显示
+    pdf_url = paper.get('pdf_url') or '未提供'
+    if len(pdf_url) > 50:
+        pdf_url = pdf_url[:47] + "..."
+
+    return {
+        'title': textwrap.fill(paper['title'], width=25),
+        'authors': authors,
+        'source': f"来源: {paper.get('source', '未知')}",
+        'published': published_str,
+        'pdf': f"PDF链接: {pdf_url}"
+    }
+
+
+def card_hash(fields):
+    """卡片内容哈希，包含模板版本和所用字体，决定卡片的文件名"""
+    payload = json.dumps([CARD_VERSION, _font_path(), fields], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def render_card(fields, image_path):
+    """在静态图层的副本上绘制论文信息并保存，相同的输入得到逐字节相同的PNG"""
+    fonts = _fonts()
+    image = _template().copy()
+    draw = ImageDraw.Draw(image)
+
+    # 绘制标题
+    draw.text((WIDTH/2, HEIGHT/3), fields['title'], font=fonts['title'], fill=(0, 0, 0), anchor="mm", align="center")
+
+    # 从标题下方开始绘制作者、来源、发布时间和PDF链接
+    info_y_start = HEIGHT/2 + 50
+    line_spacing = 40
+    draw.text((WIDTH/2, info_y_start), fields['authors'], font=fonts['info'], fill=(50, 50, 50), anchor="mm")
+    draw.text((WIDTH/2, info_y_start + line_spacing), fields['source'], font=fonts['info'], fill=(50, 50, 50), anchor="mm")
+    draw.text((WIDTH/2, info_y_start + 2*line_spacing), fields['published'], font=fonts['info'], fill=(50, 50, 50), anchor="mm")
+    draw.text((WIDTH/2, info_y_start + 3*line_spacing), fields['pdf'], font=fonts['small'], fill=(100, 100, 100), anchor="mm")
+
+    # 先写临时文件再替换，并发渲染同一张卡片时不会读到写了一半的文件
+    temp_path = f"{image_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(temp_path, format="PNG")
+    os.replace(temp_path, image_path)
+    return image_path
+
+
+def render_cards(jobs):
+    """在子进程中批量渲染卡片，jobs为 (fields, image_path) 列表"""
+    return [render_card(fields, image_path) for fields, image_path in jobs]
+
+
+class TitleCardRenderer:
+    """论文标题卡片渲染器
+
+    字体和静态图层在每个进程中只加载和绘制一次，每张卡片只绘制论文相关的文字。
+    卡片以内容哈希命名，已存在的卡片直接复用；批量渲染时按块分发到进程池。
+    """
+
+    def __init__(self, output_dir, chunk_size=None):
+        self.output_dir = output_dir
+        self.chunk_size = max(1, chunk_size or TITLE_CARD.get("chunk_size", 8))
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def card_path(self, paper, filename_prefix, fields=None):
+        fields = fields or card_fields(paper)
+        return os.path.join(self.output_dir, f"{filename_prefix}_{card_hash(fields)}.png")
+
+    @timed("title_card")
+    def render(self, paper, filename_prefix):
+        """返回论文的标题卡片路径，卡片已存在或正在批量渲染时直接复用"""
+        fields = card_fields(paper)
+        image_path = self.card_path(paper, filename_prefix, fields)
+        with self._lock:
+            future = self._pending.pop(image_path, None)
+        if future is not None:
+            try:
+                future.result()
+                return image_path
+            except Exception as e:
+                print(f"批量渲染标题卡片失败，重新渲染: {str(e)}")
+        if os.path.exists(image_path):
+            return image_path
+        os.makedirs(self.output_dir, exist_ok=True)
+        return render_card(fields, image_path)
+
+    def submit_batch(self, items, pool):
+        """把尚未渲染的卡片按块提交到进程池，items为 (paper, filename_prefix) 列表
+
+        之后对这些论文调用render时会等待对应的渲染结果，而不是重复渲染。
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        jobs = []
+        with self._lock:
+            for paper, filename_prefix in items:
+                fields = card_fields(paper)
+                image_path = self.card_path(paper, filename_prefix, fields)
+                if image_path in self._pending or os.path.exists(image_path):
+                    continue
+                jobs.append((fields, image_path))
+            for start in range(0, len(jobs), self.chunk_size):
+                chunk = jobs[start:start + self.chunk_size]
+                future = pool.submit(render_cards, chunk)
+                for _, image_path in chunk:
+                    self._pending[image_path] = future
+        return len(jobs)
@@ -1,19 +1,23 @@
 import os
 import time
+import argparse
 import schedule
 from datetime import datetime
 
-from config import UPDATE_FREQUENCY, PDF_STORAGE_PATH, SUMMARY_STORAGE_PATH, SOCIAL_POST_PATH, SHOW_IMAGE_PREVIEW, MANUAL_PDF_LINKS
-from scrapers.arxiv_scraper import ArxivScraper
-from scrapers.biorxiv_scraper import BiorxivScraper
-from scrapers.medrxiv_scraper import MedrxivScraper
+from config import UPDATE_FREQUENCY, PDF_STORAGE_PATH, SUMMARY_STORAGE_PATH, SOCIAL_POST_PATH, PIPELINE_WORKERS, PAPER_INDEX_PATH, METRICS, REVIEW, FETCH_SOURCES, PAPER_SEARCH_DAYS, SCHEDULER, STORAGE
+from scrapers.fetch_coordinator import FetchCoordinator
 from processors.pdf_processor import PDFProcessor
-from processors.llm_processor import LLMProcessor
+from processors.pdf_downloader import get_download_manager
 from generators.summary_generator import SummaryGenerator
 from generators.social_post_generator import SocialPostGenerator
-from processors.manual_link_processor import ManualLinkProcessor
-import matplotlib.pyplot as plt
-from PIL import Image
+from processors.pipeline_executor import StagedExecutor
+from utils.paper_index import PaperIndex, paper_key
+from processors.relevance_ranker import RelevanceRanker
+from utils.metrics import get_metrics
+from utils.review_queue import ReviewQueue
+from utils.scheduler import PipelineScheduler
+from utils.image_store import get_image_store
+from utils.storage_manager import get_storage_manager, storage_quotas
 
 def create_directories():
     """创建必要的目录"""
@@ -21,139 +25,274 @@ def create_directories():
         if not os.path.exists(path):
             os.makedirs(path)
 
-def run_pipeline():
-    """运行完整的处理流程"""
+def log_user_skipped(paper):
+    """记录用户在审核中跳过的论文"""
+    skipped_log_path = os.path.join(SUMMARY_STORAGE_PATH, "user_skipped_papers.log")
+    with open(skipped_log_path, "a", encoding="utf-8") as log_file:
+        log_file.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {paper['title']} - 用户手动跳过\n")
+
+def approved_batches(initial, review_queue, executor, pdf_processor, paper_index):
+    """逐批产生审核通过的论文结果
+
+    先产生本次无需人工审核的论文，然后取走审核队列中已做出决定的论文；
+    在配置的等待时间内持续轮询，直到没有待审核的论文为止。
+    """
+    if initial:
+        yield initial
+    
+    deadline = time.monotonic() + REVIEW.get("wait_seconds", 0)
+    while True:
+        batch = []
+        for entry in review_queue.take_decided():
+            paper = entry['paper']
+            if entry['status'] == 'approved':
+                print(f"✓ 审核通过: {paper['title']}")
+                batch.append(executor.resume(entry, pdf_processor))
+            else:
+                print(f"✗ 用户选择跳过该论文: {paper['title']}")
+                paper_index.mark(paper, "skipped", {'reason': 'user', 'note': entry['note']})
+                log_user_skipped(paper)
+        if batch:
+            yield batch
+        
+        if not review_queue.count_by_status().get("pending") or time.monotonic() >= deadline:
+            return
+        time.sleep(REVIEW.get("poll_interval", 5))
+
+def run_pipeline(workers=None, windows=None):
+    """运行完整的处理流程
+    
+    参数:
+        workers (int, optional): 并发工作线程数，默认使用配置中的PIPELINE_WORKERS
+        windows (dict, optional): 来源名称到 (起始时间, 结束时间) 的映射，指定时只获取其中的来源；
+            为None时获取所有启用的来源最近PAPER_SEARCH_DAYS天的论文
+    
+    返回:
+        dict: 各来源的获取状态，供调度器决定是否推进高水位线
+    """
     print(f"开始运行 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    metrics = get_metrics()
+    metrics.reset()
     
     # 初始化组件
-    arxiv_scraper = ArxivScraper()
-    biorxiv_scraper = BiorxivScraper()
-    medrxiv_scraper = MedrxivScraper()
+    if windows is None:
+        fetch_coordinator = FetchCoordinator()
+    else:
+        fetch_coordinator = FetchCoordinator(sources=[source for source in FETCH_SOURCES if source in windows])
     pdf_processor = PDFProcessor()
-    llm_processor = LLMProcessor()
     summary_generator = SummaryGenerator()
     social_post_generator = SocialPostGenerator()
-    manual_link_processor = ManualLinkProcessor()  # 新增
-    
-    # 1. 获取文章元数据
-    print("正在获取arXiv文章...")
-    arxiv_papers = arxiv_scraper.fetch_papers()
-    
-    print("正在获取bioRxiv文章...")
-    biorxiv_papers = biorxiv_scraper.fetch_papers()
-    
-    print("正在获取medRxiv文章...")
-    medrxiv_papers = medrxiv_scraper.fetch_papers()
-    
-    # 处理手动指定的PDF链接
-    print("正在处理手动指定的PDF链接...")
-    manual_papers = manual_link_processor.process_links(MANUAL_PDF_LINKS)
-    
-    # 合并所有论文
-    all_papers = arxiv_papers + biorxiv_papers + medrxiv_papers + manual_papers
-    print(f"共获取到 {len(all_papers)} 篇文章")
-    
-    # 2. 处理每篇文章
-    for i, paper in enumerate(all_papers, 1):
-        try:
-            print(f"\n处理第 {i}/{len(all_papers)} 篇文章: {paper['title']}")
-            
-            # 下载PDF
-            print("- 下载PDF...")
-            pdf_path = pdf_processor.download_pdf(paper)
-            
-            # 提取PDF内容
-            print("- 提取PDF内容...")
-            pdf_content = pdf_processor.extract_content(pdf_path)
-            pdf_images = pdf_processor.extract_images(pdf_path)
-            
-            # 人工干预确认
-            print("\n" + "="*50)
-            print(f"论文标题: {paper['title']}")
-            print(f"作者: {', '.join(paper['authors'])}")
-            print(f"摘要: {paper['abstract'][:200]}...")
-            
-            # 显示提取的内容预览
-            content_preview = pdf_content[:500] + "..." if len(pdf_content) > 500 else pdf_content
-            print(f"\nPDF内容预览:\n{content_preview}")
-            
-            # 显示图片信息和预览
-            if pdf_images:
-                print(f"\n提取到 {len(pdf_images)} 张图片:")
-                for i, img_path in enumerate(pdf_images[:3], 1):
-                    print(f"  图片 {i}: {os.path.basename(img_path)}")
-                if len(pdf_images) > 3:
-                    print(f"  ... 以及其他 {len(pdf_images) - 3} 张图片")
-                
-                # 根据配置决定是否显示图像预览
-                if SHOW_IMAGE_PREVIEW:
-                    fig, axes = plt.subplots(1, min(3, len(pdf_images)), figsize=(15, 5))
-                    if len(pdf_images) == 1:
-                        axes = [axes]
-                    
-                    for i, (img_path, ax) in enumerate(zip(pdf_images[:3], axes), 1):
-                        try:
-                            img = Image.open(img_path)
-                            ax.imshow(img)
-                            ax.axis('off')
-                            ax.set_title(f"图片 {i}")
-                        except Exception as e:
-                            print(f"  无法显示图片 {i}: {str(e)}")
-                    
-                    plt.tight_layout()
-                    plt.show()
-            else:
-                print("\n未提取到图片")
-            
-            # 请求用户确认
-            print("\n是否继续处理该论文? (y/n): ", end="")
-            user_input = input().strip().lower()
-            
-            if user_input != 'y':
-                print("✗ 用户选择跳过该论文")
-                skipped_log_path = os.path.join(SUMMARY_STORAGE_PATH, "user_skipped_papers.log")
-                with open(skipped_log_path, "a", encoding="utf-8") as log_file:
-                    log_file.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {paper['title']} - 用户手动跳过\n")
-                continue
-            
-            # 生成综述
-            print("- 生成/读取论文综述...")
-            summary_result = summary_generator.generate_summary(paper, pdf_content)
-            
-            # 检查论文评估结果
-            if summary_result is None:
-                print("✗ 论文评估未通过，跳过后续处理")
-                # 记录被跳过的论文信息
-                skipped_log_path = os.path.join(SUMMARY_STORAGE_PATH, "skipped_papers.log")
-                with open(skipped_log_path, "a", encoding="utf-8") as log_file:
-                    log_file.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {paper['title']} - 评估未通过\n")
-                continue
-            
-            # 如果通过评估，提取摘要内容
-            summary = summary_result
-            
-            # 生成社交媒体文案
-            print("- 生成社交媒体文案...")
-            social_post = social_post_generator.generate_post(paper, summary, pdf_images)
-            
+    paper_index = PaperIndex(PAPER_INDEX_PATH)
+    review_queue = ReviewQueue(REVIEW["db_path"])
+    # 上一次运行中断时正在生成的论文重新放回审核通过的队列
+    requeued = review_queue.requeue_unfinished()
+    if requeued:
+        print(f"{requeued} 篇审核通过但上次未处理完成的论文重新加入队列")
+    
+    # 1. 并行获取所有来源（arXiv、bioRxiv、medRxiv及手动指定链接）的文章元数据
+    print("正在并行获取各来源文章...")
+    source_results = fetch_coordinator.fetch_all(windows)
+    for source, stats in fetch_coordinator.source_stats.items():
+        print(f"- {source}: {stats['status']}, {stats['count']} 篇")
+    
+    # 合并所有论文并去重
+    all_papers = fetch_coordinator.merge_papers(source_results)
+    merged_count = len(all_papers)
+    print(f"共获取到 {len(all_papers)} 篇文章，合并了 {len(fetch_coordinator.duplicates)} 篇重复论文")
+    
+    # 之前的运行中以其他来源处理过的同一项工作同样标记为跳过（须在记录本次的重复论文之前检查，
+    # 否则规范记录会与刚记录的重复论文匹配）
+    known_works = paper_index.find_known_works(all_papers)
+    for paper, canonical_key in known_works:
+        paper_index.mark(paper, "skipped", {'reason': 'duplicate', 'canonical': canonical_key})
+    if known_works:
+        print(f"{len(known_works)} 篇论文与之前运行中处理过的论文是同一项工作，已跳过")
+        known_ids = {id(paper) for paper, _ in known_works}
+        all_papers = [paper for paper in all_papers if id(paper) not in known_ids]
+    
+    # 重复记录直接标记为跳过，只处理规范记录
+    for paper, canonical in fetch_coordinator.duplicates:
+        paper_index.mark(paper, "skipped", {'reason': 'duplicate', 'canonical': paper_key(canonical)[0]})
+    
+    # 记录获取到的论文，只处理尚未完成的论文
+    paper_index.mark_many(all_papers, "fetched")
+    all_papers = paper_index.filter_pending(all_papers)
+    # 已在审核队列中的论文无需重新准备
+    all_papers = [paper for paper in all_papers if not review_queue.contains(paper)]
+    print(f"其中 {len(all_papers)} 篇尚未处理完成")
+    
+    # 之前被排序器暂缓评估的论文与本次获取的论文一起重新排序
+    fetched_keys = {paper_key(paper) for paper in all_papers}
+    deferred = [paper for paper in paper_index.deferred_papers() if paper_key(paper) not in fetched_keys]
+    if deferred:
+        print(f"另有 {len(deferred)} 篇之前暂缓评估的论文参与本次排序")
+        all_papers += deferred
+    
+    # 用历史评估结果训练的本地排序器筛掉明显不相关的论文，减少LLM评估次数
+    ranker = RelevanceRanker.from_history(paper_index)
+    all_papers, ranked_out = ranker.select(all_papers)
+    # 暂缓评估的论文仍在待处理之列，索引中保存其元数据，下一次运行用更新后的排序器重新打分
+    for paper, score in ranked_out:
+        paper_index.mark(paper, "deferred", {'reason': 'ranker', 'score': round(score, 4), 'paper': paper})
+    if ranked_out:
+        print(f"相关性排序: {len(ranked_out)} 篇论文得分较低，本次暂不交给LLM评估")
+    
+    executor = StagedExecutor(workers)
+    print(f"使用 {executor.workers} 个线程、{executor.process_workers} 个进程处理文章")
+    
+    # 2. 仅根据元数据评估论文价值，未通过的论文不再下载
+    all_papers, evaluations, rejected = executor.triage(all_papers, summary_generator, paper_index)
+    skipped_log_path = os.path.join(SUMMARY_STORAGE_PATH, "skipped_papers.log")
+    with open(skipped_log_path, "a", encoding="utf-8") as log_file:
+        for paper, evaluation in rejected:
+            print(f"✗ 论文评估未通过，跳过后续处理: {paper['title']}")
+            log_file.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {paper['title']} - 评估未通过\n")
+    print(f"分诊完成: {len(all_papers)} 篇通过评估，{len(rejected)} 篇价值有限")
+    
+    # 3. 并发下载并提取通过评估的文章的PDF，同时渲染审核用的缩略图
+    results = executor.prepare(all_papers, pdf_processor, evaluations, thumbnails=REVIEW.get("thumbnails", 0),
+                               paper_index=paper_index)
+    prepared_papers = [r['paper'] for r in results if r['status'] == 'prepared']
+    paper_index.mark_many(prepared_papers, "extracted")
+    
+    # 4. 准备好的论文放入审核队列，审核人通过 review.py 随时做出决定，流水线不再逐篇阻塞等待
+    auto_approved = []
+    submitted = 0
+    for result in results:
+        paper = result['paper']
+        if result['status'] == 'failed':
+            print(f"✗ 处理文章时出错: {paper['title']}, 错误: {result['error']}")
+        elif REVIEW.get("auto_approve"):
+            auto_approved.append(result)
+        elif review_queue.submit(result, result['thumbnails']):
+            submitted += 1
+    pending = review_queue.count_by_status().get("pending", 0)
+    if submitted or pending:
+        print(f"\n{submitted} 篇论文已加入审核队列，共 {pending} 篇等待审核，"
+              f"可运行 python review.py 或 python review.py serve 进行审核")
+    
+    # 5. 审核通过的论文陆续到达，立即并发生成综述和社交媒体文案
+    print("\n正在为审核通过的文章生成综述和社交媒体文案...")
+    approved_results = executor.generate_stream(
+        approved_batches(auto_approved, review_queue, executor, pdf_processor, paper_index),
+        summary_generator, social_post_generator
+    )
+    
+    for result in approved_results:
+        paper = result['paper']
+        if result['status'] == 'completed':
+            paper_index.mark(paper, "posted")
+            review_queue.finish(paper)
             print(f"✓ 完成文章处理: {paper['title']}")
-        except Exception as e:
-            print(f"✗ 处理文章时出错: {paper['title']}, 错误: {str(e)}")
+        elif result['status'] == 'rejected':
+            paper_index.mark(paper, "skipped", {'reason': 'evaluation'})
+            review_queue.finish(paper)
+            print(f"✗ 论文评估未通过，跳过后续处理: {paper['title']}")
+            # 记录被跳过的论文信息
+            skipped_log_path = os.path.join(SUMMARY_STORAGE_PATH, "skipped_papers.log")
+            with open(skipped_log_path, "a", encoding="utf-8") as log_file:
+                log_file.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {paper['title']} - 评估未通过\n")
+        else:
+            if result['summary'] is not None:
+                paper_index.mark(paper, "summarized")
+            # 审核决定保留在队列中，下一次运行重新生成
+            review_queue.requeue(paper)
+            print(f"✗ 处理文章时出错: {paper['title']}, 错误: {result['error']}")
+    
+    for host, stats in get_download_manager().get_stats().items():
+        print(f"下载统计 {host}: {stats['downloads']} 个文件, {stats['bytes'] / 1024 / 1024:.1f} MB, "
+              f"{stats['bandwidth_kbps']} KB/s, 平均延迟 {stats['avg_latency']} 秒, 失败 {stats['failures']} 次")
+    
+    llm_metrics = summary_generator.llm_processor.get_metrics()
+    print(f"LLM统计: {llm_metrics['requests']} 次请求, 平均耗时 {llm_metrics['avg_latency']} 秒, "
+          f"握手 {llm_metrics['handshakes']} 次, 复用连接 {llm_metrics['reused']} 次")
+    
+    # 按配额淘汰最久未访问的文件，仍在处理中的论文的文件不会被淘汰
+    storage = get_storage_manager()
+    evicted = storage.enforce(storage_quotas(), paper_index.unfinished_keys(), STORAGE.get("low_watermark", 0.9))
+    get_image_store().discard(evicted.get("image", []))
+    storage_usage = storage.usage()
+    print("存储占用: " + ", ".join(
+        f"{kind} {usage['files']} 个文件 {usage['bytes'] / 1024 / 1024:.1f} MB"
+        for kind, usage in sorted(storage_usage.items())
+    ))
+    
+    # 写出本次运行的指标报告
+    report_path = metrics.write_report(
+        METRICS.get("report_dir", os.path.join(SUMMARY_STORAGE_PATH, "run_reports")),
+        METRICS.get("prometheus_path"),
+        extra={
+            'sources': fetch_coordinator.source_stats,
+            'papers': {
+                'merged': merged_count,
+                'duplicates': len(fetch_coordinator.duplicates),
+                'ranked_out': len(ranked_out),
+                'rejected': len(rejected),
+                'prepared': len(prepared_papers),
+                'submitted': submitted,
+                'approved': len(approved_results),
+                'completed': sum(1 for result in approved_results if result['status'] == 'completed')
+            },
+            'downloads': get_download_manager().get_stats(),
+            'llm': llm_metrics,
+            'index_stages': paper_index.count_by_stage(),
+            'review_queue': review_queue.count_by_status(),
+            'storage': storage_usage
+        }
+    )
+    print(f"运行报告已保存到 {report_path}")
     
     print(f"运行完成 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    return fetch_coordinator.source_stats
+
+def build_scheduler():
+    """创建按高水位线增量运行流水线的调度器"""
+    return PipelineScheduler(
+        run_pipeline,
+        sources=[source for source in FETCH_SOURCES if source != "manual"],
+        unwindowed_sources=[source for source in FETCH_SOURCES if source == "manual"],
+        state_path=SCHEDULER["state_path"],
+        lock_path=SCHEDULER["lock_path"],
+        initial_days=PAPER_SEARCH_DAYS,
+        max_window_days=SCHEDULER.get("max_window_days", 3),
+        max_catch_up_days=SCHEDULER.get("max_catch_up_days", 30),
+        overlap_hours=SCHEDULER.get("overlap_hours", 0)
+    )
+
+def run_scheduled(scheduler, workers):
+    """执行一次调度，出错时只记录错误，不中断守护进程"""
+    try:
+        scheduler.run_due(workers)
+    except Exception as e:
+        print(f"运行流水线时出错: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="预印本文献自动爬取与综述工具")
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS,
+                        help=f"并发处理论文的工作线程数 (默认: {PIPELINE_WORKERS})")
+    parser.add_argument("--daemon", action="store_true",
+                        help=f"以守护进程方式运行，每 {UPDATE_FREQUENCY} 小时增量获取一次新论文")
+    return parser.parse_args()
 
 def main():
     """主函数"""
+    args = parse_args()
     create_directories()
+    scheduler = build_scheduler()
     
-    # 立即运行一次
-    run_pipeline()
+    # 立即运行一次，从各来源的高水位线获取新论文，停机错过的区间拆分补抓
+    run_scheduled(scheduler, args.workers)
+    if not args.daemon:
+        return
     
     # 设置定时任务
-    schedule.every(UPDATE_FREQUENCY).hours.do(run_pipeline)
+    schedule.every(UPDATE_FREQUENCY).hours.do(run_scheduled, scheduler, args.workers)
     
     # 保持程序运行
-    while False:
+    while True:
         schedule.run_pending()
         time.sleep(60)
 
@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+class LLMResponseCache:
+    """基于SQLite的LLM响应缓存
+
+    以模型、领域、温度、系统提示词、用户提示词和最大token数的哈希作为键，
+    相同请求在重跑时直接返回缓存结果。超过有效期的条目会被删除，
+    超过条目数或容量上限时按最近访问时间淘汰（LRU）。
+    """
+
+    def __init__(self, db_path, ttl_days=30, max_entries=10000, max_size_mb=200):
+        self.db_path = db_path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.max_size = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_last_access ON llm_responses(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, domain, temperature, system_prompt, prompt, max_tokens):
+        """计算请求内容的哈希键"""
+        payload = json.dumps(
+            [model, domain, temperature, system_prompt, prompt, max_tokens],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """读取缓存，未命中或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        """写入缓存，并定期执行淘汰"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode('utf-8')), now, now)
+            )
+            self._conn.commit()
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 50:
+                self._evict()
+
+    def evict(self):
+        """立即执行过期清理和LRU淘汰"""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        self._puts_since_evict = 0
+        self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl,))
+
+        count, total_size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+        ).fetchone()
+        if count > self.max_entries or total_size > self.max_size:
+            # 按最近访问时间从旧到新删除，直到满足条目数和容量限制
+            removed_size = 0
+            removed_keys = []
+            for key, size in self._conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access ASC"):
+                if count - len(removed_keys) <= self.max_entries and total_size - removed_size <= self.max_size:
+                    break
+                removed_keys.append((key,))
+                removed_size += size
+            self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", removed_keys)
+        self._conn.commit()
+
+    def get_stats(self):
+        """返回命中统计"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        return {'entries': count, 'hits': self.hits, 'misses': self.misses}
@@ -5,6 +5,9 @@ import base64
 import hmac
 import json
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from datetime import datetime
 from time import mktime
@@ -16,8 +19,159 @@ from config import (
     XUNFEI_API_KEY,
     XUNFEI_API_SECRET,
     XUNFEI_DOMAIN,
-    XUNFEI_URL
+    XUNFEI_URL,
+    LLM_POOL_SIZE,
+    LLM_SIGNATURE_TTL,
+    LLM_CONNECTION_MAX_IDLE,
+    LLM_CACHE
 )
+from processors.llm_cache import LLMResponseCache
+from utils.metrics import count, timed
+
+# 请求失败时process_text返回的内容，调用方据此区分失败与模型的正常回复
+LLM_ERROR_RESPONSE = "无法生成内容，请检查API配置或重试。"
+
+class SparkConnectionPool:
+    """讯飞星火WebSocket连接池
+
+    预先建立并保持最多 size 个已鉴权的空闲连接，请求到来时直接取用，
+    省去每次请求的TLS与WebSocket握手。服务端关闭的连接会在后台补充。
+    同时进行的请求最多 size 个，超出的请求在acquire中等待其他请求归还连接。
+    """
+
+    def __init__(self, url_factory, size=LLM_POOL_SIZE, max_idle=LLM_CONNECTION_MAX_IDLE):
+        self.url_factory = url_factory
+        self.size = max(1, size)
+        self.max_idle = max_idle
+        self._idle = deque()  # (连接, 放入时间)
+        self._lock = threading.Lock()
+        # 并发请求名额，acquire时占用，release或discard时归还
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._refilling = False
+        self.metrics = {
+            'requests': 0,
+            'failures': 0,
+            'handshakes': 0,
+            'reused': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'total_latency': 0.0,
+            'started_at': time.time()
+        }
+
+    def connect(self):
+        """建立新的已鉴权连接"""
+        ws = websocket.create_connection(self.url_factory(), timeout=60)
+        with self._lock:
+            self.metrics['handshakes'] += 1
+        return ws
+
+    def acquire(self):
+        """占用一个并发名额并取出可用连接，返回 (连接, 是否为复用的预热连接)
+
+        已有 size 个请求在进行时阻塞等待。取得的连接必须通过release或discard归还。
+        """
+        self._slots.acquire()
+        try:
+            now = time.time()
+            with self._lock:
+                while self._idle:
+                    ws, idle_since = self._idle.popleft()
+                    if ws.connected and now - idle_since < self.max_idle:
+                        self.metrics['reused'] += 1
+                        return ws, True
+                    self._close(ws)
+            self.refill_async()
+            return self.connect(), False
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def reconnect(self, ws):
+        """关闭失效的连接并在同一并发名额内建立新连接"""
+        self._close(ws)
+        return self.connect()
+
+    def release(self, ws):
+        """归还连接和并发名额；服务端已关闭的连接直接丢弃，并在后台补充新连接"""
+        try:
+            with self._lock:
+                if ws.connected and len(self._idle) < self.size:
+                    self._idle.append((ws, time.time()))
+                    return
+            self._close(ws)
+            self.refill_async()
+        finally:
+            self._slots.release()
+
+    def discard(self, ws):
+        """丢弃出错的连接并归还并发名额"""
+        try:
+            self._close(ws)
+            self.refill_async()
+        finally:
+            self._slots.release()
+
+    def refill_async(self):
+        """在后台线程中将空闲连接补充到 size 个"""
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, daemon=True).start()
+
+    def _refill(self):
+        try:
+            while True:
+                with self._lock:
+                    if len(self._idle) >= self.size:
+                        return
+                try:
+                    ws = self.connect()
+                except Exception as e:
+                    print(f"预热LLM连接失败: {str(e)}")
+                    return
+                with self._lock:
+                    self._idle.append((ws, time.time()))
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def _close(self, ws):
+        try:
+            ws.close()
+        except Exception:
+            pass
+
+    def record(self, latency, usage=None, failed=False):
+        """记录一次请求的耗时与token用量"""
+        with self._lock:
+            self.metrics['requests'] += 1
+            self.metrics['total_latency'] += latency
+            if failed:
+                self.metrics['failures'] += 1
+            if usage:
+                self.metrics['prompt_tokens'] += usage.get('prompt_tokens', 0)
+                self.metrics['completion_tokens'] += usage.get('completion_tokens', 0)
+
+    def get_metrics(self):
+        """返回吞吐量等统计信息"""
+        with self._lock:
+            metrics = dict(self.metrics)
+            metrics['idle_connections'] = len(self._idle)
+        elapsed = max(time.time() - metrics.pop('started_at'), 1e-9)
+        requests_count = metrics['requests']
+        metrics['requests_per_minute'] = round(requests_count * 60 / elapsed, 2)
+        metrics['avg_latency'] = round(metrics['total_latency'] / requests_count, 3) if requests_count else 0.0
+        metrics['completion_tokens_per_second'] = round(metrics['completion_tokens'] / elapsed, 2)
+        metrics['total_latency'] = round(metrics['total_latency'], 3)
+        return metrics
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+_shared_cache = None
+
 
 class LLMProcessor:
     def __init__(self):
@@ -26,9 +180,48 @@ class LLMProcessor:
         self.api_secret = XUNFEI_API_SECRET
         self.domain = XUNFEI_DOMAIN
         self.spark_url = XUNFEI_URL
-        
+        self.temperature = 0.5
+        self.system_prompt = "您是一个专业科学编辑，擅长总结和分析科学论文。"
+        self._signed_url = None
+        self._signed_at = 0
+        self._url_lock = threading.Lock()
+        self.pool = self._get_pool()
+        self.cache = self._get_cache()
+    
+    def _get_pool(self):
+        """获取进程内共享的连接池，所有生成器共用同一组预热连接"""
+        global _shared_pool
+        with _shared_pool_lock:
+            if _shared_pool is None:
+                _shared_pool = SparkConnectionPool(self._create_url)
+            return _shared_pool
+    
+    def _get_cache(self):
+        """获取进程内共享的响应缓存，未启用时返回None"""
+        global _shared_cache
+        if not LLM_CACHE.get("enabled", False):
+            return None
+        with _shared_pool_lock:
+            if _shared_cache is None:
+                _shared_cache = LLMResponseCache(
+                    LLM_CACHE["path"],
+                    ttl_days=LLM_CACHE.get("ttl_days", 30),
+                    max_entries=LLM_CACHE.get("max_entries", 10000),
+                    max_size_mb=LLM_CACHE.get("max_size_mb", 200)
+                )
+            return _shared_cache
+    
     def _create_url(self):
-        """生成请求URL"""
+        """生成请求URL，签名在有效期内复用"""
+        with self._url_lock:
+            if self._signed_url and time.time() - self._signed_at < LLM_SIGNATURE_TTL:
+                return self._signed_url
+            self._signed_url = self._sign_url()
+            self._signed_at = time.time()
+            return self._signed_url
+    
+    def _sign_url(self):
+        """生成带鉴权签名的请求URL"""
         # 生成RFC1123格式的时间戳
         now = datetime.now()
         date = format_date_time(mktime(now.timetuple()))
@@ -63,68 +256,106 @@ class LLMProcessor:
         url = self.spark_url + '?' + urlencode(v)
         return url
 
-    def process_text(self, prompt, max_tokens=1000):
-        """使用讯飞星火处理文本"""
-        try:
-            response_text = []
-            
-            def on_message(ws, message):
-                data = json.loads(message)
-                code = data['header']['code']
-                if code != 0:
-                    print(f'请求错误: {code}, {data}')
-                    ws.close()
-                else:
-                    content = data['payload']['choices']['text'][0]['content']
-                    response_text.append(content)
-                    if data['header']['status'] == 2:
-                        ws.close()
-            
-            def on_error(ws, error):
-                print(f"错误: {error}")
-                ws.close()
-            
-            def on_close(ws, close_status_code, close_msg):
-                print("连接已关闭")
-            
-            def on_open(ws):
-                data = {
-                    "header": {
-                        "app_id": self.app_id,
-                        "uid": "12345"
-                    },
-                    "parameter": {
-                        "chat": {
-                            "domain": self.domain,
-                            "temperature": 0.5,
-                            "max_tokens": max_tokens
-                        }
-                    },
-                    "payload": {
-                        "message": {
-                            "text": [
-                                {"role": "system", "content": "您是一个专业科学编辑，擅长总结和分析科学论文。"},
-                                {"role": "user", "content": prompt}
-                            ]
-                        }
-                    }
+    def _build_request(self, prompt, max_tokens):
+        """构建请求数据"""
+        return {
+            "header": {
+                "app_id": self.app_id,
+                "uid": "12345"
+            },
+            "parameter": {
+                "chat": {
+                    "domain": self.domain,
+                    "temperature": self.temperature,
+                    "max_tokens": max_tokens
+                }
+            },
+            "payload": {
+                "message": {
+                    "text": [
+                        {"role": "system", "content": self.system_prompt},
+                        {"role": "user", "content": prompt}
+                    ]
                 }
-                ws.send(json.dumps(data))
+            }
+        }
+    
+    def _request(self, ws, prompt, max_tokens):
+        """在给定连接上发送请求并接收流式响应，返回 (文本, token用量)，服务端返回错误码时抛出异常"""
+        ws.send(json.dumps(self._build_request(prompt, max_tokens)))
+        
+        response_text = []
+        usage = None
+        while True:
+            data = json.loads(ws.recv())
+            code = data['header']['code']
+            if code != 0:
+                # 出错的连接不能归还连接池，已收到的部分内容也不能当作成功的响应
+                raise RuntimeError(f"请求错误: {code}, {data['header'].get('message', data)}")
             
-            # 创建WebSocket连接
-            ws = websocket.WebSocketApp(
-                self._create_url(),
-                on_message=on_message,
-                on_error=on_error,
-                on_close=on_close,
-                on_open=on_open
+            content = data['payload']['choices']['text'][0]['content']
+            response_text.append(content)
+            if data['header']['status'] == 2:
+                usage = data['payload'].get('usage', {}).get('text')
+                break
+        
+        return ''.join(response_text).strip(), usage
+    
+    @timed("llm_request")
+    def process_text(self, prompt, max_tokens=1000):
+        """使用讯飞星火处理文本，相同请求优先从缓存读取"""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = LLMResponseCache.make_key(
+                self.spark_url, self.domain, self.temperature, self.system_prompt, prompt, max_tokens
             )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                count("llm_cache_hits")
+                return cached
+        
+        start = time.time()
+        ws = None
+        try:
+            ws, reused = self.pool.acquire()
+            try:
+                text, usage = self._request(ws, prompt, max_tokens)
+            except (websocket.WebSocketConnectionClosedException, ConnectionError):
+                # 预热连接可能已被服务端关闭，换一个新连接重试一次
+                if not reused:
+                    raise
+                ws = self.pool.reconnect(ws)
+                text, usage = self._request(ws, prompt, max_tokens)
             
-            ws.run_forever()
+            self.pool.release(ws)
+            ws = None
+            self.pool.record(time.time() - start, usage)
+            if usage:
+                count("tokens_sent", usage.get('prompt_tokens', 0))
+                count("tokens_received", usage.get('completion_tokens', 0))
             
-            # 合并所有响应文本
-            return ''.join(response_text).strip()
+            # 只缓存成功的非空响应
+            if cache_key is not None and text:
+                self.cache.put(cache_key, text)
+            return text
             
         except Exception as e:
+            if ws is not None:
+                self.pool.discard(ws)
+            self.pool.record(time.time() - start, failed=True)
             print(f"LLM处理时出错: {str(e)}")
-            return "无法生成内容，请检查API配置或重试。"
\ No newline at end of file
+            return LLM_ERROR_RESPONSE
+    
+    def process_batch(self, prompts, max_tokens=1000):
+        """将多个提示词并发分配到连接池中处理，结果顺序与输入一致"""
+        if not prompts:
+            return []
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            return list(executor.map(lambda prompt: self.process_text(prompt, max_tokens), prompts))
+    
+    def get_metrics(self):
+        """返回连接池的吞吐量统计及缓存命中情况"""
+        metrics = self.pool.get_metrics()
+        if self.cache is not None:
+            metrics['cache'] = self.cache.get_stats()
+        return metrics
@@ -5,6 +5,7 @@ from urllib.parse import urlparse
 import PyPDF2
 from datetime import datetime
 from bs4 import BeautifulSoup
+from processors.pdf_downloader import get_download_manager, is_valid_pdf
 
 class ManualLinkProcessor:
     """处理手动指定的PDF链接，提取元数据"""
@@ -229,28 +230,18 @@ class ManualLinkProcessor:
             pdf_filename = f"{paper_id}.pdf"
             local_pdf_path = os.path.join(PDF_STORAGE_PATH, pdf_filename)
             
-            if os.path.exists(local_pdf_path):
+            if is_valid_pdf(local_pdf_path):
                 print(f"使用本地缓存的PDF文件: {local_pdf_path}")
                 temp_pdf_path = local_pdf_path
             else:
                 # 下载PDF
                 print(f"下载PDF文件: {pdf_url}")
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-                response = requests.get(pdf_url, headers=headers, stream=True)
+                temp_pdf_path = get_download_manager().download(pdf_url, local_pdf_path)
                 
-                if response.status_code != 200:
-                    print(f"无法下载PDF: {response.status_code}")
+                if not temp_pdf_path:
+                    print(f"无法下载PDF: {pdf_url}")
                     return self._create_fallback_metadata(pdf_url, paper_id)
                 
-                # 保存PDF文件
-                temp_pdf_path = os.path.join(PDF_STORAGE_PATH, pdf_filename)
-                os.makedirs(os.path.dirname(temp_pdf_path), exist_ok=True)
-                
-                with open(temp_pdf_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
                 print(f"PDF已保存到: {temp_pdf_path}")
             
             # 从PDF提取元数据
@@ -0,0 +1,227 @@
+import os
+import re
+import time
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+from config import PDF_DOWNLOAD
+from utils.http_session import create_session
+from utils.metrics import count
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+def has_pdf_header(path):
+    """检查文件是否以%PDF-开头"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(1024).lstrip().startswith(b'%PDF-')
+    except OSError:
+        return False
+
+
+def is_valid_pdf(path):
+    """检查文件是否为完整的PDF：以%PDF-开头，且末尾包含%%EOF标记"""
+    try:
+        size = os.path.getsize(path)
+        if size < 16 or not has_pdf_header(path):
+            return False
+        with open(path, 'rb') as f:
+            f.seek(max(0, size - 2048))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+
+def _validator_path(part_path):
+    """保存.part文件对应的服务器文件版本标识（ETag或Last-Modified）的路径"""
+    return part_path + ".validator"
+
+
+def _read_validator(part_path):
+    try:
+        with open(_validator_path(part_path), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _response_validator(response):
+    """响应的版本标识，If-Range只接受强ETag，没有时使用Last-Modified"""
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _remove_part(part_path, keep_data=False):
+    """删除.part文件及其版本标识，keep_data为True时只删除版本标识"""
+    paths = [_validator_path(part_path)] if keep_data else [part_path, _validator_path(part_path)]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class PDFDownloadManager:
+    """PDF下载管理器
+
+    - 复用带连接池的HTTP会话
+    - 限制每个主机的并发下载数
+    - 下载写入.part临时文件，中断后通过Range请求续传，并以If-Range确认服务器上的文件未变化
+    - 校验通过后原子重命名为最终文件，避免截断的PDF被当作缓存
+    - 按主机统计流量、带宽和首字节延迟
+    """
+
+    def __init__(self, per_host_limit=None, timeout=None, max_retries=None):
+        self.per_host_limit = max(1, per_host_limit or PDF_DOWNLOAD.get("per_host_limit", 2))
+        self.timeout = timeout or PDF_DOWNLOAD.get("timeout", 30)
+        self.max_retries = max_retries if max_retries is not None else PDF_DOWNLOAD.get("max_retries", 3)
+        self.session = create_session(PDF_DOWNLOAD.get("pool_size", 10), DEFAULT_HEADERS)
+        self._host_semaphores = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, host):
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_semaphores[host]
+
+    def _record(self, host, **values):
+        with self._lock:
+            stats = self._stats.setdefault(host, {
+                'downloads': 0, 'resumed': 0, 'failures': 0, 'bytes': 0,
+                'seconds': 0.0, 'latency_total': 0.0, 'requests': 0
+            })
+            for key, value in values.items():
+                stats[key] += value
+
+    def download(self, url, dest_path):
+        """下载PDF到指定路径
+
+        参数:
+            url (str): PDF地址
+            dest_path (str): 最终保存路径
+
+        返回:
+            str: 下载成功（或已存在完整文件）时返回保存路径，否则返回None
+        """
+        if os.path.exists(dest_path):
+            if is_valid_pdf(dest_path):
+                return dest_path
+            print(f"本地PDF文件不完整，重新下载: {dest_path}")
+            os.remove(dest_path)
+
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        host = urlparse(url).netloc
+        part_path = dest_path + ".part"
+
+        with self._host_semaphore(host):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if self._fetch(url, part_path, host):
+                        os.replace(part_path, dest_path)
+                        _remove_part(part_path, keep_data=True)
+                        self._record(host, downloads=1)
+                        return dest_path
+                    if not has_pdf_header(part_path):
+                        # 返回的内容根本不是PDF（例如HTML页面），重试无意义
+                        print(f"下载的内容不是PDF: {url}")
+                        _remove_part(part_path)
+                        break
+                    # 有PDF文件头但缺少结尾，保留.part文件以便续传
+                    print(f"PDF文件不完整，将尝试续传: {url}")
+                except requests.exceptions.RequestException as e:
+                    print(f"下载PDF失败（第 {attempt + 1} 次）: {str(e)}")
+                if attempt < self.max_retries:
+                    time.sleep(min(2 ** attempt, 30))
+
+        self._record(host, failures=1)
+        return None
+
+    def _fetch(self, url, part_path, host):
+        """下载到.part文件，已有部分内容时通过Range请求续传，返回文件是否为完整PDF
+
+        续传请求带有首次响应的ETag或Last-Modified（If-Range），服务器上的文件已变化时
+        服务器返回完整的200响应，从头写入，避免把两个版本的内容拼接在一起。
+        """
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validator = _read_validator(part_path) if offset else None
+        if offset and not validator:
+            # 没有版本标识时无法确认已下载的部分仍然有效，从头下载
+            _remove_part(part_path)
+            offset = 0
+        headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset else {}
+
+        start = time.time()
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            latency = time.time() - start
+            self._record(host, requests=1, latency_total=latency)
+
+            if response.status_code == 416:
+                # 请求范围超出文件大小：.part已完整，或者服务器上的文件已变化（例如新版本更短）
+                if is_valid_pdf(part_path):
+                    return True
+                print(f"续传位置超出文件大小，从头重新下载: {url}")
+                _remove_part(part_path)
+                # .part已删除，重新请求不带Range，不会再次返回416
+                return self._fetch(url, part_path, host)
+            response.raise_for_status()
+
+            if offset and response.status_code == 206:
+                range_match = re.match(r'bytes (\d+)-', response.headers.get("Content-Range", ""))
+                if not range_match or int(range_match.group(1)) != offset:
+                    print(f"服务器返回的续传范围与请求不符，从头重新下载: {url}")
+                    _remove_part(part_path)
+                    return self._fetch(url, part_path, host)
+                mode = "ab"
+                self._record(host, resumed=1)
+            else:
+                # 服务器不支持Range或文件已变化（If-Range不匹配）时从头下载，并记录新的版本标识
+                mode = "wb"
+                new_validator = _response_validator(response)
+                if new_validator:
+                    with open(_validator_path(part_path), 'w', encoding='utf-8') as f:
+                        f.write(new_validator)
+                else:
+                    _remove_part(part_path, keep_data=True)
+
+            received = 0
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    if chunk:
+                        f.write(chunk)
+                        received += len(chunk)
+
+        self._record(host, bytes=received, seconds=time.time() - start)
+        count("bytes_downloaded", received, host=host)
+        return is_valid_pdf(part_path)
+
+    def get_stats(self):
+        """返回按主机统计的下载信息"""
+        with self._lock:
+            stats = {host: dict(values) for host, values in self._stats.items()}
+        for values in stats.values():
+            values['bandwidth_kbps'] = round(values['bytes'] / 1024 / values['seconds'], 1) if values['seconds'] else 0.0
+            values['avg_latency'] = round(values['latency_total'] / values['requests'], 3) if values['requests'] else 0.0
+        return stats
+
+
+_shared_manager = None
+_shared_manager_lock = threading.Lock()
+
+
+def get_download_manager():
+    """获取进程内共享的下载管理器"""
+    global _shared_manager
+    with _shared_manager_lock:
+        if _shared_manager is None:
+            _shared_manager = PDFDownloadManager()
+        return _shared_manager
@@ -1,21 +1,216 @@
 import os
-import requests
+import re
 import PyPDF2
 import fitz  # PyMuPDF
 from PIL import Image
 import io
 import hashlib
-from config import PDF_STORAGE_PATH
+import threading
+from processors.pdf_downloader import get_download_manager, is_valid_pdf
+from utils.metrics import span, timed, count
+from utils.image_store import get_image_store
+from utils.storage_manager import get_storage_manager
+from utils.paper_index import paper_key
+from config import PDF_STORAGE_PATH, PAGE_IMAGE_DPI, PAGE_THUMBNAIL_SIZE, PDF_TEXT_MAX_CHARS, IMAGE_STORE
+
+# 常见章节标题，"references"之后的内容不再解析
+SECTION_HEADINGS = {
+    'abstract': r'abstract|summary',
+    'introduction': r'introduction|background',
+    'methods': r'methods?|materials\s+and\s+methods|methodology|experimental\s+procedures',
+    'results': r'results(?:\s+and\s+discussion)?',
+    'discussion': r'discussion',
+    'conclusion': r'conclusions?|concluding\s+remarks',
+    'references': r'references|bibliography',
+}
+_HEADING_PATTERN = re.compile(
+    r'^\s*(?:\d+(?:\.\d+)*\.?|[IVX]+\.)?\s*(?:'
+    + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in SECTION_HEADINGS.items())
+    + r')\s*[:.]?\s*$',
+    re.IGNORECASE
+)
+_INLINE_ABSTRACT_PATTERN = re.compile(r'^\s*abstract\s*[:.\-—]\s*(.+)$', re.IGNORECASE)
+
+# 页眉页脚中常见的固定文本：页码、预印本平台水印、版权声明等
+_BOILERPLATE_PATTERN = re.compile(
+    r'^\s*(?:\d{1,4}|page\s+\d+(?:\s+of\s+\d+)?|\d+\s*/\s*\d+)\s*$'
+    r'|arxiv:\d{4}\.\d{4,5}(?:v\d+)?\s*\['
+    r'|(?:bio|med)rxiv\s+preprint'
+    r'|this\s+version\s+posted'
+    r'|copyright\s+holder\s+for\s+this\s+preprint'
+    r'|(?:under\s+review|preprint\.)\s*$',
+    re.IGNORECASE
+)
+# 作者单位与联系方式，只在标题之前的内容中剔除
+_AFFILIATION_PATTERN = re.compile(
+    r'[\w.+-]+@[\w-]+\.[\w.-]+'
+    r'|\b(?:universit(?:y|ät|é)|institute|department|dept\.|laborator(?:y|ies)|school\s+of|college|'
+    r'hospital|academy|centre|center\s+for|corresponding\s+author|equal\s+contribution)\b',
+    re.IGNORECASE
+)
+_DIGITS_PATTERN = re.compile(r'\d+')
+
+
+def _normalize_repeated_line(line):
+    """归一化页眉页脚候选行，使只有页码不同的行被视为同一行"""
+    return _DIGITS_PATTERN.sub('#', line.strip().lower())
+
+
+def _is_boilerplate_line(line):
+    """判断一行是否为页码、平台水印等与内容无关的文本"""
+    return bool(_BOILERPLATE_PATTERN.search(line))
+
+
+def _match_section_heading(line):
+    """判断一行文本是否为章节标题，返回章节名或None"""
+    if len(line) > 60:
+        return None
+    match = _HEADING_PATTERN.match(line)
+    if match:
+        return match.lastgroup
+    return None
+
+
+class PageImageProvider:
+    """按需渲染的PDF页面图像列表
+
+    行为类似图像路径列表（支持len、下标、切片和迭代），但只有在访问某一页时
+    才会渲染该页。图像保存在共享的页面图像存储中，已渲染的页面通过清单直接复用。
+    """
+    
+    def __init__(self, pdf_path, owner, dpi=PAGE_IMAGE_DPI, thumbnail_size=PAGE_THUMBNAIL_SIZE):
+        self.pdf_path = pdf_path
+        self.owner = owner
+        self.dpi = dpi
+        self.thumbnail_size = thumbnail_size
+        self._page_count = None
+        self._doc = None
+        self._lock = threading.Lock()
+    
+    @property
+    def page_variant(self):
+        return f"{self.dpi}dpi"
+    
+    @property
+    def thumbnail_variant(self):
+        width, height = self.thumbnail_size
+        return f"thumb_{width}x{height}"
+    
+    def document(self):
+        """返回已打开的fitz文档，文本提取与页面渲染共用同一个文档对象"""
+        with self._lock:
+            return self._open()
+    
+    def __getstate__(self):
+        # 打开的文档和锁不能跨进程传递，在目标进程中按需重新创建
+        state = self.__dict__.copy()
+        state['_doc'] = None
+        state['_lock'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def _open(self):
+        if self._doc is None:
+            self._doc = fitz.open(self.pdf_path)
+        return self._doc
+    
+    def __len__(self):
+        if self._page_count is None:
+            try:
+                with self._lock:
+                    self._page_count = len(self._open())
+            except Exception as e:
+                print(f"读取PDF页数时出错: {str(e)}")
+                self._page_count = 0
+        return self._page_count
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("页面索引超出范围")
+        return self.render(index)
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.render(index)
+    
+    def page_path(self, index):
+        """返回已渲染的页面图像路径，尚未渲染时返回None（不触发渲染）"""
+        return get_image_store().get(self.owner, index, self.page_variant)
+    
+    def thumbnail_path(self, index):
+        """返回已渲染的页面缩略图路径，尚未渲染时返回None（不触发渲染）"""
+        return get_image_store().get(self.owner, index, self.thumbnail_variant)
+    
+    def rendered_pages(self):
+        """返回已经渲染过的页面图像（清单条目，按页码排列）"""
+        return get_image_store().list(self.owner, self.page_variant)
+    
+    def is_shared(self, index, min_owners=3):
+        """页面图像是否与至少min_owners篇论文的页面完全相同（期刊封面、许可声明等），尚未渲染时返回False
+
+        同一论文的不同版本可能有相同的首页，因此只被两篇论文共用的页面不视为通用页面。
+        """
+        return any(entry['page'] == index and entry['owners'] >= min_owners for entry in self.rendered_pages())
+    
+    def _save_pixmap(self, index, variant, pix):
+        mode = "RGBA" if pix.alpha else "RGB"
+        return get_image_store().put(self.owner, index, variant, mode, (pix.width, pix.height), pix.samples)
+    
+    def render(self, index):
+        """渲染指定页面（从0开始计数），已存在时直接返回路径"""
+        page_image_path = self.page_path(index)
+        if page_image_path:
+            return page_image_path
+        
+        zoom = self.dpi / 72
+        with self._lock, span("extract_images"):
+            pix = self._open()[index].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            page_image_path = self._save_pixmap(index, self.page_variant, pix)
+        count("pages_rendered")
+        print(f"已保存第 {index + 1} 页图像: {page_image_path}")
+        return page_image_path
+    
+    def thumbnail(self, index):
+        """渲染指定页面的缩略图，缩放至不超过配置的缩略图尺寸；未启用缩略图时返回页面图像"""
+        if not IMAGE_STORE.get("thumbnails", True):
+            return self.render(index)
+        thumbnail_path = self.thumbnail_path(index)
+        if thumbnail_path:
+            return thumbnail_path
+        
+        width, height = self.thumbnail_size
+        with self._lock:
+            page = self._open()[index]
+            zoom = min(width / page.rect.width, height / page.rect.height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            return self._save_pixmap(index, self.thumbnail_variant, pix)
+    
+    def close(self):
+        """关闭打开的PDF文档"""
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
 
 class PDFProcessor:
     def __init__(self):
         self.storage_path = PDF_STORAGE_PATH
     
+    @timed("download")
     def download_pdf(self, paper):
         """下载论文PDF"""
         # 检查是否已有本地缓存
-        if "local_pdf_path" in paper and paper["local_pdf_path"] and os.path.exists(paper["local_pdf_path"]):
+        if "local_pdf_path" in paper and paper["local_pdf_path"] and is_valid_pdf(paper["local_pdf_path"]):
             print(f"使用本地缓存的PDF文件: {paper['local_pdf_path']}")
+            # 用户提供的文件不计入配额，只登记别名以保护其页面图像
+            self._register_owner(paper, paper["local_pdf_path"])
             return paper["local_pdf_path"]
         
         # 如果没有缓存，则下载PDF
@@ -25,7 +220,6 @@ class PDFProcessor:
         # 处理arXiv URL，确保获取正确的ID
         if "arxiv.org" in pdf_url:
             # 从URL中提取arXiv ID
-            import re
             arxiv_id_match = re.search(r'(\d+\.\d+)(v\d+)?', pdf_url)
             if arxiv_id_match:
                 arxiv_id = arxiv_id_match.group(1)
@@ -37,88 +231,144 @@ class PDFProcessor:
         pdf_filename = f"{paper_id.replace('/', '_').replace(':', '_')}.pdf"
         pdf_path = os.path.join(PDF_STORAGE_PATH, pdf_filename)
         
-        # 如果文件已存在，直接返回路径
-        if os.path.exists(pdf_path):
+        # 如果完整的文件已存在，直接返回路径（截断的文件会被重新下载）
+        if is_valid_pdf(pdf_path):
             print(f"PDF文件已存在: {pdf_path}")
+            self._register_owner(paper, pdf_path, record=True)
             return pdf_path
         
-        # 下载PDF
+        # 下载PDF（支持断点续传和完整性校验）
         print(f"下载PDF: {pdf_url}")
         try:
-            # 设置请求头
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            
-            # 发送请求
-            response = requests.get(pdf_url, headers=headers, stream=True)
-            response.raise_for_status()
-            
-            # 保存PDF
-            with open(pdf_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            print(f"PDF下载完成: {pdf_path}")
-            return pdf_path
+            downloaded_path = get_download_manager().download(pdf_url, pdf_path)
+            if downloaded_path:
+                print(f"PDF下载完成: {pdf_path}")
+                self._register_owner(paper, downloaded_path, record=True)
+            return downloaded_path
         
         except Exception as e:
             print(f"下载PDF时出错: {str(e)}")
             return None
     
-    def extract_content(self, pdf_path):
-        """提取PDF文本内容"""
-        text = ""
+    def _register_owner(self, paper, pdf_path, record=False):
+        """在存储清单中登记PDF及其所属论文，页面图像以PDF文件名作为所属论文的别名"""
+        key = paper_key(paper)[0]
+        storage = get_storage_manager()
+        storage.alias(os.path.basename(pdf_path).replace('.pdf', ''), key)
+        if record:
+            storage.record(pdf_path, "pdf", key)
+    
+    def iter_page_text(self, pdf_path, document=None):
+        """逐页产生PDF文本，调用方停止迭代后不再解析剩余页面
+        
+        参数:
+            pdf_path (str): PDF文件路径
+            document (fitz.Document, optional): 已打开的文档，传入时直接复用
+        """
+        doc = document if document is not None else fitz.open(pdf_path)
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(reader.pages)):
-                    page = reader.pages[page_num]
-                    text += page.extract_text() + "\n"
-            return text
-        except Exception as e:
-            print(f"提取PDF文本时出错: {str(e)}")
-            return ""
+            for page in doc:
+                yield page.get_text("text")
+        finally:
+            if document is None:
+                doc.close()
     
-    def extract_images(self, pdf_path):
-        """从PDF中提取每一页作为图片"""
-        # 从PDF路径中获取论文ID
-        pdf_name = os.path.basename(pdf_path)
-        paper_id = pdf_name.replace('.pdf', '')
+    @timed("extract_content")
+    def extract_structured_content(self, pdf_path, max_chars=PDF_TEXT_MAX_CHARS, document=None):
+        """单次遍历提取PDF文本并按章节切分
         
-        # 在images目录下创建以论文ID命名的子目录
-        output_dir = os.path.join(os.path.dirname(pdf_path), "images", paper_id)
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        达到字符预算或遇到参考文献章节时停止解析后续页面。章节文本中会剔除
+        页码、预印本水印、每页重复的页眉页脚以及标题前的作者单位信息。
         
-        # 提取图片
-        images = []
+        参数:
+            pdf_path (str): PDF文件路径
+            max_chars (int): 最多提取的字符数，None表示不限制
+            document (fitz.Document, optional): 已打开的文档，传入时直接复用
+            
+        返回:
+            dict: 包含text（按页拼接的文本）、sections（章节名到文本的映射，
+                  标题之前的内容归入front_matter）、pages_read和truncated
+        """
+        page_texts = []
+        section_lines = {'front_matter': []}
+        current_section = 'front_matter'
+        total_chars = 0
+        pages_read = 0
+        truncated = False
+        # 统计短行出现的页数，用于识别每页重复的页眉页脚
+        line_page_counts = {}
         
-        try:
-            # 使用PyMuPDF提取整页图像
-            doc = fitz.open(pdf_path)
+        for page_text in self.iter_page_text(pdf_path, document):
+            pages_read += 1
+            if max_chars is not None and total_chars + len(page_text) > max_chars:
+                page_text = page_text[:max_chars - total_chars]
+                truncated = True
+            page_texts.append(page_text)
+            total_chars += len(page_text)
             
-            for page_index in range(len(doc)):
-                page = doc[page_index]
+            for normalized in {_normalize_repeated_line(line) for line in page_text.splitlines() if len(line) <= 100}:
+                line_page_counts[normalized] = line_page_counts.get(normalized, 0) + 1
+            
+            for line in page_text.splitlines():
+                if _is_boilerplate_line(line):
+                    continue
+                if current_section == 'front_matter' and _AFFILIATION_PATTERN.search(line):
+                    continue
                 
-                # 将页面渲染为高质量图像
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x缩放以获得更好的质量
-                page_image_filename = f"page_{page_index + 1}.png"
-                page_image_path = os.path.join(output_dir, page_image_filename)
+                heading = _match_section_heading(line)
+                if heading:
+                    current_section = heading
+                    section_lines.setdefault(current_section, [])
+                    continue
                 
-                # 保存图像
-                pix.save(page_image_path)
-                images.append(page_image_path)
+                inline_abstract = _INLINE_ABSTRACT_PATTERN.match(line)
+                if inline_abstract and 'abstract' not in section_lines:
+                    current_section = 'abstract'
+                    section_lines[current_section] = [inline_abstract.group(1)]
+                    continue
                 
-                print(f"已保存第 {page_index + 1} 页图像: {page_image_path}")
-            
-            doc.close()
+                if current_section == 'references':
+                    break
+                section_lines[current_section].append(line)
             
-        except Exception as e:
-            print(f"提取PDF页面图像时出错: {str(e)}")
+            if truncated or current_section == 'references':
+                break
+        
+        # 在至少一半页面（且不少于3页）上重复出现的行视为页眉页脚
+        repeated = set()
+        if pages_read >= 3:
+            threshold = max(3, pages_read // 2)
+            repeated = {line for line, count in line_page_counts.items() if line and count >= threshold}
         
-        return images
+        count("pages_parsed", pages_read)
+        sections = {}
+        for name, lines in section_lines.items():
+            if name == 'references':
+                continue
+            lines = [line for line in lines if _normalize_repeated_line(line) not in repeated]
+            if any(line.strip() for line in lines):
+                sections[name] = "\n".join(lines).strip()
+        return {
+            'text': "\n".join(page_texts),
+            'sections': sections,
+            'pages_read': pages_read,
+            'truncated': truncated
+        }
+    
+    def extract_content(self, pdf_path, max_chars=PDF_TEXT_MAX_CHARS, document=None):
+        """提取PDF文本内容，达到字符预算后停止解析"""
+        try:
+            return self.extract_structured_content(pdf_path, max_chars, document)['text']
+        except Exception as e:
+            print(f"提取PDF文本时出错: {str(e)}")
+            return ""
+    
+    def extract_images(self, pdf_path):
+        """返回PDF页面图像列表，页面在首次访问时才渲染为图片"""
+        # 从PDF路径中获取论文ID，作为图像清单中的所属论文
+        pdf_name = os.path.basename(pdf_path)
+        paper_id = pdf_name.replace('.pdf', '')
+        return PageImageProvider(pdf_path, paper_id)
     
     def get_metadata(self, pdf_path):
         """获取PDF元数据"""
@@ -0,0 +1,245 @@
+import os
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+import config
+from config import PIPELINE_WORKERS
+from utils.metrics import get_metrics
+
+
+def _config_snapshot():
+    """返回主进程当前的全部配置项（运行时可能被修改，例如基准测试把存储路径指向临时目录）"""
+    return {name: getattr(config, name) for name in dir(config) if name.isupper()}
+
+
+def _init_worker(settings):
+    """子进程启动时应用主进程的配置，之后导入的模块读取到与主进程相同的配置"""
+    for name, value in settings.items():
+        setattr(config, name, value)
+
+
+def _new_process_pool(max_workers):
+    """创建以spawn方式启动子进程的进程池
+
+    fork出的子进程会继承父进程中其他线程持有的锁和SQLite的文件锁状态，下载线程写入
+    存储清单时fork出的子进程再打开同一数据库会死锁或报"database is locked"。
+    spawn启动的子进程是全新的解释器，由initializer应用主进程的配置。
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(_config_snapshot(),))
+
+
+def _extract_pdf(pdf_processor, pdf_path, thumbnails=0):
+    """在子进程中提取PDF文本并渲染审核用的缩略图（CPU密集型操作），其余页面图像在访问时才渲染
+
+    文本提取复用页面图像列表已打开的文档，整个PDF只解析一次。
+    子进程中记录的指标随结果一起返回，由主进程合并。
+    """
+    metrics = get_metrics()
+    metrics.reset()
+    pdf_images = pdf_processor.extract_images(pdf_path)
+    thumbnail_paths = []
+    try:
+        content = pdf_processor.extract_structured_content(pdf_path, document=pdf_images.document())
+        for index in range(min(thumbnails, len(pdf_images))):
+            thumbnail_paths.append(pdf_images.thumbnail(index))
+    except Exception as e:
+        print(f"提取PDF文本时出错: {str(e)}")
+        content = {'text': "", 'sections': {}}
+    finally:
+        pdf_images.close()
+    return content, pdf_images, thumbnail_paths, metrics.snapshot()
+
+
+class StagedExecutor:
+    """分阶段并发执行器
+
+    - 下载与LLM调用等I/O密集型任务使用有界线程池
+    - PDF文本提取与页面渲染等CPU密集型任务使用进程池
+    - 每篇论文的错误相互隔离，结果按输入顺序返回
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or PIPELINE_WORKERS)
+        # 进程数不超过CPU核数，避免渲染任务相互争抢
+        self.process_workers = max(1, min(self.workers, os.cpu_count() or 1))
+
+    def _new_result(self, paper):
+        """创建单篇论文的处理结果记录"""
+        return {
+            'paper': paper,
+            'status': 'pending',
+            'pdf_path': None,
+            'pdf_content': "",
+            'pdf_sections': {},
+            'pdf_images': [],
+            'thumbnails': [],
+            'evaluation': None,
+            'summary': None,
+            'social_post': None,
+            'error': None
+        }
+
+    def triage(self, papers, summary_generator, paper_index):
+        """在下载PDF之前仅根据论文元数据评估价值
+
+        已有评估结论的论文直接复用索引中的结论，其余论文分批并发评估，
+        结论写入论文索引，之后的运行不会重复评估。请求失败或没有明确结论的默认评估
+        不写入索引，论文保持待处理，下一次运行重新评估。
+
+        返回:
+            tuple: (通过评估的论文列表, 对应的评估结果列表, 未通过评估的(论文, 评估结果)列表)
+        """
+        evaluations = [None] * len(papers)
+        to_evaluate = []
+        for index, paper in enumerate(papers):
+            record = paper_index.get_record(paper)
+            detail = record['detail'] if record else None
+            if detail and 'is_valuable' in detail:
+                evaluations[index] = {'is_valuable': detail['is_valuable'], 'evaluation': detail['evaluation']}
+            else:
+                to_evaluate.append(index)
+
+        print(f"分诊评估: {len(papers) - len(to_evaluate)} 篇复用已有结论，{len(to_evaluate)} 篇需要评估")
+        new_evaluations = summary_generator.triage_papers([papers[i] for i in to_evaluate], self.workers)
+
+        for index, evaluation in zip(to_evaluate, new_evaluations):
+            evaluations[index] = evaluation
+            paper = papers[index]
+            if evaluation.get('defaulted'):
+                continue
+            detail = {'is_valuable': evaluation['is_valuable'], 'evaluation': evaluation['evaluation']}
+            if evaluation['is_valuable']:
+                paper_index.mark(paper, "evaluated", detail)
+            else:
+                paper_index.mark(paper, "skipped", dict(detail, reason='evaluation'))
+                summary_generator.save_evaluation(paper, evaluation)
+
+        accepted, accepted_evaluations, rejected = [], [], []
+        for paper, evaluation in zip(papers, evaluations):
+            if evaluation['is_valuable']:
+                accepted.append(paper)
+                accepted_evaluations.append(evaluation)
+            else:
+                rejected.append((paper, evaluation))
+        return accepted, accepted_evaluations, rejected
+
+    def prepare(self, papers, pdf_processor, evaluations=None, thumbnails=0, paper_index=None):
+        """并发下载并提取所有论文的PDF，返回与输入顺序一致的结果列表
+
+        下载完成的论文会立即提交到进程池提取，下载与提取以流水线方式重叠进行。
+        thumbnails指定每篇论文预先渲染的审核缩略图页数。
+        提供paper_index时，下载成功的论文记录为downloaded阶段。
+        """
+        results = [self._new_result(paper) for paper in papers]
+        for result, evaluation in zip(results, evaluations or []):
+            result['evaluation'] = evaluation
+        if not papers:
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.workers) as io_pool, \
+                _new_process_pool(self.process_workers) as cpu_pool:
+            download_futures = {
+                io_pool.submit(pdf_processor.download_pdf, paper): index
+                for index, paper in enumerate(papers)
+            }
+
+            extract_futures = {}
+            for future in as_completed(download_futures):
+                index = download_futures[future]
+                result = results[index]
+                try:
+                    pdf_path = future.result()
+                except Exception as e:
+                    result['status'] = 'failed'
+                    result['error'] = f"下载PDF时出错: {str(e)}"
+                    continue
+
+                if not pdf_path:
+                    result['status'] = 'failed'
+                    result['error'] = "PDF下载失败"
+                    continue
+
+                result['pdf_path'] = pdf_path
+                if paper_index is not None:
+                    paper_index.mark(result['paper'], "downloaded")
+                extract_futures[cpu_pool.submit(_extract_pdf, pdf_processor, pdf_path, thumbnails)] = index
+
+            for future in as_completed(extract_futures):
+                result = results[extract_futures[future]]
+                try:
+                    content, result['pdf_images'], result['thumbnails'], metrics_snapshot = future.result()
+                    get_metrics().merge(metrics_snapshot)
+                    result['pdf_content'] = content['text']
+                    result['pdf_sections'] = content['sections']
+                    result['status'] = 'prepared'
+                except Exception as e:
+                    result['status'] = 'failed'
+                    result['error'] = f"提取PDF内容时出错: {str(e)}"
+
+        return results
+
+    def _generate_one(self, result, summary_generator, social_post_generator):
+        """为单篇论文生成综述和社交媒体文案"""
+        paper = result['paper']
+        summary = summary_generator.generate_summary(
+            paper, result['pdf_content'], result['pdf_sections'], result['evaluation']
+        )
+
+        # 评估未通过时generate_summary返回None
+        if summary is None:
+            result['status'] = 'rejected'
+            return result
+
+        result['summary'] = summary
+        result['social_post'] = social_post_generator.generate_post(paper, summary, result['pdf_images'])
+        result['status'] = 'completed'
+        return result
+
+    def resume(self, entry, pdf_processor):
+        """由审核队列中的条目恢复为已准备好的论文结果"""
+        result = self._new_result(entry['paper'])
+        result.update(
+            status='prepared',
+            pdf_path=entry['pdf_path'],
+            pdf_content=entry['pdf_content'] or "",
+            pdf_sections=entry['pdf_sections'] or {},
+            thumbnails=entry['thumbnails'] or [],
+            evaluation=entry['evaluation']
+        )
+        if entry['pdf_path'] and os.path.exists(entry['pdf_path']):
+            result['pdf_images'] = pdf_processor.extract_images(entry['pdf_path'])
+        return result
+
+    def generate(self, results, summary_generator, social_post_generator):
+        """并发执行LLM相关阶段，结果原地更新并按输入顺序返回"""
+        return self.generate_stream([results], summary_generator, social_post_generator)
+
+    def generate_stream(self, result_batches, summary_generator, social_post_generator):
+        """并发执行LLM相关阶段，论文分批陆续到达
+
+        每批论文到达后立即提交到线程池，不必等待后续批次，
+        适合边审核边生成的场景。标题卡片与LLM请求同时在进程池中批量渲染。
+        结果原地更新并按到达顺序返回。
+
+        参数:
+            result_batches (iterable): 逐批产生论文结果列表的可迭代对象
+        """
+        results = []
+        with ThreadPoolExecutor(max_workers=self.workers) as io_pool, \
+                _new_process_pool(self.process_workers) as cpu_pool:
+            futures = {}
+            for batch in result_batches:
+                social_post_generator.prerender_title_cards([result['paper'] for result in batch], cpu_pool)
+                for result in batch:
+                    results.append(result)
+                    futures[io_pool.submit(self._generate_one, result, summary_generator, social_post_generator)] = result
+            for future in as_completed(futures):
+                result = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    result['status'] = 'failed'
+                    result['error'] = f"生成内容时出错: {str(e)}"
+
+        return results
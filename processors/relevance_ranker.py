@@ -0,0 +1,184 @@
+import re
+import time
+import logging
+
+import numpy as np
+
+from config import RELEVANCE_RANKER
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9\-]+')
+_STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having here how however i
+if in into is it its itself just more most no nor not of off on once only or other our out over own same she should
+so some such than that the their them then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your using based show shows shown paper study
+propose proposed results approach method methods new
+""".split())
+
+
+def _tokenize(text):
+    """将文本切分为小写英文词，去除停用词"""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def _paper_tokens(paper):
+    """论文的词序列，标题重复一次以提高标题词的权重"""
+    title = paper.get('title', '') or ''
+    abstract = paper.get('abstract', '') or ''
+    return _tokenize(f"{title} {title} {abstract}")
+
+
+class RelevanceRanker:
+    """基于BM25加权向量的本地相关性排序器
+
+    用历史上通过评估（已生成综述）和未通过评估的论文训练正负类中心，
+    候选论文的得分为与正类中心的余弦相似度减去与负类中心的相似度。
+    打分只涉及NumPy向量运算，数千篇论文可在毫秒级完成，
+    只有排名靠前或处于边界附近的论文才交给LLM评估。
+    """
+
+    def __init__(self, k1=None, b=None):
+        self.k1 = k1 if k1 is not None else RELEVANCE_RANKER.get("k1", 1.5)
+        self.b = b if b is not None else RELEVANCE_RANKER.get("b", 0.75)
+        self.vocabulary = {}
+        self.idf = None
+        self.avg_length = 0.0
+        self.positive_centroid = None
+        self.negative_centroid = None
+        self.trained = False
+        self.stats = {'positives': 0, 'negatives': 0}
+
+    def _vectorize(self, token_lists):
+        """将多篇文档转换为稀疏BM25向量（已按文档做L2归一化）
+
+        返回:
+            tuple: (文档下标数组, 词下标数组, 权重数组)
+        """
+        doc_indices, term_indices, counts, lengths = [], [], [], []
+        for doc_index, tokens in enumerate(token_lists):
+            lengths.append(len(tokens))
+            term_counts = {}
+            for token in tokens:
+                term = self.vocabulary.get(token)
+                if term is not None:
+                    term_counts[term] = term_counts.get(term, 0) + 1
+            doc_indices.extend([doc_index] * len(term_counts))
+            term_indices.extend(term_counts.keys())
+            counts.extend(term_counts.values())
+
+        doc_indices = np.asarray(doc_indices, dtype=np.int64)
+        term_indices = np.asarray(term_indices, dtype=np.int64)
+        tf = np.asarray(counts, dtype=np.float64)
+        if not len(tf):
+            return doc_indices, term_indices, tf
+
+        doc_lengths = np.asarray(lengths, dtype=np.float64)[doc_indices]
+        normalizer = self.k1 * (1 - self.b + self.b * doc_lengths / max(self.avg_length, 1.0))
+        weights = self.idf[term_indices] * tf * (self.k1 + 1) / (tf + normalizer)
+
+        norms = np.sqrt(np.bincount(doc_indices, weights=weights ** 2, minlength=len(token_lists)))
+        weights = weights / np.maximum(norms[doc_indices], 1e-12)
+        return doc_indices, term_indices, weights
+
+    def _centroid(self, token_lists):
+        """计算一组文档的归一化中心向量"""
+        doc_indices, term_indices, weights = self._vectorize(token_lists)
+        centroid = np.bincount(term_indices, weights=weights, minlength=len(self.vocabulary))
+        norm = np.linalg.norm(centroid)
+        return centroid / norm if norm else centroid
+
+    def fit(self, positives, negatives):
+        """用通过评估的论文和被跳过的论文训练排序器
+
+        参数:
+            positives (list): 通过评估的论文数据列表
+            negatives (list): 被跳过的论文数据列表
+        """
+        positive_tokens = [_paper_tokens(paper) for paper in positives]
+        negative_tokens = [_paper_tokens(paper) for paper in negatives]
+        all_tokens = positive_tokens + negative_tokens
+        self.stats = {'positives': len(positives), 'negatives': len(negatives)}
+        if not positive_tokens:
+            self.trained = False
+            return self
+
+        document_frequency = {}
+        for tokens in all_tokens:
+            for token in set(tokens):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        self.vocabulary = {token: index for index, token in enumerate(document_frequency)}
+        df = np.fromiter(document_frequency.values(), dtype=np.float64, count=len(document_frequency))
+        self.idf = np.log(1 + (len(all_tokens) - df + 0.5) / (df + 0.5))
+        self.avg_length = float(np.mean([len(tokens) for tokens in all_tokens]))
+
+        self.positive_centroid = self._centroid(positive_tokens)
+        self.negative_centroid = self._centroid(negative_tokens) if negative_tokens else None
+        self.trained = True
+        return self
+
+    def score(self, papers):
+        """计算候选论文的相关性得分，返回与输入顺序一致的NumPy数组"""
+        if not self.trained or not papers:
+            return np.zeros(len(papers))
+
+        doc_indices, term_indices, weights = self._vectorize([_paper_tokens(paper) for paper in papers])
+        scores = np.bincount(doc_indices, weights=weights * self.positive_centroid[term_indices],
+                             minlength=len(papers))
+        if self.negative_centroid is not None:
+            scores -= np.bincount(doc_indices, weights=weights * self.negative_centroid[term_indices],
+                                  minlength=len(papers))
+        return scores
+
+    def select(self, papers, top_k=None, margin=None):
+        """选出需要交给LLM评估的论文
+
+        排名前top_k的论文，以及得分与第top_k名相差不超过margin的边界论文会被选中，
+        其余论文直接判定为不相关。排序器未训练时全部选中。
+
+        返回:
+            tuple: (选中的论文列表, 未选中的(论文, 得分)列表)，两者均保持输入顺序
+        """
+        top_k = top_k if top_k is not None else RELEVANCE_RANKER.get("top_k", 50)
+        margin = margin if margin is not None else RELEVANCE_RANKER.get("borderline_margin", 0.05)
+        if not self.trained or len(papers) <= top_k:
+            return list(papers), []
+
+        start = time.time()
+        scores = self.score(papers)
+        cutoff = np.sort(scores)[::-1][top_k - 1] - margin
+        keep = scores >= cutoff
+
+        selected, dropped = [], []
+        for paper, score, kept in zip(papers, scores, keep):
+            paper['relevance_score'] = round(float(score), 4)
+            if kept:
+                selected.append(paper)
+            else:
+                dropped.append((paper, float(score)))
+        logger.info(f"相关性排序: {len(papers)} 篇论文打分耗时 {(time.time() - start) * 1000:.1f} 毫秒，"
+                    f"选中 {len(selected)} 篇")
+        return selected, dropped
+
+    @classmethod
+    def from_history(cls, paper_index):
+        """从论文索引记录的历史结论中训练排序器
+
+        已生成综述的论文作为正样本；评估未通过和被用户跳过的论文作为负样本。
+        正样本少于min_history时排序器不启用。
+
+        参数:
+            paper_index (PaperIndex): 论文索引
+        """
+        ranker = cls()
+        if not RELEVANCE_RANKER.get("enabled", True):
+            return ranker
+
+        positives, negatives = paper_index.history()
+        if len(positives) < RELEVANCE_RANKER.get("min_history", 10):
+            logger.info(f"历史记录不足（{len(positives)} 篇通过评估的论文），不启用相关性排序")
+            ranker.stats = {'positives': len(positives), 'negatives': len(negatives)}
+            return ranker
+        return ranker.fit(positives, negatives)
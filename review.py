@@ -0,0 +1,240 @@
+"""论文人工审核工具
+
+流水线把准备好的论文放入审核队列后继续运行，审核人可随时通过本工具做出决定：
+
+    python review.py list                    列出等待审核的论文
+    python review.py show 3                  查看论文详情和内容预览
+    python review.py approve 3 5             通过审核
+    python review.py reject 4 --note 不相关   拒绝并记录原因
+    python review.py serve                   启动本地审核网页
+"""
+import os
+import html
+import argparse
+import mimetypes
+from datetime import datetime
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from config import REVIEW, SHOW_IMAGE_PREVIEW
+from utils.review_queue import ReviewQueue
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M') if timestamp else "-"
+
+
+def format_authors(paper):
+    authors = paper.get('authors') or []
+    return ', '.join(authors) if isinstance(authors, list) else str(authors)
+
+
+def evaluation_text(entry):
+    evaluation = entry['evaluation'] or {}
+    return evaluation.get('evaluation', '') if isinstance(evaluation, dict) else str(evaluation)
+
+
+def list_entries(queue, status):
+    entries = queue.list(None if status == "all" else status)
+    if not entries:
+        print("审核队列中没有论文")
+        return
+    for entry in entries:
+        print(f"[{entry['id']:>4}] {entry['status']:<10} {format_time(entry['submitted_at'])}  {entry['title']}")
+    counts = queue.count_by_status()
+    print("\n" + ", ".join(f"{status}: {number}" for status, number in sorted(counts.items())))
+
+
+def show_entry(queue, review_id):
+    entry = queue.get(review_id)
+    if entry is None:
+        print(f"审核队列中不存在编号 {review_id}")
+        return
+    paper = entry['paper']
+    print("=" * 50)
+    print(f"编号: {entry['id']}  状态: {entry['status']}")
+    print(f"论文标题: {paper['title']}")
+    print(f"作者: {format_authors(paper)}")
+    print(f"摘要: {paper.get('abstract', '')[:200]}...")
+    if evaluation_text(entry):
+        print(f"\n价值评估:\n{evaluation_text(entry)}")
+
+    pdf_content = entry['pdf_content'] or ""
+    content_preview = pdf_content[:500] + "..." if len(pdf_content) > 500 else pdf_content
+    print(f"\nPDF内容预览:\n{content_preview}")
+
+    thumbnails = [path for path in entry['thumbnails'] or [] if os.path.exists(path)]
+    if not thumbnails:
+        print("\n没有可用的缩略图")
+        return
+    for i, path in enumerate(thumbnails, 1):
+        print(f"  缩略图 {i}: {path}")
+
+    # 根据配置决定是否显示图像预览
+    if SHOW_IMAGE_PREVIEW:
+        import matplotlib.pyplot as plt
+        from PIL import Image
+
+        fig, axes = plt.subplots(1, len(thumbnails), figsize=(15, 5))
+        if len(thumbnails) == 1:
+            axes = [axes]
+        for i, (ax, path) in enumerate(zip(axes, thumbnails), 1):
+            ax.imshow(Image.open(path))
+            ax.axis('off')
+            ax.set_title(f"图片 {i}")
+        plt.tight_layout()
+        plt.show()
+
+
+def decide_entries(queue, review_ids, approved, note=None):
+    for review_id in review_ids:
+        if queue.decide(review_id, approved, note):
+            print(f"{'✓ 已通过' if approved else '✗ 已拒绝'}: {review_id}")
+        else:
+            print(f"编号 {review_id} 不存在或已审核")
+
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh"><head><meta charset="utf-8"><title>论文审核</title>
+<style>
+body {{ font-family: sans-serif; max-width: 1100px; margin: 2em auto; color: #222; }}
+.paper {{ border-bottom: 1px solid #ddd; padding: 1em 0; }}
+.thumbs img {{ height: 220px; margin-right: 8px; border: 1px solid #ccc; }}
+.meta {{ color: #666; font-size: 0.9em; }}
+pre {{ white-space: pre-wrap; background: #f7f7f7; padding: 0.5em; }}
+</style></head>
+<body><h1>等待审核的论文（{count} 篇）</h1>{papers}</body></html>
+"""
+
+_PAPER_TEMPLATE = """<div class="paper">
+<h3>[{id}] {title}</h3>
+<div class="meta">{authors} · 提交于 {submitted_at}</div>
+<p>{abstract}</p>
+<pre>{evaluation}</pre>
+<div class="thumbs">{thumbnails}</div>
+<form method="post" action="/decide">
+<input type="hidden" name="id" value="{id}">
+<input type="text" name="note" placeholder="备注（可选）">
+<button name="decision" value="approve">通过</button>
+<button name="decision" value="reject">拒绝</button>
+</form></div>
+"""
+
+
+def render_page(queue):
+    entries = queue.list("pending")
+    papers = []
+    for entry in entries:
+        paper = entry['paper']
+        thumbnails = "".join(
+            f'<img src="/thumb/{entry["id"]}/{index}" loading="lazy">'
+            for index, path in enumerate(entry['thumbnails'] or []) if os.path.exists(path)
+        )
+        papers.append(_PAPER_TEMPLATE.format(
+            id=entry['id'],
+            title=html.escape(paper['title']),
+            authors=html.escape(format_authors(paper)),
+            submitted_at=format_time(entry['submitted_at']),
+            abstract=html.escape(paper.get('abstract', '')[:800]),
+            evaluation=html.escape(evaluation_text(entry)),
+            thumbnails=thumbnails
+        ))
+    return _PAGE_TEMPLATE.format(count=len(entries), papers="".join(papers) or "<p>没有等待审核的论文</p>")
+
+
+def serve(queue, port):
+    """启动只监听本机的审核网页"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type, extra_headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/":
+                self._send(200, render_page(queue).encode(), "text/html; charset=utf-8")
+                return
+            parts = self.path.strip("/").split("/")
+            if len(parts) == 3 and parts[0] == "thumb" and parts[1].isdigit() and parts[2].isdigit():
+                entry = queue.get(int(parts[1]))
+                thumbnails = (entry['thumbnails'] or []) if entry else []
+                index = int(parts[2])
+                if index < len(thumbnails) and os.path.exists(thumbnails[index]):
+                    content_type = mimetypes.guess_type(thumbnails[index])[0] or "application/octet-stream"
+                    with open(thumbnails[index], "rb") as f:
+                        self._send(200, f.read(), content_type, {"Cache-Control": "max-age=3600"})
+                    return
+            self._send(404, b"not found", "text/plain")
+
+        def do_POST(self):
+            if self.path != "/decide":
+                self._send(404, b"not found", "text/plain")
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode())
+            review_id = form.get("id", [""])[0]
+            if review_id.isdigit():
+                note = form.get("note", [""])[0].strip() or None
+                queue.decide(int(review_id), form.get("decision", [""])[0] == "approve", note)
+            self._send(303, b"", "text/plain", {"Location": "/"})
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"审核网页已启动: http://127.0.0.1:{port}/ （按 Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="论文人工审核工具")
+    subparsers = parser.add_subparsers(dest="command")
+
+    list_parser = subparsers.add_parser("list", help="列出审核队列中的论文")
+    list_parser.add_argument("--status", default="pending",
+                             choices=["pending", "approved", "rejected", "processing", "consumed", "all"],
+                             help="按状态筛选 (默认: pending)")
+
+    show_parser = subparsers.add_parser("show", help="查看论文详情")
+    show_parser.add_argument("id", type=int)
+
+    approve_parser = subparsers.add_parser("approve", help="通过审核")
+    approve_parser.add_argument("ids", type=int, nargs="+")
+
+    reject_parser = subparsers.add_parser("reject", help="拒绝论文")
+    reject_parser.add_argument("ids", type=int, nargs="+")
+    reject_parser.add_argument("--note", help="拒绝原因")
+
+    serve_parser = subparsers.add_parser("serve", help="启动本地审核网页")
+    serve_parser.add_argument("--port", type=int, default=REVIEW.get("web_port", 8765),
+                              help=f"监听端口 (默认: {REVIEW.get('web_port', 8765)})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    queue = ReviewQueue(REVIEW["db_path"])
+    if args.command == "show":
+        show_entry(queue, args.id)
+    elif args.command == "approve":
+        decide_entries(queue, args.ids, True)
+    elif args.command == "reject":
+        decide_entries(queue, args.ids, False, args.note)
+    elif args.command == "serve":
+        serve(queue, args.port)
+    else:
+        list_entries(queue, getattr(args, "status", "pending"))
+
+
+if __name__ == "__main__":
+    main()
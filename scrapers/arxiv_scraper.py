@@ -1,215 +1,193 @@
 import arxiv
-import os
-from datetime import datetime, timedelta
-from config import SEARCH_DOMAINS, SEARCH_KEYWORDS, MAX_RESULTS, PAPER_SEARCH_DAYS, PDF_STORAGE_PATH, KEYWORD_FILTER
+import threading
+from datetime import datetime, timedelta, timezone
+from config import SEARCH_DOMAINS, SEARCH_KEYWORDS, MAX_RESULTS, PAPER_SEARCH_DAYS, KEYWORD_FILTER, ARXIV_CLIENT
 from utils.keyword_filter import filter_papers_by_keywords
 
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_arxiv_client():
+    """获取进程内共享的arXiv客户端
+
+    arxiv.Client会在连续请求之间等待delay_seconds，所有查询共用同一个客户端，
+    才能保证整体请求频率符合arXiv API的限制。
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = arxiv.Client(
+                page_size=ARXIV_CLIENT.get("page_size", 100),
+                delay_seconds=ARXIV_CLIENT.get("delay_seconds", 3),
+                num_retries=ARXIV_CLIENT.get("num_retries", 3)
+            )
+        return _shared_client
+
+
 class ArxivScraper:
     def __init__(self):
-        self.client = arxiv.Client()
+        self.client = get_arxiv_client()
         self.search_domains = SEARCH_DOMAINS
         self.search_keywords = SEARCH_KEYWORDS
         self.max_results = MAX_RESULTS
-    
-    def fetch_papers(self):
-        """获取符合条件的arXiv论文"""
-        papers = []
-        
-        for domain in SEARCH_DOMAINS:
-            for keyword_group in SEARCH_KEYWORDS:
-                try:
-                    # 构建查询
-                    if keyword_group["type"] == "AND":
-                        query = " AND ".join(keyword_group["keywords"])
-                    else:  # OR
-                        query = " OR ".join(keyword_group["keywords"])
-                    
-                    # 添加领域限制
-                    query = f"cat:{domain} AND ({query})"
-                    
-                    # 添加时间限制
-                    if PAPER_SEARCH_DAYS > 0:
-                        from datetime import datetime, timedelta
-                        date_limit = datetime.now() - timedelta(days=PAPER_SEARCH_DAYS)
-                        date_str = date_limit.strftime("%Y%m%d")
-                        query += f" AND submittedDate:[{date_str}000000 TO 99991231235959]"
-                    
-                    print(f"查询arXiv: {query}")
-                    
-                    # 执行查询
-                    search = arxiv.Search(
-                        query=query,
-                        max_results=MAX_RESULTS,
-                        sort_by=arxiv.SortCriterion.SubmittedDate,
-                        sort_order=arxiv.SortOrder.Descending
-                    )
-                    
-                    # 处理结果
-                    for result in search.results():
-                        # 检查是否已经添加过该论文
-                        if any(p["id"] == result.get_short_id() for p in papers):
-                            continue
-                        
-                        # 检查本地是否有缓存
-                        from config import PDF_STORAGE_PATH
-                        pdf_filename = f"{result.get_short_id()}.pdf"
-                        local_pdf_path = os.path.join(PDF_STORAGE_PATH, pdf_filename)
-                        
-                        if os.path.exists(local_pdf_path):
-                            print(f"发现arXiv论文的本地缓存: {local_pdf_path}")
-                            has_local_cache = True
-                        else:
-                            has_local_cache = False
-                        
-                        # 构建论文数据
-                        paper = {
-                            "id": result.get_short_id(),
-                            "title": result.title,
-                            "authors": [author.name for author in result.authors],
-                            "abstract": result.summary,
-                            "pdf_url": result.pdf_url,
-                            "published": result.published.strftime("%Y-%m-%d"),
-                            "source": "arxiv",
-                            "categories": [c.category for c in result.categories],
-                            "local_pdf_path": local_pdf_path if has_local_cache else None
-                        }
-                        
-                        papers.append(paper)
-                        print(f"找到arXiv论文: {paper['title']}")
-                    
-                except Exception as e:
-                    print(f"查询arXiv时出错: {str(e)}")
-            
-        return papers
-    
-    def __init__(self):
-        self.client = arxiv.Client()
-        self.search_domains = SEARCH_DOMAINS
-        self.search_keywords = SEARCH_KEYWORDS
-        self.max_results = MAX_RESULTS
-    
-    def fetch_papers(self):
-        """获取arXiv上的最新论文"""
-        # 构建查询字符串
+        self.max_query_length = ARXIV_CLIENT.get("max_query_length", 1000)
+        self.query_stats = {}
+        # 最近一次获取中完整覆盖到的提交时间，为None表示整个时间窗口都已获取
+        self.covered_until = None
+
+    def _build_keyword_clause(self, keyword_group):
+        """将单个关键词组转换为查询子句，无效的关键词组返回None"""
+        if isinstance(keyword_group, dict):
+            # 处理字典形式的关键词组合配置
+            combo_type = keyword_group.get('type', 'OR')
+            keywords = keyword_group.get('keywords', [])
+
+            # 跳过空关键词列表
+            if not keywords:
+                return None
+
+            if combo_type == 'AND':
+                # 所有关键词都必须出现
+                and_query = " AND ".join([f"\"{keyword}\"" for keyword in keywords])
+                return f"({and_query})"
+            elif combo_type == 'OR':
+                # 任意关键词出现即可
+                or_query = " OR ".join([f"\"{keyword}\"" for keyword in keywords])
+                return f"({or_query})"
+            elif combo_type == 'ADJACENT':
+                # 关键词必须相邻出现
+                if len(keywords) >= 2:  # 至少需要两个关键词才能使用ADJACENT
+                    adj_query = " NEAR ".join([f"\"{keyword}\"" for keyword in keywords])
+                    return f"({adj_query})"
+            elif combo_type == 'NOT':
+                # 包含第一个关键词但不包含其他关键词
+                if len(keywords) >= 2:  # 至少需要两个关键词才能使用NOT
+                    not_query = f"\"{keywords[0]}\""
+                    for keyword in keywords[1:]:
+                        not_query += f" AND NOT \"{keyword}\""
+                    return f"({not_query})"
+            return None
+        elif isinstance(keyword_group, list):
+            # 向后兼容：列表形式默认为AND组合
+            if keyword_group:  # 跳过空列表
+                and_query = " AND ".join([f"\"{keyword}\"" for keyword in keyword_group])
+                return f"({and_query})"
+            return None
+        else:
+            # 单个关键词
+            return f"\"{keyword_group}\""
+
+    def plan_queries(self, since=None, until=None):
+        """将所有领域和关键词组编译为尽可能少的arXiv查询
+
+        所有领域合并为一个OR子句，关键词子句以OR合并，只有当查询长度超过
+        max_query_length时才拆分为多个查询。
+
+        参数:
+            since (datetime, optional): 提交时间窗口起点，默认为PAPER_SEARCH_DAYS天前
+            until (datetime, optional): 提交时间窗口终点，默认不限
+
+        返回:
+            list: 查询字符串列表
+        """
         domain_query = " OR ".join([f"cat:{domain}" for domain in self.search_domains])
-        
-        # 构建复杂的关键词查询 - 支持多种组合形式
-        keyword_queries = []
+
+        # 去除重复的关键词子句，保持配置中的顺序
+        keyword_clauses = []
         for keyword_group in self.search_keywords:
-            if isinstance(keyword_group, dict):
-                # 处理字典形式的关键词组合配置
-                combo_type = keyword_group.get('type', 'OR')
-                keywords = keyword_group.get('keywords', [])
-                
-                # 跳过空关键词列表
-                if not keywords:
-                    continue
-                    
-                if combo_type == 'AND':
-                    # 所有关键词都必须出现
-                    and_query = " AND ".join([f"\"{keyword}\"" for keyword in keywords])
-                    keyword_queries.append(f"({and_query})")
-                elif combo_type == 'OR':
-                    # 任意关键词出现即可
-                    or_query = " OR ".join([f"\"{keyword}\"" for keyword in keywords])
-                    keyword_queries.append(f"({or_query})")
-                elif combo_type == 'ADJACENT':
-                    # 关键词必须相邻出现
-                    if len(keywords) >= 2:  # 至少需要两个关键词才能使用ADJACENT
-                        adj_query = " NEAR ".join([f"\"{keyword}\"" for keyword in keywords])
-                        keyword_queries.append(f"({adj_query})")
-                elif combo_type == 'NOT':
-                    # 包含第一个关键词但不包含其他关键词
-                    if len(keywords) >= 2:  # 至少需要两个关键词才能使用NOT
-                        not_query = f"\"{keywords[0]}\""
-                        for keyword in keywords[1:]:
-                            not_query += f" AND NOT \"{keyword}\""
-                        keyword_queries.append(f"({not_query})")
-            elif isinstance(keyword_group, list):
-                # 向后兼容：列表形式默认为AND组合
-                if keyword_group:  # 跳过空列表
-                    and_query = " AND ".join([f"\"{keyword}\"" for keyword in keyword_group])
-                    keyword_queries.append(f"({and_query})")
-            else:
-                # 单个关键词
-                keyword_queries.append(f"\"{keyword_group}\"")
-        
-        # 将所有关键词组合以OR连接
-        if keyword_queries:
-            keyword_query = " OR ".join(keyword_queries)
+            clause = self._build_keyword_clause(keyword_group)
+            if clause and clause not in keyword_clauses:
+                keyword_clauses.append(clause)
+
+        # 时间范围默认从配置文件获取；arXiv的submittedDate使用GMT时间
+        if since is None:
+            date_since = (datetime.now(timezone.utc) - timedelta(days=PAPER_SEARCH_DAYS)).strftime('%Y%m%d') + "000000"
         else:
+            date_since = since.astimezone(timezone.utc).strftime('%Y%m%d%H%M%S')
+        date_until = until.astimezone(timezone.utc).strftime('%Y%m%d%H%M%S') if until else "99991231235959"
+        date_query = f"submittedDate:[{date_since} TO {date_until}]"
+
+        def compose(clauses):
             # 如果没有有效的关键词查询，使用通配符
-            keyword_query = "\"*\""
-        
-        # 从配置文件获取时间范围
-        date_since = datetime.now() - timedelta(days=PAPER_SEARCH_DAYS)
-        date_query = f"submittedDate:[{date_since.strftime('%Y%m%d')}000000 TO 99991231235959]"
-        
-        # 完整查询
-        query = f"({domain_query}) AND ({keyword_query}) AND {date_query}"
-        
-        print(f"执行查询: {query}")  # 打印查询字符串，便于调试
-        
-        try:
-            # 执行查询
+            keyword_query = " OR ".join(clauses) if clauses else "\"*\""
+            return f"({domain_query}) AND ({keyword_query}) AND {date_query}"
+
+        # 贪心地将关键词子句装入查询，直到达到长度上限
+        queries = []
+        current = []
+        for clause in keyword_clauses:
+            if current and len(compose(current + [clause])) > self.max_query_length:
+                queries.append(compose(current))
+                current = []
+            current.append(clause)
+        queries.append(compose(current))
+        return queries
+
+    def _result_to_paper(self, result):
+        """将arXiv结果转换为论文数据"""
+        return {
+            'id': result.entry_id,
+            'title': result.title,
+            'authors': [author.name for author in result.authors],
+            'abstract': result.summary,
+            'pdf_url': result.pdf_url,
+            'published': result.published,
+            'source': 'arxiv',
+            'categories': result.categories
+        }
+
+    def fetch_papers(self, since=None, until=None):
+        """获取arXiv上的最新论文，since/until指定提交时间窗口（带时区的datetime）
+
+        每个查询按提交时间从早到晚最多获取MAX_RESULTS篇。某个查询达到上限时，
+        self.covered_until记录完整获取到的提交时间，之后的论文留给下一次运行。
+        查询失败时抛出异常，由调用方决定是否重试，而不是把失败当作没有新论文。
+        """
+        queries = self.plan_queries(since, until)
+
+        self.query_stats = {
+            'queries': len(queries),
+            'duplicates': 0
+        }
+        print(f"arXiv查询计划: {len(queries)} 个查询")
+
+        papers = []
+        seen_ids = set()
+        self.covered_until = None
+        for query in queries:
+            print(f"执行查询: {query}")  # 打印查询字符串，便于调试
+
             search = arxiv.Search(
                 query=query,
                 max_results=self.max_results,
-                sort_by=arxiv.SortCriterion.SubmittedDate
+                sort_by=arxiv.SortCriterion.SubmittedDate,
+                sort_order=arxiv.SortOrder.Ascending
             )
-            
-            # 处理结果
-            papers = []
-            try:
-                # 使用 arxiv.Client 来获取结果
-                client = arxiv.Client()
-                for result in client.results(search):
-                    paper = {
-                        'id': result.entry_id,
-                        'title': result.title,
-                        'authors': [author.name for author in result.authors],
-                        'abstract': result.summary,
-                        'pdf_url': result.pdf_url,
-                        'published': result.published,
-                        'source': 'arxiv',
-                        'categories': result.categories
-                    }
-                    papers.append(paper)
-            except Exception as e:
-                print(f"处理搜索结果时出错: {str(e)}")
-                # 尝试备用方法
-                try:
-                    print("尝试使用备用方法获取结果...")
-                    # 直接使用 arxiv.Search.get 方法
-                    results = list(arxiv.Search(
-                        query=query,
-                        max_results=self.max_results,
-                        sort_by=arxiv.SortCriterion.SubmittedDate
-                    ).get())
-                    
-                    for result in results:
-                        paper = {
-                            'id': result.entry_id,
-                            'title': result.title,
-                            'authors': [author.name for author in result.authors],
-                            'abstract': result.summary,
-                            'pdf_url': result.pdf_url,
-                            'published': result.published,
-                            'source': 'arxiv',
-                            'categories': result.categories
-                        }
-                        # 添加full_text字段用于关键词匹配
-                        paper['full_text'] = paper['title'] + " " + paper['abstract']
-                        papers.append(paper)
-                except Exception as e2:
-                    print(f"备用方法也失败: {str(e2)}")
-            
-            # 应用关键词过滤
-            original_count = len(papers)
-            papers = filter_papers_by_keywords(papers, KEYWORD_FILTER)
-            print(f"从arXiv获取到 {original_count} 篇论文，过滤后剩余 {len(papers)} 篇")
-            return papers
-            
-        except Exception as e:
-            print(f"执行arXiv搜索时出错: {str(e)}")
-            return []
\ No newline at end of file
+
+            # 共享客户端负责分页和请求间隔
+            fetched = 0
+            last_published = None
+            for result in self.client.results(search):
+                fetched += 1
+                last_published = result.published
+                if result.entry_id in seen_ids:
+                    self.query_stats['duplicates'] += 1
+                    continue
+                seen_ids.add(result.entry_id)
+                papers.append(self._result_to_paper(result))
+
+            # 达到上限的查询只完整覆盖到最后一篇论文的提交时间
+            if fetched >= self.max_results and last_published is not None:
+                if self.covered_until is None or last_published < self.covered_until:
+                    self.covered_until = last_published
+
+        if self.covered_until is not None:
+            print(f"arXiv查询达到 {self.max_results} 篇上限，本次只获取到 "
+                  f"{self.covered_until.strftime('%Y-%m-%d %H:%M')} (UTC) 之前提交的论文")
+
+        # 应用关键词过滤
+        original_count = len(papers)
+        papers = filter_papers_by_keywords(papers, KEYWORD_FILTER)
+        print(f"从arXiv获取到 {original_count} 篇论文，过滤后剩余 {len(papers)} 篇")
+        return papers
@@ -0,0 +1,126 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from config import FETCH_SOURCES, FETCH_SOURCE_TIMEOUT, MANUAL_PDF_LINKS
+from scrapers.arxiv_scraper import ArxivScraper
+from scrapers.biorxiv_scraper import BiorxivScraper
+from scrapers.medrxiv_scraper import MedrxivScraper
+from processors.manual_link_processor import ManualLinkProcessor
+from utils.dedup import NearDuplicateDetector
+from utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class FetchCoordinator:
+    """多来源并行获取协调器
+
+    同时向所有启用的来源发起请求，每个来源有独立的超时限制。
+    某个来源超时或出错时仅丢弃该来源的结果，其余来源的论文照常合并去重。
+    来源达到MAX_RESULTS上限时状态为truncated，covered_until记录完整获取到的时间。
+    """
+
+    def __init__(self, sources=None, timeout=None):
+        self.sources = sources if sources is not None else FETCH_SOURCES
+        self.timeout = timeout if timeout is not None else FETCH_SOURCE_TIMEOUT
+        self.source_stats = {}
+        # 最近一次合并时被判定为重复的 (论文, 规范论文) 列表
+        self.duplicates = []
+
+    def _build_fetchers(self):
+        """构建来源名称到获取函数的映射，顺序决定合并后的论文顺序"""
+        available = {
+            "arxiv": lambda window: self._fetch_window(ArxivScraper(), window),
+            "biorxiv": lambda window: self._fetch_window(BiorxivScraper(), window),
+            "medrxiv": lambda window: self._fetch_window(MedrxivScraper(), window),
+            # 手动链接没有时间窗口，每次运行都会处理
+            "manual": lambda window: (ManualLinkProcessor().process_links(MANUAL_PDF_LINKS), None),
+        }
+        fetchers = []
+        for name in self.sources:
+            if name not in available:
+                logger.warning(f"未知的论文来源: {name}，已忽略")
+                continue
+            fetchers.append((name, available[name]))
+        return fetchers
+
+    @staticmethod
+    def _fetch_window(scraper, window):
+        """获取时间窗口内的论文，返回 (论文列表, 完整获取到的时间或None)"""
+        papers = scraper.fetch_papers(*window)
+        return papers, scraper.covered_until
+
+    def _timed_fetch(self, name, fetch, window):
+        """执行获取并返回 (论文列表, 完整获取到的时间或None, 耗时秒数)"""
+        start = time.monotonic()
+        with span("fetch", source=name):
+            papers, covered_until = fetch(window)
+        return papers or [], covered_until, time.monotonic() - start
+
+    def fetch_all(self, windows=None):
+        """并行获取所有来源的论文
+
+        参数:
+            windows (dict, optional): 来源名称到 (起始时间, 结束时间) 的映射，
+                未指定的来源使用默认时间范围（PAPER_SEARCH_DAYS）
+
+        返回:
+            dict: 来源名称到论文列表的映射，超时或失败的来源对应空列表
+        """
+        fetchers = self._build_fetchers()
+        results = {}
+        self.source_stats = {}
+        if not fetchers:
+            return results
+
+        executor = ThreadPoolExecutor(max_workers=len(fetchers))
+        start = time.monotonic()
+        windows = windows or {}
+        futures = [(name, executor.submit(self._timed_fetch, name, fetch, windows.get(name, (None, None))))
+                   for name, fetch in fetchers]
+
+        for name, future in futures:
+            # 所有来源同时开始，超时以统一的起点计算
+            remaining = max(0, self.timeout - (time.monotonic() - start))
+            try:
+                papers, covered_until, elapsed = future.result(timeout=remaining)
+                results[name] = papers
+                self.source_stats[name] = {'status': 'ok', 'count': len(papers), 'elapsed': round(elapsed, 2)}
+                if covered_until is not None:
+                    # 报告需要写成JSON，时间以ISO格式保存
+                    self.source_stats[name].update(status='truncated', covered_until=covered_until.isoformat())
+                    logger.warning(f"来源 {name} 达到获取上限，只完整获取到 {covered_until.isoformat()}")
+                logger.info(f"来源 {name} 获取到 {len(papers)} 篇论文，耗时 {elapsed:.2f} 秒")
+            except FutureTimeoutError:
+                results[name] = []
+                self.source_stats[name] = {'status': 'timeout', 'count': 0, 'elapsed': self.timeout}
+                logger.warning(f"来源 {name} 超过 {self.timeout} 秒未返回，跳过该来源的结果")
+            except Exception as e:
+                results[name] = []
+                self.source_stats[name] = {'status': 'error', 'count': 0, 'error': str(e)}
+                logger.error(f"来源 {name} 获取论文时出错: {str(e)}")
+
+        # 不等待超时的来源结束，其结果将被丢弃
+        executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def merge_papers(self, results):
+        """按来源顺序合并论文列表，并合并跨来源、跨版本的重复论文
+
+        相同ID、DOI或标题的论文，以及标题和摘要高度相似的论文视为同一项工作，
+        只保留一条规范记录（优先保留排在前面的来源），重复记录保存在self.duplicates中。
+        """
+        papers = []
+        for name, _ in self._build_fetchers():
+            papers.extend(results.get(name, []))
+        merged, self.duplicates = NearDuplicateDetector().deduplicate(papers)
+        return merged
+
+    def fetch_papers(self):
+        """并行获取所有来源并返回合并去重后的论文列表"""
+        results = self.fetch_all()
+        papers = self.merge_papers(results)
+        total = sum(len(p) for p in results.values())
+        logger.info(f"共获取 {total} 篇论文，去重后剩余 {len(papers)} 篇")
+        return papers
@@ -1,14 +1,18 @@
 import os
 import requests
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from bs4 import BeautifulSoup
 import re
 import json
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from config import SEARCH_KEYWORDS, PAPER_SEARCH_DAYS, MAX_RESULTS, PDF_STORAGE_PATH, KEYWORD_FILTER
+from itertools import islice
+from config import SEARCH_KEYWORDS, PAPER_SEARCH_DAYS, MAX_RESULTS, PDF_STORAGE_PATH, KEYWORD_FILTER, API_MAX_IN_FLIGHT, MEDRXIV_BASE_URL, BIORXIV_API_URL
 from utils.keyword_filter import filter_papers_by_keywords
+from utils.http_session import get_shared_session
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -46,9 +50,9 @@ class MedrxivScraper:
     
     def __init__(self):
         self.name = "medrxiv"
-        self.base_url = "https://www.medrxiv.org"
+        self.base_url = MEDRXIV_BASE_URL
         self.search_url = f"{self.base_url}/search"
-        self.api_base_url = "https://api.biorxiv.org"
+        self.api_base_url = BIORXIV_API_URL
         self.api_papers_url = f"{self.api_base_url}/details/medrxiv/{{start_date}}/{{end_date}}/{{cursor}}"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -57,6 +61,11 @@ class MedrxivScraper:
             'Connection': 'keep-alive',
         }
         self.launch_date = "2019-06-01"  # medRxiv启动日期
+        # bioRxiv与medRxiv共用api.biorxiv.org，复用同一个连接池
+        self.session = get_shared_session("api.biorxiv.org", API_MAX_IN_FLIGHT * 2)
+        self.max_in_flight = max(1, API_MAX_IN_FLIGHT)
+        # 最近一次获取中完整覆盖到的时间，为None表示整个时间窗口都已获取
+        self.covered_until = None
     
     def _format_date(self, date_str):
         """格式化日期字符串"""
@@ -158,7 +167,7 @@ class MedrxivScraper:
         logger.info(f"调用medRxiv API: {url}")
         
         try:
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.Timeout:
@@ -171,13 +180,126 @@ class MedrxivScraper:
             logger.error(f"解析JSON响应失败: {str(e)}")
             return None
     
-    def _get_papers_from_api(self, start_date=None, end_date=None, limit=None):
+    def _check_api_response(self, json_response):
+        """检查API响应是否有效
+        
+        参数:
+            json_response (dict): API响应的JSON数据
+            
+        返回:
+            dict: 响应中的消息字典，响应无效时返回None
+        """
+        if not json_response or "messages" not in json_response or not json_response["messages"]:
+            logger.warning("API响应无效或没有消息")
+            return None
+        
+        message = json_response["messages"][0]
+        status = message.get("status")
+        if status != "ok":
+            logger.warning(f"API响应状态不是'ok': {status}")
+            return None
+        
+        return message
+    
+    def _iter_api_pages(self, start_date, end_date):
+        """按游标顺序逐页返回medRxiv API响应
+        
+        首页响应给出总数后即可算出其余所有游标，后续页面在大小为
+        max_in_flight 的窗口内并发请求，但仍按游标顺序交付。
+        调用方提前停止迭代时，尚未开始的请求会被取消。
+        请求失败或页面无效时抛出异常，避免把缺页当作没有论文。
+        
+        参数:
+            start_date (str): 开始日期，格式为YYYY-MM-DD
+            end_date (str): 结束日期，格式为YYYY-MM-DD
+            
+        返回:
+            generator: 逐页产生API响应的JSON数据
+        """
+        first_page = self._call_api(start_date, end_date, 0)
+        message = self._check_api_response(first_page)
+        if message is None:
+            # 日期范围内没有论文时API返回 "no posts found"，其他情况视为请求失败
+            status = ((first_page or {}).get("messages") or [{}])[0].get("status")
+            if status == "no posts found":
+                logger.info("日期范围内没有论文")
+                return
+            raise RuntimeError(f"medRxiv API请求失败: {status or '无有效响应'}")
+        
+        page_size = int(message.get("count", 0))
+        if page_size == 0:
+            logger.info("没有更多论文")
+            return
+        
+        yield first_page
+        
+        total = int(message.get("total", page_size))
+        cursors = iter(range(page_size, total, page_size))
+        logger.info(f"medRxiv API共 {total} 条记录，每页 {page_size} 条，并发窗口 {self.max_in_flight}")
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        pending = deque()
+        try:
+            for cursor in islice(cursors, self.max_in_flight):
+                pending.append((cursor, executor.submit(self._call_api, start_date, end_date, cursor)))
+            
+            while pending:
+                cursor, future = pending.popleft()
+                # 交付当前页之前先补充窗口，保持请求持续在途
+                next_cursor = next(cursors, None)
+                if next_cursor is not None:
+                    pending.append((next_cursor, executor.submit(self._call_api, start_date, end_date, next_cursor)))
+                
+                json_response = future.result()
+                if self._check_api_response(json_response) is None:
+                    raise RuntimeError(f"medRxiv API游标 {cursor} 处的页面无效")
+                
+                yield json_response
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def _iter_api_papers(self, start_date, end_date, filter_config=None):
+        """逐页获取medRxiv论文，每页到达时立即应用关键词过滤
+        
+        只产生符合条件的论文，内存中最多保留一页原始数据。
+        
+        参数:
+            start_date (str): 开始日期，格式为YYYY-MM-DD
+            end_date (str): 结束日期，格式为YYYY-MM-DD
+            filter_config (dict, optional): 关键词过滤配置，为None时不过滤
+            
+        返回:
+            generator: 逐篇产生论文数据
+        """
+        for json_response in self._iter_api_pages(start_date, end_date):
+            # 处理论文数据
+            page_papers = []
+            for paper_data in json_response.get("collection", []):
+                try:
+                    paper = self._process_api_paper(paper_data)
+                    if paper:
+                        page_papers.append(paper)
+                except Exception as e:
+                    logger.error(f"处理API论文数据时出错: {str(e)}")
+                    continue
+            
+            if filter_config is not None:
+                page_papers = filter_papers_by_keywords(page_papers, filter_config)
+            
+            for paper in page_papers:
+                logger.info(f"添加论文: {paper['title']} (发布日期: {paper['published']})")
+                yield paper
+    
+    def _get_papers_from_api(self, start_date=None, end_date=None, limit=None, filter_config=None):
         """从medRxiv API获取论文数据
         
         参数:
             start_date (str, optional): 开始日期，格式为YYYY-MM-DD
             end_date (str, optional): 结束日期，格式为YYYY-MM-DD
-            limit (int, optional): 结果数量限制
+            limit (int, optional): 结果数量限制，启用过滤时按符合条件的论文计数
+            filter_config (dict, optional): 关键词过滤配置，为None时不过滤
             
         返回:
             list: 论文数据列表
@@ -193,52 +315,25 @@ class MedrxivScraper:
         
         logger.info(f"从medRxiv API获取论文: 日期范围={start_date}至{end_date}, 限制={limit}")
         
-        papers = []
-        cursor = 0
-        
+        papers_iter = self._iter_api_papers(start_date, end_date, filter_config)
         try:
-            while len(papers) < limit:
-                json_response = self._call_api(start_date, end_date, cursor)
-                
-                if not json_response or "messages" not in json_response or not json_response["messages"]:
-                    logger.warning("API响应无效或没有消息")
-                    break
-                
-                status = json_response["messages"][0].get("status")
-                if status != "ok":
-                    logger.warning(f"API响应状态不是'ok': {status}")
-                    break
-                
-                count = json_response["messages"][0].get("count", 0)
-                if count == 0:
-                    logger.info("没有更多论文")
-                    break
-                
-                # 更新游标位置
-                cursor += count
-                
-                # 处理论文数据
-                for paper_data in json_response.get("collection", []):
-                    try:
-                        paper = self._process_api_paper(paper_data)
-                        if paper:
-                            papers.append(paper)
-                            logger.info(f"添加论文: {paper['title']} (发布日期: {paper['published']})")
-                            
-                            if len(papers) >= limit:
-                                break
-                    except Exception as e:
-                        logger.error(f"处理API论文数据时出错: {str(e)}")
-                        continue
+            # 找到足够的论文后立即停止分页
+            papers = list(islice(papers_iter, limit))
+            
+            # API按日期从早到晚返回，达到上限时只完整覆盖到最后一篇论文所在日期之前
+            self.covered_until = None
+            if papers and len(papers) >= limit:
+                last_day = max(paper['published'] for paper in papers)
+                self.covered_until = datetime.strptime(last_day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+                logger.warning(f"medRxiv API达到 {limit} 篇上限，本次只获取到 {last_day} 之前的论文")
+            
+            if filter_config is not None and filter_config.get("enabled", False):
+                papers.sort(key=lambda x: x.get("keyword_match_score", 0), reverse=True)
             
             logger.info(f"从medRxiv API获取到 {len(papers)} 篇论文")
             return papers
-            
-        except Exception as e:
-            logger.error(f"从medRxiv API获取论文时出错: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return []
+        finally:
+            papers_iter.close()
     
     def _process_api_paper(self, paper_data):
         """处理API返回的论文数据
@@ -295,6 +390,7 @@ class MedrxivScraper:
                 'source': 'medrxiv',
                 'categories': ["medRxiv Preprint"],
                 'doi': doi,
+                'version': paper_data.get("version", ""),
                 'article_url': article_url,
                 'local_pdf_path': local_pdf_path if has_local_cache else None,
                 'full_text': title + " " + paper_data.get("abstract", "")  # 用于关键词匹配
@@ -304,36 +400,31 @@ class MedrxivScraper:
             logger.error(f"处理API论文数据时出错: {str(e)}")
             return None
     
-    def fetch_papers(self):
+    def fetch_papers(self, since=None, until=None):
         """获取符合条件的medRxiv论文
         
+        参数:
+            since (datetime, optional): 时间窗口起点，默认为PAPER_SEARCH_DAYS天前
+            until (datetime, optional): 时间窗口终点，默认为当前时间
+        
         返回:
             list: 论文数据列表
+        
+        API请求失败时抛出异常，由调用方决定是否重试；达到MAX_RESULTS上限时
+        self.covered_until记录完整获取到的时间，之后的论文留给下一次运行。
         """
-        try:
-            # 使用API方式获取论文
-            start_date = self._get_date_range()
-            end_date = datetime.now().strftime("%Y-%m-%d")
-            
-            logger.info(f"从medRxiv获取论文: {start_date} 至 {end_date}")
-            papers = self._get_papers_from_api(start_date, end_date, MAX_RESULTS)
-            
-            if not papers or len(papers) == 0:
-                logger.warning("未从medRxiv API获取到论文，尝试使用搜索方式")
-                query = self._build_query_string(SEARCH_KEYWORDS)
-                papers = self.search(query, start_date, MAX_RESULTS)
-            
-            # 应用关键词过滤
-            original_count = len(papers)
-            papers = filter_papers_by_keywords(papers, KEYWORD_FILTER)
-            logger.info(f"从medRxiv获取到 {original_count} 篇论文，过滤后剩余 {len(papers)} 篇")
-            return papers
-            
-        except Exception as e:
-            logger.error(f"获取medRxiv论文时出错: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return []
+        # 使用API方式获取论文，API按日期查询，窗口两端所在的日期（UTC）都包含在内
+        start_date = since.astimezone(timezone.utc).strftime("%Y-%m-%d") if since else self._get_date_range()
+        end_date = (until or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime("%Y-%m-%d")
+        
+        logger.info(f"从medRxiv获取论文: {start_date} 至 {end_date}")
+        # 分页过程中即应用关键词过滤，MAX_RESULTS按符合条件的论文计数
+        # 窗口内没有论文（API返回 "no posts found" 或全部被过滤）时返回空列表，
+        # covered_until保持为None，表示整个窗口已完整获取
+        papers = self._get_papers_from_api(start_date, end_date, MAX_RESULTS, KEYWORD_FILTER)
+        
+        logger.info(f"从medRxiv获取到 {len(papers)} 篇符合条件的论文")
+        return papers
     
     @retry_multi(max_retries=3, delay=5)
     def search(self, query=None, from_date=None, limit=None):
@@ -0,0 +1,44 @@
+"""bioRxiv/medRxiv抓取器在空时间窗口下的行为"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scrapers.biorxiv_scraper import BiorxivScraper
+from scrapers.medrxiv_scraper import MedrxivScraper
+from scrapers.fetch_coordinator import FetchCoordinator
+
+NO_POSTS = {"messages": [{"status": "no posts found"}]}
+
+
+def _no_search(self, *args, **kwargs):
+    raise AssertionError("空窗口不应回退到网页搜索")
+
+
+def _window():
+    until = datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+    return until - timedelta(days=1), until
+
+
+@pytest.mark.parametrize("scraper_class", [BiorxivScraper, MedrxivScraper])
+def test_empty_window_is_fully_covered(monkeypatch, scraper_class):
+    """API返回 "no posts found" 时返回空列表，窗口视为已完整获取"""
+    calls = []
+    monkeypatch.setattr(scraper_class, "_call_api",
+                        lambda self, start_date, end_date, cursor=0: calls.append(cursor) or NO_POSTS)
+    monkeypatch.setattr(scraper_class, "search", _no_search, raising=False)
+
+    scraper = scraper_class()
+    assert scraper.fetch_papers(*_window()) == []
+    assert scraper.covered_until is None
+    assert calls == [0]
+
+
+@pytest.mark.parametrize("source, scraper_class", [("biorxiv", BiorxivScraper), ("medrxiv", MedrxivScraper)])
+def test_empty_window_reports_ok(monkeypatch, source, scraper_class):
+    """空窗口不应被FetchCoordinator记为出错，否则调度器不会推进高水位线"""
+    monkeypatch.setattr(scraper_class, "_call_api", lambda self, start_date, end_date, cursor=0: NO_POSTS)
+
+    coordinator = FetchCoordinator(sources=[source], timeout=30)
+    results = coordinator.fetch_all({source: _window()})
+    assert results == {source: []}
+    assert coordinator.source_stats[source]['status'] == 'ok'
@@ -0,0 +1,195 @@
+import re
+import zlib
+import logging
+
+import numpy as np
+
+from config import DEDUP
+
+logger = logging.getLogger(__name__)
+
+# 2^31-1，MinHash哈希族 (a*x + b) mod p 使用的素数，保证乘法不会溢出int64
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+_VERSION_PATTERN = re.compile(r'v?(\d+)$')
+
+
+def normalize_title(title):
+    """归一化标题：小写，去除标点，合并空白"""
+    return " ".join(_WORD_PATTERN.findall((title or "").lower()))
+
+
+def title_key(title):
+    """用于精确匹配的归一化标题，过短的标题容易误合并，返回None"""
+    title = normalize_title(title)
+    return title if len(title.split()) >= 4 else None
+
+
+def _version_number(paper):
+    """解析论文版本号，没有版本信息时返回0"""
+    match = _VERSION_PATTERN.search(str(paper.get("version") or ""))
+    if not match:
+        match = re.search(r'v(\d+)$', str(paper.get("id") or ""))
+    return int(match.group(1)) if match else 0
+
+
+class _UnionFind:
+    """按下标合并的并查集"""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # 以较小的下标为根，簇的代表保持为最早出现的论文
+            if root_b < root_a:
+                root_a, root_b = root_b, root_a
+            self.parent[root_b] = root_a
+
+
+class NearDuplicateDetector:
+    """跨来源的近重复论文检测
+
+    同一项工作可能同时出现在arXiv和bioRxiv/medRxiv、以多个版本出现，或以期刊文章
+    形式出现在手动链接中。检测分两步：
+    - 相同DOI、相同ID或相同归一化标题的论文直接合并
+    - 对标题和摘要的词组计算MinHash签名，通过LSH分桶找出候选对，
+      估计的Jaccard相似度达到阈值的候选对视为同一项工作
+    分桶使检测的开销与论文数量近似线性，无需两两比较。
+    """
+
+    def __init__(self, num_perm=None, bands=None, threshold=None, shingle_size=None):
+        self.num_perm = num_perm or DEDUP.get("num_perm", 64)
+        self.bands = bands or DEDUP.get("bands", 16)
+        self.threshold = threshold if threshold is not None else DEDUP.get("threshold", 0.7)
+        self.shingle_size = shingle_size or DEDUP.get("shingle_size", 3)
+        if self.num_perm % self.bands:
+            raise ValueError("num_perm必须是bands的整数倍")
+        self.rows = self.num_perm // self.bands
+
+        # 固定种子，使相同输入的签名在不同运行之间保持一致
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=self.num_perm, dtype=np.int64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=self.num_perm, dtype=np.int64)
+        self._word_hashes = {}
+
+    def _shingles(self, paper):
+        """标题和摘要中连续shingle_size个词组成的词组，返回去重后的哈希值数组"""
+        words = _WORD_PATTERN.findall(f"{paper.get('title', '')} {paper.get('abstract', '')}".lower())
+        if not words:
+            return np.empty(0, dtype=np.int64)
+
+        # 每个词只计算一次crc32，词组哈希由词哈希线性组合得到
+        word_hashes = self._word_hashes
+        for word in words:
+            if word not in word_hashes:
+                word_hashes[word] = zlib.crc32(word.encode())
+        values = np.fromiter((word_hashes[word] for word in words), dtype=np.int64, count=len(words))
+
+        size = min(self.shingle_size, len(values))
+        shingles = np.zeros(len(values) - size + 1, dtype=np.int64)
+        for offset in range(size):
+            shingles = (shingles * 1000003 + values[offset:len(values) - size + 1 + offset]) % _MERSENNE_PRIME
+        return np.unique(shingles)
+
+    def signature(self, paper):
+        """计算论文的MinHash签名，没有文本时返回None"""
+        shingles = self._shingles(paper)
+        if not len(shingles):
+            return None
+        hashes = (np.outer(shingles, self._a) + self._b) % _MERSENNE_PRIME
+        return hashes.min(axis=0)
+
+    def cluster(self, papers):
+        """将论文聚类为同一项工作的簇
+
+        返回:
+            list: 每个簇为论文下标列表，簇按首个论文的下标排序
+        """
+        union_find = _UnionFind(len(papers))
+
+        # 精确键：ID、DOI、归一化标题（过短的标题容易误合并，不参与）
+        exact = {}
+        for index, paper in enumerate(papers):
+            keys = []
+            if paper.get("id"):
+                keys.append(("id", paper["id"]))
+            if paper.get("doi"):
+                keys.append(("doi", paper["doi"].lower()))
+            title = title_key(paper.get("title"))
+            if title:
+                keys.append(("title", title))
+            for key in keys:
+                if key in exact:
+                    union_find.union(exact[key], index)
+                else:
+                    exact[key] = index
+
+        # MinHash + LSH
+        signatures = [self.signature(paper) for paper in papers]
+        buckets = {}
+        for index, signature in enumerate(signatures):
+            if signature is None:
+                continue
+            for band in range(self.bands):
+                key = (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                buckets.setdefault(key, []).append(index)
+
+        compared = set()
+        for members in buckets.values():
+            for position, first in enumerate(members):
+                for second in members[position + 1:]:
+                    if (first, second) in compared or union_find.find(first) == union_find.find(second):
+                        continue
+                    compared.add((first, second))
+                    similarity = float(np.mean(signatures[first] == signatures[second]))
+                    if similarity >= self.threshold:
+                        union_find.union(first, second)
+
+        clusters = {}
+        for index in range(len(papers)):
+            clusters.setdefault(union_find.find(index), []).append(index)
+        return [clusters[root] for root in sorted(clusters)]
+
+    def deduplicate(self, papers):
+        """每个簇只保留一条规范记录
+
+        规范记录为簇中最早出现的论文（调用方按来源优先级排列输入），
+        同一来源同一DOI的多个版本保留最新版本。其他成员记录在规范记录的
+        duplicates字段中，缺失的DOI从其他成员补全。
+
+        返回:
+            tuple: (规范论文列表, 被合并的(论文, 规范论文)列表)
+        """
+        canonical_papers = []
+        duplicates = []
+        for members in self.cluster(papers):
+            first = papers[members[0]]
+            same_work_versions = [
+                papers[i] for i in members
+                if papers[i].get("source") == first.get("source")
+                and (papers[i].get("doi") or "").lower() == (first.get("doi") or "").lower()
+            ]
+            canonical = max(same_work_versions, key=_version_number)
+
+            others = [papers[i] for i in members if papers[i] is not canonical]
+            if others:
+                canonical["duplicates"] = [
+                    {'id': paper.get("id"), 'source': paper.get("source"), 'doi': paper.get("doi")}
+                    for paper in others
+                ]
+                doi = next((paper["doi"] for paper in others if paper.get("doi")), None)
+                if doi and not canonical.get("doi"):
+                    canonical["doi"] = doi
+                duplicates.extend((paper, canonical) for paper in others)
+            canonical_papers.append(canonical)
+
+        logger.info(f"近重复检测: {len(papers)} 篇论文合并为 {len(canonical_papers)} 项工作")
+        return canonical_papers, duplicates
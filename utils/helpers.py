@@ -1,10 +1,30 @@
 import os
 import json
+import html
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from config import SUMMARY_STORAGE_PATH, SUMMARY_INDEX_PATH
+from utils.summary_index import SummaryIndex
+
+# 卡片模板版本，修改render_paper_card的输出时递增，缓存的卡片会重新渲染
+CARD_VERSION = "1"
+
+_DIGEST_STYLE = """
+            body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }
+            .day-section { margin-bottom: 40px; }
+            .day-header { background-color: #f5f5f5; padding: 10px; margin-bottom: 20px; }
+            .paper { margin-bottom: 30px; border-bottom: 1px solid #eee; padding-bottom: 20px; }
+            .title { font-size: 18px; font-weight: bold; color: #333; }
+            .meta { font-size: 14px; color: #666; margin: 5px 0; }
+            .summary { font-size: 15px; line-height: 1.5; }
+            .source { font-size: 12px; color: #999; }
+            .header { text-align: center; margin-bottom: 30px; }
+            .date { font-size: 14px; color: #666; }
+"""
 
 def format_date(date_str):
     """格式化日期字符串"""
@@ -17,65 +37,94 @@ def format_date(date_str):
     except:
         return date_str
 
-def create_html_digest(summaries, post_path):
-    """创建HTML格式的文献摘要"""
-    html = """
+def render_paper_card(data):
+    """将一篇综述（综述JSON文件的内容）渲染为HTML卡片"""
+    paper = data['paper']
+    authors = paper.get('authors') or []
+    if isinstance(authors, list):
+        authors = ', '.join(authors)
+    summary_html = html.escape(data.get('summary') or '').replace('\n', '<br>')
+    return f"""
+        <div class="paper">
+            <div class="title">{html.escape(paper['title'])}</div>
+            <div class="meta">
+                <span>作者: {html.escape(authors)}</span> | 
+                <span>发布日期: {html.escape(format_date(str(paper.get('published', ''))))}</span> | 
+                <span>来源: {html.escape((paper.get('source') or '').upper())}</span>
+            </div>
+            <div class="summary">{summary_html}</div>
+            <div class="source">
+                <a href="{html.escape(paper.get('pdf_url') or '', quote=True)}" target="_blank">原文链接</a>
+            </div>
+        </div>
+        """
+
+def get_summary_index(index_path=None):
+    """打开综述索引，默认使用配置中的SUMMARY_INDEX_PATH"""
+    return SummaryIndex(index_path or SUMMARY_INDEX_PATH)
+
+def _write_digest(output_file, title, sections):
+    """流式写出摘要HTML
+
+    参数:
+        output_file (str): 输出文件路径
+        title (str): 页面标题
+        sections (iterable): (分组标题或None, 卡片HTML) 序列，相同分组标题连续排列
+    """
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(f"""
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="UTF-8">
-        <title>今日预印本文献摘要</title>
-        <style>
-            body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }
-            .paper { margin-bottom: 30px; border-bottom: 1px solid #eee; padding-bottom: 20px; }
-            .title { font-size: 18px; font-weight: bold; color: #333; }
-            .meta { font-size: 14px; color: #666; margin: 5px 0; }
-            .summary { font-size: 15px; line-height: 1.5; }
-            .source { font-size: 12px; color: #999; }
-            .header { text-align: center; margin-bottom: 30px; }
-            .date { font-size: 14px; color: #666; }
-        </style>
+        <title>{title}</title>
+        <style>{_DIGEST_STYLE}        </style>
     </head>
     <body>
         <div class="header">
-            <h1>今日预印本文献摘要</h1>
-            <p class="date">生成日期: """ + datetime.now().strftime('%Y年%m月%d日') + """</p>
+            <h1>{title}</h1>
+            <p class="date">生成日期: {datetime.now().strftime('%Y年%m月%d日')}</p>
         </div>
-    """
-    
-    for summary_file in summaries:
-        with open(summary_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        paper = data['paper']
-        summary_text = data['summary']
-        
-        html += f"""
-        <div class="paper">
-            <div class="title">{paper['title']}</div>
-            <div class="meta">
-                <span>作者: {', '.join(paper['authors'])}</span> | 
-                <span>发布日期: {format_date(paper['published'])}</span> | 
-                <span>来源: {paper['source'].upper()}</span>
-            </div>
-            <div class="summary">{summary_text.replace('\n', '<br>')}</div>
-            <div class="source">
-                <a href="{paper['pdf_url']}" target="_blank">原文链接</a>
-            </div>
-        </div>
-        """
-    
-    html += """
+    """)
+        current = None
+        for heading, card in sections:
+            if heading != current:
+                if current is not None:
+                    f.write("</div>")
+                current = heading
+                if heading is not None:
+                    f.write(f"""
+            <div class="day-section">
+                <div class="day-header">
+                    <h2>{heading}</h2>
+                </div>
+            """)
+            f.write(card)
+        if current is not None:
+            f.write("</div>")
+        f.write("""
     </body>
     </html>
+    """)
+    return output_file
+
+def create_html_digest(summaries, post_path, index_path=None):
+    """创建HTML格式的文献摘要
+
+    每篇综述的卡片只在第一次出现（或综述文件修改）时渲染，之后直接使用索引中缓存的卡片。
+
+    参数:
+        summaries (list): 综述JSON文件路径列表
+        post_path (str): 输出目录
+        index_path (str, optional): 综述索引路径
     """
+    index = get_summary_index(index_path)
+    index.sync(summaries, render_paper_card, CARD_VERSION)
     
     # 保存HTML文件
     html_path = os.path.join(post_path, f"digest_{datetime.now().strftime('%Y%m%d')}.html")
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html)
-    
-    return html_path
+    return _write_digest(html_path, "今日预印本文献摘要",
+                         ((None, card) for card in index.cards_for(summaries)))
 
 def send_email_digest(email_to, html_path, smtp_server, smtp_port, smtp_user, smtp_pass):
     """通过邮件发送文献摘要"""
@@ -133,83 +182,53 @@ def find_latest_files(directory, file_pattern, max_count=10):
     
     return files[:max_count]
 
-def create_weekly_digest(summary_path, output_path):
-    """创建每周文献摘要"""
-    # 获取过去7天的摘要文件
+def create_period_digest(summary_path, output_path, days, title, file_prefix, index_path=None):
+    """创建最近若干天的文献摘要，按综述生成日期分组
+
+    综述目录中新增或修改过的综述先登记到索引，之后按日期顺序逐条读取缓存的卡片写出，
+    耗时与该时间段内的论文数成正比。
+
+    参数:
+        summary_path (str): 综述JSON文件所在目录
+        output_path (str): 输出目录
+        days (int): 包含的天数（含今天）
+        title (str): 页面标题
+        file_prefix (str): 输出文件名前缀
+        index_path (str, optional): 综述索引路径
+
+    返回:
+        str: 输出文件路径，时间段内没有综述时返回None
+    """
     today = datetime.now()
-    weekly_files = []
-    
-    for i in range(7):
-        date_str = (today - datetime.timedelta(days=i)).strftime('%Y%m%d')
-        daily_digest = os.path.join(summary_path, f"digest_{date_str}.html")
-        if os.path.exists(daily_digest):
-            weekly_files.append(daily_digest)
+    start_day = (today - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    end_day = today.strftime('%Y-%m-%d')
     
-    if not weekly_files:
-        print("没有找到过去一周的摘要文件")
+    index = get_summary_index(index_path)
+    index.sync_directory(summary_path, render_paper_card, CARD_VERSION)
+    cards = index.iter_cards(summary_path, start_day, end_day)
+    first = next(cards, None)
+    if first is None:
+        print(f"没有找到最近 {days} 天的综述")
         return None
     
-    # 合并HTML内容
-    combined_html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>每周预印本文献摘要</title>
-        <style>
-            body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }
-            .day-section { margin-bottom: 40px; }
-            .day-header { background-color: #f5f5f5; padding: 10px; margin-bottom: 20px; }
-            .paper { margin-bottom: 30px; border-bottom: 1px solid #eee; padding-bottom: 20px; }
-            .title { font-size: 18px; font-weight: bold; color: #333; }
-            .meta { font-size: 14px; color: #666; margin: 5px 0; }
-            .summary { font-size: 15px; line-height: 1.5; }
-            .source { font-size: 12px; color: #999; }
-            .header { text-align: center; margin-bottom: 30px; }
-            .date { font-size: 14px; color: #666; }
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>每周预印本文献摘要</h1>
-            <p class="date">生成日期: """ + today.strftime('%Y年%m月%d日') + """</p>
-        </div>
-    """
-    
-    for html_file in weekly_files:
-        with open(html_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 提取日期和内容部分
-        date_str = os.path.basename(html_file).replace('digest_', '').replace('.html', '')
-        date_obj = datetime.strptime(date_str, '%Y%m%d')
-        formatted_date = date_obj.strftime('%Y年%m月%d日')
-        
-        # 提取文章部分
-        import re
-        papers = re.findall(r'<div class="paper">.*?</div>\s*</div>', content, re.DOTALL)
-        
-        if papers:
-            combined_html += f"""
-            <div class="day-section">
-                <div class="day-header">
-                    <h2>{formatted_date}</h2>
-                </div>
-            """
-            
-            for paper in papers:
-                combined_html += paper
-            
-            combined_html += "</div>"
+    def sections():
+        yield first
+        yield from cards
     
-    combined_html += """
-    </body>
-    </html>
+    output_file = os.path.join(output_path, f"{file_prefix}_{today.strftime('%Y%m%d')}.html")
+    return _write_digest(
+        output_file, title,
+        ((datetime.strptime(day, '%Y-%m-%d').strftime('%Y年%m月%d日'), card) for day, card in sections())
+    )
+
+def create_weekly_digest(summary_path=SUMMARY_STORAGE_PATH, output_path=SUMMARY_STORAGE_PATH, index_path=None):
+    """创建每周文献摘要（最近7天）
+
+    summary_path是综述JSON文件（*_summary.json）所在目录，而不是每日摘要HTML（digest_*.html）
+    所在目录：周报直接由综述索引中缓存的卡片生成，不再需要每天先生成日报。
     """
-    
-    # 保存合并后的HTML
-    output_file = os.path.join(output_path, f"weekly_digest_{today.strftime('%Y%m%d')}.html")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(combined_html)
-    
-    return output_file
\ No newline at end of file
+    return create_period_digest(summary_path, output_path, 7, "每周预印本文献摘要", "weekly_digest", index_path)
+
+def create_monthly_digest(summary_path=SUMMARY_STORAGE_PATH, output_path=SUMMARY_STORAGE_PATH, index_path=None):
+    """创建每月文献摘要（最近30天）"""
+    return create_period_digest(summary_path, output_path, 30, "每月预印本文献摘要", "monthly_digest", index_path)
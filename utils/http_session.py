@@ -0,0 +1,42 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def create_session(pool_size=10, headers=None):
+    """创建带连接池的HTTP会话，供同一来源的并发请求复用TCP/TLS连接
+
+    参数:
+        pool_size (int): 每个主机保持的最大连接数
+        headers (dict, optional): 会话默认请求头
+
+    返回:
+        requests.Session: 配置好的会话对象
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+_shared_sessions = {}
+_shared_sessions_lock = threading.Lock()
+
+
+def get_shared_session(name, pool_size=10):
+    """获取按名称共享的HTTP会话，同一进程内访问同一服务的组件复用同一个连接池
+
+    参数:
+        name (str): 会话名称，通常为目标主机名
+        pool_size (int): 首次创建时的连接池大小
+
+    返回:
+        requests.Session: 共享的会话对象
+    """
+    with _shared_sessions_lock:
+        if name not in _shared_sessions:
+            _shared_sessions[name] = create_session(pool_size)
+        return _shared_sessions[name]
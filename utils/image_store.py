@@ -0,0 +1,195 @@
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+from PIL import Image, features
+
+from config import IMAGE_STORE
+from utils.metrics import count
+from utils.storage_manager import get_storage_manager
+
+logger = logging.getLogger(__name__)
+
+# 格式名称到 (Pillow格式, 文件扩展名) 的映射
+_FORMATS = {
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+    "jpg": ("JPEG", "jpg"),
+    "png": ("PNG", "png"),
+}
+
+
+class ImageStore:
+    """按内容寻址的页面图像存储
+
+    - 图像按配置的格式（WebP/JPEG/PNG）和质量编码，保存在 objects/<哈希前两位>/<哈希>.<扩展名>
+    - 哈希基于像素内容计算，期刊封面、许可声明等完全相同的页面只保存一份
+    - SQLite清单记录每篇论文每一页（及缩略图）对应的图像，查找图像无需扫描目录
+    """
+
+    def __init__(self, root, manifest_path=None, image_format="webp", quality=80, webp_method=2):
+        self.root = root
+        self.manifest_path = manifest_path or os.path.join(root, "manifest.sqlite3")
+        image_format = image_format.lower()
+        if image_format not in _FORMATS:
+            raise ValueError(f"不支持的图像格式: {image_format}")
+        if image_format == "webp" and not features.check("webp"):
+            logger.warning("当前Pillow不支持WebP，改用JPEG保存页面图像")
+            image_format = "jpeg"
+        self.pil_format, self.extension = _FORMATS[image_format]
+        self.quality = quality
+        self.webp_method = webp_method
+        self._lock = threading.Lock()
+        manifest_dir = os.path.dirname(self.manifest_path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        # 多个提取进程可能同时写入清单
+        self._conn = sqlite3.connect(self.manifest_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                hash TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                owner TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                variant TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (owner, page, variant)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_images_hash ON images(hash)")
+        self._conn.commit()
+
+    def get(self, owner, page, variant):
+        """返回已保存的图像路径，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT o.path FROM images i JOIN objects o ON o.hash = i.hash "
+                "WHERE i.owner = ? AND i.page = ? AND i.variant = ?", (owner, page, variant)
+            ).fetchone()
+        if row and os.path.exists(row[0]):
+            get_storage_manager().touch(row[0])
+            return row[0]
+        return None
+
+    def put(self, owner, page, variant, mode, size, samples):
+        """保存一页图像并登记到清单，返回图像路径
+
+        参数:
+            owner (str): 图像所属的论文ID
+            page (int): 页码（从0开始）
+            variant (str): 图像规格，例如 "144dpi" 或 "thumb_300x400"
+            mode (str): 像素模式，例如 "RGB"
+            size (tuple): (宽, 高)
+            samples (bytes): 原始像素数据
+        """
+        digest = hashlib.blake2b(samples, digest_size=16)
+        digest.update(f"{mode}|{size[0]}x{size[1]}|{self.pil_format}|{self.quality}".encode())
+        image_hash = digest.hexdigest()
+
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM objects WHERE hash = ?", (image_hash,)).fetchone()
+        if row and os.path.exists(row[0]):
+            image_path = row[0]
+            count("images_deduplicated")
+        else:
+            image_path = os.path.join(self.root, "objects", image_hash[:2], f"{image_hash}.{self.extension}")
+            os.makedirs(os.path.dirname(image_path), exist_ok=True)
+            image = Image.frombytes(mode, size, samples)
+            # 先写临时文件再替换，多个进程保存同一图像时不会读到写了一半的文件
+            temp_path = f"{image_path}.{os.getpid()}.tmp"
+            if self.pil_format == "PNG":
+                image.save(temp_path, format="PNG")
+            elif self.pil_format == "WEBP":
+                image.save(temp_path, format="WEBP", quality=self.quality, method=self.webp_method)
+            else:
+                image.save(temp_path, format=self.pil_format, quality=self.quality)
+            os.replace(temp_path, image_path)
+            count("image_bytes_written", os.path.getsize(image_path))
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO objects (hash, path, width, height, bytes, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (image_hash, image_path, size[0], size[1], os.path.getsize(image_path), time.time())
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (owner, page, variant, hash) VALUES (?, ?, ?, ?)",
+                (owner, page, variant, image_hash)
+            )
+            self._conn.commit()
+        get_storage_manager().record(image_path, "image", owner)
+        return image_path
+
+    def discard(self, paths):
+        """从清单中移除已被删除的图像文件及引用它们的条目"""
+        # 图像文件以内容哈希命名
+        rows = [(os.path.splitext(os.path.basename(path))[0],) for path in paths]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM images WHERE hash = ?", rows)
+            self._conn.executemany("DELETE FROM objects WHERE hash = ?", rows)
+            self._conn.commit()
+
+    def list(self, owner, variant=None):
+        """按页码列出论文已保存的图像
+
+        返回:
+            list: 字典列表，包含page、variant、path、width、height、bytes，
+                  以及owners（引用同一图像的论文数，期刊封面和许可声明页会被多篇论文引用）
+        """
+        query = (
+            "SELECT i.page, i.variant, o.path, o.width, o.height, o.bytes, "
+            "(SELECT COUNT(DISTINCT owner) FROM images s WHERE s.hash = i.hash) "
+            "FROM images i JOIN objects o ON o.hash = i.hash WHERE i.owner = ?"
+        )
+        params = [owner]
+        if variant is not None:
+            query += " AND i.variant = ?"
+            params.append(variant)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY i.page, i.variant", params).fetchall()
+        columns = ("page", "variant", "path", "width", "height", "bytes")
+        return [dict(zip(columns, row[:6]), owners=row[6]) for row in rows]
+
+    def stats(self):
+        """返回图像数、清单条目数和占用的字节数"""
+        with self._lock:
+            objects, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM objects").fetchone()
+            entries = self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        return {'objects': objects, 'entries': entries, 'bytes': total_bytes}
+
+
+_shared_store = None
+_shared_store_pid = None
+_shared_store_lock = threading.Lock()
+
+
+def get_image_store():
+    """获取进程内共享的页面图像存储
+
+    SQLite连接不能跨进程使用，子进程（包括fork出的进程）会创建自己的实例。
+    """
+    global _shared_store, _shared_store_pid
+    with _shared_store_lock:
+        if _shared_store is None or _shared_store_pid != os.getpid():
+            _shared_store = ImageStore(
+                IMAGE_STORE["root"],
+                IMAGE_STORE.get("manifest_path"),
+                IMAGE_STORE.get("format", "webp"),
+                IMAGE_STORE.get("quality", 80),
+                IMAGE_STORE.get("webp_method", 2)
+            )
+            _shared_store_pid = os.getpid()
+        return _shared_store
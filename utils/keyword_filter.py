@@ -1,84 +1,167 @@
 import logging
 import re
+from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+
+class KeywordMatcher:
+    """预编译的多关键词匹配器
+
+    所有关键词编译为一个交替正则，一次扫描即可找出文本中所有可能命中关键词的位置，
+    只在这些位置上逐个确认候选关键词。匹配语义与逐个执行
+    re.search(r'\\b' + re.escape(keyword.lower()) + r'\\b', text.lower()) 完全一致。
+    """
+
+    def __init__(self, filter_config):
+        self.mode = filter_config.get("mode", "both")
+        self.include_keywords = list(filter_config.get("include_keywords", []))
+        self.exclude_keywords = list(filter_config.get("exclude_keywords", []))
+        self.match_fields = filter_config.get("match_fields", "all")
+        self.min_score = filter_config.get("min_score", 0)
+
+        keywords = set()
+        if self.mode in ["include", "both"]:
+            keywords.update(keyword.lower() for keyword in self.include_keywords)
+        if self.mode in ["exclude", "both"]:
+            keywords.update(keyword.lower() for keyword in self.exclude_keywords)
+
+        self._patterns = {
+            keyword: re.compile(r'\b' + re.escape(keyword) + r'\b')
+            for keyword in keywords
+        }
+        # 空关键词无法按首字符索引，单独处理
+        self._empty_keywords = [keyword for keyword in keywords if not keyword]
+
+        # 按首字符分组，用于在候选位置上确认具体命中的关键词
+        self._by_first_char = defaultdict(list)
+        for keyword in keywords:
+            if keyword:
+                self._by_first_char[keyword[0]].append(keyword)
+
+        alternatives = sorted((keyword for keyword in keywords if keyword), key=len, reverse=True)
+        if alternatives:
+            # 零宽前瞻使同一文本中重叠的命中位置也能被找到
+            self._union = re.compile(r'(?=\b(?:' + '|'.join(map(re.escape, alternatives)) + r')\b)')
+        else:
+            self._union = None
+
+    def _text_of(self, paper):
+        """确定要匹配的文本"""
+        if self.match_fields == "title":
+            text = paper.get("title", "")
+        elif self.match_fields == "abstract":
+            text = paper.get("abstract", "")
+        else:  # "all"
+            text = paper.get("full_text", "") or (paper.get("title", "") + " " + paper.get("abstract", ""))
+        # 转换为小写进行不区分大小写的匹配
+        return text.lower()
+
+    def find_keywords(self, text):
+        """返回小写文本中命中的所有关键词（小写）集合"""
+        matched = {keyword for keyword in self._empty_keywords if self._patterns[keyword].search(text)}
+        if self._union is None:
+            return matched
+
+        for match in self._union.finditer(text):
+            position = match.start()
+            for keyword in self._by_first_char.get(text[position], ()):
+                if keyword not in matched and self._patterns[keyword].match(text, position):
+                    matched.add(keyword)
+        return matched
+
+    def score(self, paper):
+        """计算单篇论文的匹配结果
+
+        返回:
+            tuple: (匹配分数, 命中的包含关键词列表, 命中的排除关键词或None)
+        """
+        matched = self.find_keywords(self._text_of(paper))
+
+        score = 0
+        matched_keywords = []
+        if self.mode in ["include", "both"]:
+            for keyword in self.include_keywords:
+                if keyword.lower() in matched:
+                    score += 10  # 每匹配一个关键词增加10分
+                    matched_keywords.append(keyword)
+
+        excluded_by = None
+        if self.mode in ["exclude", "both"]:
+            for keyword in self.exclude_keywords:
+                if keyword.lower() in matched:
+                    excluded_by = keyword
+                    break
+
+        return score, matched_keywords, excluded_by
+
+    def score_papers(self, papers):
+        """批量计算论文的匹配结果，返回与输入顺序一致的结果列表"""
+        return [self.score(paper) for paper in papers]
+
+    def keep(self, score, excluded_by):
+        """根据模式决定是否保留论文"""
+        if self.mode == "include":
+            return score >= self.min_score
+        elif self.mode == "exclude":
+            return excluded_by is None
+        else:  # "both"
+            return score >= self.min_score and excluded_by is None
+
+
+_matcher_cache = {}
+
+
+def get_keyword_matcher(filter_config):
+    """获取与配置对应的匹配器，相同配置只编译一次"""
+    cache_key = (
+        filter_config.get("mode", "both"),
+        tuple(filter_config.get("include_keywords", [])),
+        tuple(filter_config.get("exclude_keywords", [])),
+        filter_config.get("match_fields", "all"),
+        filter_config.get("min_score", 0),
+    )
+    matcher = _matcher_cache.get(cache_key)
+    if matcher is None:
+        matcher = KeywordMatcher(filter_config)
+        _matcher_cache[cache_key] = matcher
+    return matcher
+
+
 def filter_papers_by_keywords(papers, filter_config):
     """
     根据关键词配置过滤论文列表
-    
+
     参数:
         papers (list): 论文数据列表
         filter_config (dict): 关键词过滤配置
-        
+
     返回:
         list: 过滤后的论文列表
     """
     # 如果过滤功能未启用，直接返回原始列表
     if not filter_config.get("enabled", False):
         return papers
-    
+
+    matcher = get_keyword_matcher(filter_config)
+    logger.info(f"使用关键词过滤论文: 模式={matcher.mode}, 包含关键词={matcher.include_keywords}, 排除关键词={matcher.exclude_keywords}")
+
     filtered_papers = []
-    mode = filter_config.get("mode", "both")
-    include_keywords = filter_config.get("include_keywords", [])
-    exclude_keywords = filter_config.get("exclude_keywords", [])
-    match_fields = filter_config.get("match_fields", "all")
-    min_score = filter_config.get("min_score", 0)
-    
-    logger.info(f"使用关键词过滤论文: 模式={mode}, 包含关键词={include_keywords}, 排除关键词={exclude_keywords}")
-    
-    for paper in papers:
-        # 确定要匹配的文本
-        if match_fields == "title":
-            text_to_match = paper.get("title", "")
-        elif match_fields == "abstract":
-            text_to_match = paper.get("abstract", "")
-        else:  # "all"
-            text_to_match = paper.get("full_text", "") or (paper.get("title", "") + " " + paper.get("abstract", ""))
-        
-        # 转换为小写进行不区分大小写的匹配
-        text_to_match = text_to_match.lower()
-        
-        # 计算匹配分数
-        score = 0
-        matched_keywords = []
-        excluded = False
-        
-        # 检查包含关键词
-        if mode in ["include", "both"]:
-            for keyword in include_keywords:
-                if re.search(r'\b' + re.escape(keyword.lower()) + r'\b', text_to_match):
-                    score += 10  # 每匹配一个关键词增加10分
-                    matched_keywords.append(keyword)
-        
-        # 检查排除关键词
-        if mode in ["exclude", "both"]:
-            for keyword in exclude_keywords:
-                if re.search(r'\b' + re.escape(keyword.lower()) + r'\b', text_to_match):
-                    excluded = True
-                    logger.info(f"论文被排除: {paper.get('title', '')} (包含排除关键词: {keyword})")
-                    break
-        
-        # 根据模式决定是否保留论文
-        keep_paper = False
-        if mode == "include":
-            keep_paper = score >= min_score
-        elif mode == "exclude":
-            keep_paper = not excluded
-        else:  # "both"
-            keep_paper = (score >= min_score) and (not excluded)
-        
-        if keep_paper:
+    for paper, (score, matched_keywords, excluded_by) in zip(papers, matcher.score_papers(papers)):
+        if excluded_by is not None:
+            logger.debug(f"论文被排除: {paper.get('title', '')} (包含排除关键词: {excluded_by})")
+
+        if matcher.keep(score, excluded_by):
             # 添加匹配分数和匹配的关键词到论文数据中
             paper["keyword_match_score"] = score
             paper["matched_keywords"] = matched_keywords
             filtered_papers.append(paper)
-            logger.info(f"保留论文: {paper.get('title', '')} (匹配分数: {score}, 匹配关键词: {matched_keywords})")
+            logger.debug(f"保留论文: {paper.get('title', '')} (匹配分数: {score}, 匹配关键词: {matched_keywords})")
         else:
-            logger.info(f"过滤掉论文: {paper.get('title', '')} (匹配分数: {score}, 最小要求: {min_score})")
-    
+            logger.debug(f"过滤掉论文: {paper.get('title', '')} (匹配分数: {score}, 最小要求: {matcher.min_score})")
+
     # 按匹配分数排序（可选）
     filtered_papers.sort(key=lambda x: x.get("keyword_match_score", 0), reverse=True)
-    
+
     logger.info(f"关键词过滤前: {len(papers)} 篇论文, 过滤后: {len(filtered_papers)} 篇论文")
-    return filtered_papers
\ No newline at end of file
+    return filtered_papers
@@ -0,0 +1,225 @@
+import os
+import json
+import math
+import time
+import threading
+from datetime import datetime
+from functools import wraps
+from contextlib import contextmanager
+
+
+def _series_name(name, labels):
+    """将指标名和标签组合为报告中的键，例如 fetch{source=arxiv}"""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{key}={value}" for key, value in sorted(labels.items())) + "}"
+
+
+def _prometheus_labels(labels):
+    """格式化Prometheus标签，labels为 (键, 值) 元组序列"""
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _percentile(sorted_values, fraction):
+    """最近秩法计算分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class MetricsRegistry:
+    """运行指标注册表
+
+    - span: 记录某个阶段每次执行的耗时和失败次数，可作为上下文管理器或装饰器使用
+    - counter: 累加计数，例如下载字节数、渲染页数、发送/接收的token数
+    运行结束时输出JSON报告，并可选输出Prometheus文本格式文件。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空所有指标，开始新的一次运行"""
+        with self._lock:
+            self.started_at = time.time()
+            self._spans = {}
+            self._counters = {}
+
+    @contextmanager
+    def span(self, name, **labels):
+        """记录代码块的耗时，代码块抛出异常时计为一次失败"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, failed, **labels)
+
+    def timed(self, name, **labels):
+        """装饰器形式的span"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds, failed=False, **labels):
+        """直接记录一次耗时"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            span = self._spans.setdefault(key, {'durations': [], 'errors': 0})
+            span['durations'].append(seconds)
+            if failed:
+                span['errors'] += 1
+
+    def count(self, name, value=1, **labels):
+        """累加计数器"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """导出原始数据，用于从子进程传回主进程合并"""
+        with self._lock:
+            return {
+                'spans': {key: {'durations': list(span['durations']), 'errors': span['errors']}
+                          for key, span in self._spans.items()},
+                'counters': dict(self._counters)
+            }
+
+    def merge(self, snapshot):
+        """合并snapshot导出的数据"""
+        if not snapshot:
+            return
+        with self._lock:
+            for key, data in snapshot['spans'].items():
+                span = self._spans.setdefault(key, {'durations': [], 'errors': 0})
+                span['durations'].extend(data['durations'])
+                span['errors'] += data['errors']
+            for key, value in snapshot['counters'].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def get_report(self, extra=None):
+        """生成运行报告
+
+        参数:
+            extra (dict, optional): 附加到报告中的其他信息，例如各来源状态
+
+        返回:
+            dict: 包含各span的次数、失败数、总耗时与分位数，以及各计数器的值
+        """
+        finished_at = time.time()
+        with self._lock:
+            spans = {}
+            for (name, labels), span in sorted(self._spans.items()):
+                values = sorted(span['durations'])
+                spans[_series_name(name, dict(labels))] = {
+                    'count': len(values),
+                    'errors': span['errors'],
+                    'total_seconds': round(sum(values), 3),
+                    'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+                    'p50_ms': round(_percentile(values, 0.50) * 1000, 2),
+                    'p90_ms': round(_percentile(values, 0.90) * 1000, 2),
+                    'p99_ms': round(_percentile(values, 0.99) * 1000, 2),
+                    'max_ms': round(values[-1] * 1000, 2) if values else 0.0
+                }
+            counters = {_series_name(name, dict(labels)): value
+                        for (name, labels), value in sorted(self._counters.items())}
+
+        report = {
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+            'finished_at': datetime.fromtimestamp(finished_at).isoformat(timespec='seconds'),
+            'duration_seconds': round(finished_at - self.started_at, 3),
+            'spans': spans,
+            'counters': counters
+        }
+        if extra:
+            report.update(extra)
+        return report
+
+    def to_prometheus(self, prefix="paper_pipeline"):
+        """以Prometheus文本格式导出span（summary）和计数器（counter）"""
+        lines = []
+        with self._lock:
+            spans = sorted(self._spans.items())
+            counters = sorted(self._counters.items())
+
+        if spans:
+            lines.append(f"# HELP {prefix}_span_seconds 各阶段耗时")
+            lines.append(f"# TYPE {prefix}_span_seconds summary")
+            for (name, labels), span in spans:
+                values = sorted(span['durations'])
+                series = (("span", name),) + labels
+                for quantile in (0.5, 0.9, 0.99):
+                    lines.append(f"{prefix}_span_seconds{_prometheus_labels(series + (('quantile', quantile),))} "
+                                 f"{_percentile(values, quantile):.6f}")
+                lines.append(f"{prefix}_span_seconds_sum{_prometheus_labels(series)} {sum(values):.6f}")
+                lines.append(f"{prefix}_span_seconds_count{_prometheus_labels(series)} {len(values)}")
+            lines.append(f"# HELP {prefix}_span_errors_total 各阶段失败次数")
+            lines.append(f"# TYPE {prefix}_span_errors_total counter")
+            for (name, labels), span in spans:
+                lines.append(f"{prefix}_span_errors_total{_prometheus_labels((('span', name),) + labels)} {span['errors']}")
+
+        for name in sorted({name for (name, _), _ in counters}):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in counters:
+                if counter_name == name:
+                    lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, report_dir, prometheus_path=None, extra=None):
+        """写出JSON运行报告（以及可选的Prometheus文件），返回JSON报告路径"""
+        report = self.get_report(extra)
+        os.makedirs(report_dir, exist_ok=True)
+        file_name = f"run_{datetime.fromtimestamp(self.started_at).strftime('%Y%m%d_%H%M%S')}.json"
+        report_path = os.path.join(report_dir, file_name)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        if prometheus_path:
+            prometheus_dir = os.path.dirname(prometheus_path)
+            if prometheus_dir:
+                os.makedirs(prometheus_dir, exist_ok=True)
+            # 先写临时文件再替换，避免采集器读到写了一半的文件
+            temp_path = prometheus_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+            os.replace(temp_path, prometheus_path)
+        return report_path
+
+
+_shared_registry = MetricsRegistry()
+
+
+def get_metrics():
+    """获取进程内共享的指标注册表"""
+    return _shared_registry
+
+
+def span(name, **labels):
+    """在共享注册表中记录代码块耗时"""
+    return _shared_registry.span(name, **labels)
+
+
+def timed(name, **labels):
+    """在共享注册表中记录函数耗时的装饰器"""
+    return _shared_registry.timed(name, **labels)
+
+
+def count(name, value=1, **labels):
+    """累加共享注册表中的计数器"""
+    _shared_registry.count(name, value, **labels)
@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from utils.dedup import title_key
+
+logger = logging.getLogger(__name__)
+
+# 处理阶段，按先后顺序排列（价值评估在下载之前进行）；skipped表示论文被跳过，不再处理
+# deferred表示论文被相关性排序器暂缓评估，详情中保存论文元数据，之后的运行取出重新排序
+STAGES = ["fetched", "deferred", "evaluated", "downloaded", "extracted", "summarized", "posted", "skipped"]
+STAGE_RANK = {stage: rank for rank, stage in enumerate(STAGES)}
+# 到达这些阶段的论文在后续运行中不再处理
+FINAL_STAGES = {"posted", "skipped"}
+
+_ARXIV_ID_PATTERN = re.compile(r'(\d{4}\.\d{4,5})(v\d+)?')
+
+
+def paper_key(paper):
+    """计算论文的规范键
+
+    arXiv论文使用arXiv编号，有DOI的论文使用小写DOI，其他论文使用原始ID。
+
+    返回:
+        tuple: (规范键, 版本号)，没有版本信息时版本号为空字符串
+    """
+    if paper.get("source") == "arxiv" or "arxiv.org" in (paper.get("pdf_url") or ""):
+        match = _ARXIV_ID_PATTERN.search(paper.get("id", "")) or _ARXIV_ID_PATTERN.search(paper.get("pdf_url", ""))
+        if match:
+            return f"arxiv:{match.group(1)}", match.group(2) or ""
+
+    doi = paper.get("doi")
+    if doi:
+        return f"doi:{doi.lower()}", str(paper.get("version") or "")
+
+    return f"id:{paper.get('id')}", ""
+
+
+class PaperIndex:
+    """基于SQLite的已处理论文索引
+
+    记录每篇论文（按arXiv编号/DOI及版本区分）到达的处理阶段，
+    使每次运行只处理新论文或尚未完成的论文。同时记录DOI和归一化标题，
+    用于识别之前的运行中以其他来源出现过的同一项工作。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS papers (
+                key TEXT NOT NULL,
+                version TEXT NOT NULL,
+                paper_id TEXT,
+                title TEXT,
+                source TEXT,
+                stage TEXT NOT NULL,
+                detail TEXT,
+                updated_at REAL NOT NULL,
+                abstract TEXT,
+                doi TEXT,
+                title_key TEXT,
+                PRIMARY KEY (key, version)
+            )
+        """)
+        # 旧版本的索引没有摘要、DOI和归一化标题列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(papers)")}
+        if "abstract" not in columns:
+            self._conn.execute("ALTER TABLE papers ADD COLUMN abstract TEXT")
+        if "title_key" not in columns:
+            self._conn.execute("ALTER TABLE papers ADD COLUMN doi TEXT")
+            self._conn.execute("ALTER TABLE papers ADD COLUMN title_key TEXT")
+            self._conn.execute("UPDATE papers SET doi = substr(key, 5) WHERE key LIKE 'doi:%'")
+            rows = self._conn.execute("SELECT rowid, title FROM papers WHERE title IS NOT NULL").fetchall()
+            self._conn.executemany("UPDATE papers SET title_key = ? WHERE rowid = ?",
+                                   [(title_key(title), rowid) for rowid, title in rows])
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_stage ON papers(stage)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_doi ON papers(doi)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_title_key ON papers(title_key)")
+        self._conn.commit()
+
+    def get_stage(self, paper):
+        """返回论文当前到达的阶段，未记录时返回None"""
+        key, version = paper_key(paper)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stage FROM papers WHERE key = ? AND version = ?", (key, version)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_record(self, paper):
+        """返回论文的索引记录（字典），未记录时返回None"""
+        key, version = paper_key(paper)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stage, detail, updated_at FROM papers WHERE key = ? AND version = ?", (key, version)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'stage': row[0],
+            'detail': json.loads(row[1]) if row[1] else None,
+            'updated_at': row[2]
+        }
+
+    def mark(self, paper, stage, detail=None):
+        """记录论文到达的阶段
+
+        阶段只会前进不会后退（skipped可覆盖任何阶段），重复运行时不会丢失进度。
+
+        参数:
+            paper (dict): 论文数据
+            stage (str): 阶段名称，见STAGES
+            detail (dict, optional): 附加信息，例如跳过原因或评估结论
+        """
+        self.mark_many([paper], stage, detail)
+
+    def mark_many(self, papers, stage, detail=None):
+        """批量记录多篇论文到达同一阶段"""
+        if stage not in STAGE_RANK:
+            raise ValueError(f"未知的处理阶段: {stage}")
+
+        detail_json = json.dumps(
+            detail, ensure_ascii=False, default=lambda obj: obj.isoformat() if hasattr(obj, "isoformat") else str(obj)
+        ) if detail is not None else None
+        now = time.time()
+        with self._lock:
+            for paper in papers:
+                key, version = paper_key(paper)
+                row = self._conn.execute(
+                    "SELECT stage, detail, abstract, doi FROM papers WHERE key = ? AND version = ?", (key, version)
+                ).fetchone()
+                if row and stage != "skipped" and STAGE_RANK[row[0]] >= STAGE_RANK[stage]:
+                    continue
+                doi = (paper.get("doi") or "").lower() or (row[3] if row else None)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO papers "
+                    "(key, version, paper_id, title, source, stage, detail, updated_at, abstract, doi, title_key) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, version, paper.get("id"), paper.get("title"), paper.get("source"), stage,
+                     detail_json if detail_json is not None else (row[1] if row else None), now,
+                     paper.get("abstract") or (row[2] if row else None), doi, title_key(paper.get("title")))
+                )
+            self._conn.commit()
+
+    def find_known_works(self, papers):
+        """找出之前的运行中已以其他键记录过的同一项工作
+
+        与已有记录DOI相同或归一化标题相同、但规范键不同的论文视为重复，
+        例如之前已处理过arXiv版本的bioRxiv预印本。规范键已在索引中的论文
+        （包括同一论文的新版本）不在此列。
+
+        返回:
+            list: (论文, 已有记录的规范键) 列表
+        """
+        known = []
+        with self._lock:
+            for paper in papers:
+                key, _ = paper_key(paper)
+                if self._conn.execute("SELECT 1 FROM papers WHERE key = ? LIMIT 1", (key,)).fetchone():
+                    continue
+                doi = (paper.get("doi") or "").lower() or None
+                title = title_key(paper.get("title"))
+                if not doi and not title:
+                    continue
+                row = self._conn.execute(
+                    "SELECT key FROM papers WHERE (doi = ? OR title_key = ?) AND key != ? LIMIT 1",
+                    (doi, title, key)
+                ).fetchone()
+                if row:
+                    known.append((paper, row[0]))
+        return known
+
+    def filter_pending(self, papers):
+        """过滤掉已完成（已发布或已跳过）的论文，返回仍需处理的论文列表"""
+        pending = []
+        with self._lock:
+            for paper in papers:
+                key, version = paper_key(paper)
+                row = self._conn.execute(
+                    "SELECT stage FROM papers WHERE key = ? AND version = ?", (key, version)
+                ).fetchone()
+                if row and row[0] in FINAL_STAGES:
+                    continue
+                pending.append(paper)
+        logger.info(f"论文索引: {len(papers)} 篇中有 {len(papers) - len(pending)} 篇已处理完成，剩余 {len(pending)} 篇")
+        return pending
+
+    def unfinished_keys(self):
+        """返回尚未到达最终阶段的论文规范键"""
+        placeholders = ','.join('?' * len(FINAL_STAGES))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT key FROM papers WHERE stage NOT IN ({placeholders})", sorted(FINAL_STAGES)
+            ).fetchall()
+        return {key for (key,) in rows}
+
+    def deferred_papers(self):
+        """返回被相关性排序器暂缓评估的论文元数据列表，用于在本次运行中重新排序"""
+        with self._lock:
+            rows = self._conn.execute("SELECT detail FROM papers WHERE stage = 'deferred'").fetchall()
+        papers = []
+        for (detail,) in rows:
+            paper = json.loads(detail).get('paper') if detail else None
+            if paper:
+                papers.append(paper)
+        return papers
+
+    def history(self):
+        """返回有明确结论的历史论文，供相关性排序器训练
+
+        已生成综述的论文为正样本，评估未通过或被用户跳过的论文为负样本。
+
+        返回:
+            tuple: (正样本列表, 负样本列表)，每项为包含title和abstract的字典
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, detail, title, abstract FROM papers "
+                "WHERE stage IN ('summarized', 'posted', 'skipped')"
+            ).fetchall()
+
+        positives, negatives = [], []
+        for stage, detail, title, abstract in rows:
+            paper = {'title': title or '', 'abstract': abstract or ''}
+            if stage != "skipped":
+                positives.append(paper)
+            elif detail and json.loads(detail).get('reason') in ('evaluation', 'user'):
+                negatives.append(paper)
+        return positives, negatives
+
+    def count_by_stage(self):
+        """统计各阶段的论文数量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT stage, COUNT(*) FROM papers GROUP BY stage").fetchall()
+        return dict(rows)
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from utils.paper_index import paper_key
+
+# 审核状态：pending等待审核，approved/rejected已有决定但流水线尚未处理，
+# processing审核通过、流水线正在生成综述，consumed已被流水线处理完成
+REVIEW_STATUSES = ("pending", "approved", "rejected", "processing", "consumed")
+
+
+def _to_json(value):
+    """序列化为JSON，datetime等对象转换为字符串"""
+    return json.dumps(value, ensure_ascii=False, default=lambda obj: obj.isoformat() if hasattr(obj, "isoformat") else str(obj))
+
+
+class ReviewQueue:
+    """基于SQLite的人工审核队列
+
+    流水线把已完成分诊、下载、文本提取和缩略图渲染的论文放入队列后继续运行，
+    审核人通过命令行（review.py）或本地网页在任意时间做出决定，
+    流水线在运行中轮询或在下一次运行时取走已决定的论文。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS reviews (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                version TEXT NOT NULL,
+                title TEXT,
+                paper TEXT NOT NULL,
+                pdf_path TEXT,
+                pdf_content TEXT,
+                pdf_sections TEXT,
+                evaluation TEXT,
+                thumbnails TEXT,
+                status TEXT NOT NULL,
+                note TEXT,
+                submitted_at REAL NOT NULL,
+                decided_at REAL,
+                UNIQUE (key, version)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_status ON reviews(status)")
+        self._conn.commit()
+
+    def submit(self, result, thumbnails=None):
+        """将准备好的论文加入审核队列
+
+        已在队列中且尚未被流水线处理的论文保持原状，不会覆盖已有的审核决定。
+
+        参数:
+            result (dict): StagedExecutor.prepare返回的单篇论文结果
+            thumbnails (list, optional): 预览缩略图路径
+
+        返回:
+            bool: 是否新加入了队列
+        """
+        paper = result['paper']
+        key, version = paper_key(paper)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM reviews WHERE key = ? AND version = ?", (key, version)
+            ).fetchone()
+            if row and row[0] != "consumed":
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reviews (key, version, title, paper, pdf_path, pdf_content, pdf_sections, "
+                "evaluation, thumbnails, status, note, submitted_at, decided_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', NULL, ?, NULL)",
+                (key, version, paper.get('title'), _to_json(paper), result.get('pdf_path'),
+                 result.get('pdf_content'), _to_json(result.get('pdf_sections') or {}),
+                 _to_json(result.get('evaluation')), _to_json(thumbnails or []), time.time())
+            )
+            self._conn.commit()
+            return True
+
+    def contains(self, paper):
+        """论文是否在队列中等待审核或等待流水线处理"""
+        key, version = paper_key(paper)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM reviews WHERE key = ? AND version = ?", (key, version)
+            ).fetchone()
+        return bool(row) and row[0] != "consumed"
+
+    def decide(self, review_id, approved, note=None):
+        """记录审核决定，只有等待审核的论文可以被决定
+
+        返回:
+            bool: 是否成功记录
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE reviews SET status = ?, note = ?, decided_at = ? WHERE id = ? AND status = 'pending'",
+                ("approved" if approved else "rejected", note, time.time(), review_id)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def take_decided(self):
+        """取走所有已决定但尚未处理的论文
+
+        被拒绝的论文直接标记为已处理；审核通过的论文标记为processing，
+        生成成功后由finish标记为已处理，失败时由requeue放回队列。
+
+        返回:
+            list: 审核条目字典列表（包含paper、pdf_path、pdf_content、pdf_sections、evaluation、status等）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM reviews WHERE status IN ('approved', 'rejected') ORDER BY id"
+            ).fetchall()
+            if rows:
+                self._conn.executemany(
+                    "UPDATE reviews SET status = ? WHERE id = ?",
+                    [("processing" if row[10] == "approved" else "consumed", row[0]) for row in rows]
+                )
+                self._conn.commit()
+        return [self._row_to_entry(row) for row in rows]
+
+    def _set_processing_status(self, paper, status):
+        key, version = paper_key(paper)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE reviews SET status = ? WHERE key = ? AND version = ? AND status = 'processing'",
+                (status, key, version)
+            )
+            self._conn.commit()
+
+    def finish(self, paper):
+        """论文的综述和文案生成完成，标记为已处理"""
+        self._set_processing_status(paper, "consumed")
+
+    def requeue(self, paper):
+        """论文生成失败，放回队列等待下一次运行重新处理"""
+        self._set_processing_status(paper, "approved")
+
+    def requeue_unfinished(self):
+        """把上一次运行中断时仍在处理的论文放回队列，返回放回的数量
+
+        只能在没有其他流水线运行时调用（由调度器的运行锁保证）。
+        """
+        with self._lock:
+            cursor = self._conn.execute("UPDATE reviews SET status = 'approved' WHERE status = 'processing'")
+            self._conn.commit()
+        return cursor.rowcount
+
+    def get(self, review_id):
+        """按编号获取审核条目，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM reviews WHERE id = ?", (review_id,)).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def list(self, status="pending"):
+        """按状态列出审核条目，status为None时列出全部"""
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute("SELECT * FROM reviews ORDER BY id").fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM reviews WHERE status = ? ORDER BY id", (status,)).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def count_by_status(self):
+        """统计各状态的条目数量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM reviews GROUP BY status").fetchall()
+        return dict(rows)
+
+    def _row_to_entry(self, row):
+        columns = ("id", "key", "version", "title", "paper", "pdf_path", "pdf_content", "pdf_sections",
+                   "evaluation", "thumbnails", "status", "note", "submitted_at", "decided_at")
+        entry = dict(zip(columns, row))
+        for name in ("paper", "pdf_sections", "evaluation", "thumbnails"):
+            entry[name] = json.loads(entry[name]) if entry[name] else None
+        return entry
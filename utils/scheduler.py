@@ -0,0 +1,260 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class WatermarkStore:
+    """基于SQLite的各来源高水位线存储
+
+    高水位线是某个来源最近一次成功获取的时间窗口终点，下一次运行从该时间点继续获取。
+    以Unix时间戳保存，读取时返回UTC时间。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                source TEXT PRIMARY KEY,
+                watermark REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, source):
+        """返回来源的高水位线（UTC datetime），从未成功获取过时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT watermark FROM watermarks WHERE source = ?", (source,)).fetchone()
+        return datetime.fromtimestamp(row[0], timezone.utc) if row else None
+
+    def advance(self, source, watermark):
+        """推进来源的高水位线，不会回退"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO watermarks (source, watermark, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET watermark = MAX(watermark, excluded.watermark), "
+                "updated_at = excluded.updated_at",
+                (source, watermark.timestamp(), time.time())
+            )
+            self._conn.commit()
+
+    def all(self):
+        """返回所有来源的高水位线"""
+        with self._lock:
+            rows = self._conn.execute("SELECT source, watermark FROM watermarks ORDER BY source").fetchall()
+        return {source: datetime.fromtimestamp(watermark, timezone.utc) for source, watermark in rows}
+
+
+class RunLock:
+    """基于文件锁的运行锁，防止多个进程（守护进程、手动运行）同时执行流水线
+
+    使用操作系统的文件锁，持有锁的进程退出（包括崩溃）时锁会自动释放。
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self._file = None
+
+    def acquire(self):
+        """尝试获取锁，已被其他进程持有时立即返回False"""
+        lock_dir = os.path.dirname(self.lock_path)
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+        lock_file = open(self.lock_path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+
+        # 记录持有者信息，便于排查
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()} {datetime.now().isoformat(timespec='seconds')}\n")
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def plan_windows(watermarks, now, initial_days, max_window_days, max_catch_up_days, overlap_hours=0):
+    """把各来源从高水位线到当前时间的区间拆分为若干批时间窗口
+
+    参数:
+        watermarks (dict): 来源名称到高水位线（datetime或None）的映射，已追上当前时间的来源不再规划
+        now (datetime): 当前时间，与高水位线使用相同的时区（UTC）
+        initial_days (int): 从未获取过的来源向前回溯的天数
+        max_window_days (float): 单个窗口的最大跨度（天），长时间停机后的补抓按此拆分
+        max_catch_up_days (float): 最多补抓的天数，更早的缺口将被放弃
+        overlap_hours (float): 窗口起点向前重叠的小时数，覆盖平台延迟入库的论文
+
+    返回:
+        list: 每一批为 {来源名称: (起始时间, 结束时间)}，按时间先后排列
+    """
+    window = timedelta(days=max_window_days)
+    overlap = timedelta(hours=overlap_hours)
+    earliest = now - timedelta(days=max_catch_up_days)
+    starts = {}
+    for source, watermark in watermarks.items():
+        if watermark and watermark >= now:
+            continue
+        start = watermark - overlap if watermark else now - timedelta(days=initial_days)
+        if start < earliest:
+            logger.warning(f"来源 {source} 的缺口超过 {max_catch_up_days} 天，"
+                           f"只补抓 {earliest.strftime('%Y-%m-%d %H:%M')} 之后的论文")
+            start = earliest
+        starts[source] = start
+
+    batches = []
+    while True:
+        batch = {}
+        for source, start in starts.items():
+            if start < now:
+                end = min(start + window, now)
+                batch[source] = (start, end)
+                starts[source] = end
+        if not batch:
+            return batches
+        batches.append(batch)
+
+
+class PipelineScheduler:
+    """按高水位线增量运行流水线的调度器
+
+    每次运行为各来源计算从上一次成功获取到当前时间的时间窗口，停机后的缺口
+    按最大窗口拆分为多次运行依次补抓。来源获取成功后才推进其高水位线，
+    达到获取上限的来源只推进到实际完整获取到的时间，并从该时间继续补抓。
+    所有时间使用UTC，与arXiv的submittedDate一致。运行锁保证同一时间只有一个流水线在执行。
+
+    参数:
+        run_pipeline (callable): run_pipeline(workers, windows) -> 各来源状态字典，
+            只获取windows中列出的来源；状态为ok表示整个窗口获取完成，
+            truncated表示只完整获取到covered_until（ISO格式时间）
+        sources (list): 需要维护高水位线的来源名称
+        unwindowed_sources (list, optional): 没有时间概念的来源（如手动链接），只在第一次运行中获取
+    """
+
+    def __init__(self, run_pipeline, sources, state_path, lock_path, initial_days,
+                 max_window_days, max_catch_up_days, overlap_hours=0, unwindowed_sources=()):
+        self.run_pipeline = run_pipeline
+        self.sources = list(sources)
+        self.unwindowed_sources = list(unwindowed_sources)
+        self.watermarks = WatermarkStore(state_path)
+        self.lock = RunLock(lock_path)
+        self.initial_days = initial_days
+        self.max_window_days = max_window_days
+        self.max_catch_up_days = max_catch_up_days
+        self.overlap_hours = overlap_hours
+
+    def plan(self, now=None):
+        """返回本次需要执行的时间窗口批次"""
+        now = now or datetime.now(timezone.utc)
+        watermarks = {source: self.watermarks.get(source) for source in self.sources}
+        return plan_windows(watermarks, now, self.initial_days, self.max_window_days,
+                            self.max_catch_up_days, self.overlap_hours)
+
+    def run_due(self, workers=None):
+        """执行所有到期的时间窗口
+
+        返回:
+            int: 执行的运行次数，未获得运行锁时返回0
+        """
+        if not self.lock.acquire():
+            logger.warning(f"另一个流水线正在运行（锁文件 {self.lock.lock_path}），跳过本次运行")
+            return 0
+
+        try:
+            # 以开始运行的时间为终点，补抓过程中新提交的论文留给下一次运行
+            now = datetime.now(timezone.utc)
+            planned = len(self.plan(now))
+            if planned > 1:
+                logger.info(f"检测到错过的运行区间，拆分为约 {planned} 次运行补抓")
+            failed = set()
+            truncated = set()
+            runs = 0
+            while True:
+                # 每次运行前按最新的高水位线重新规划
+                batches = self.plan(now)
+                windows = {source: window for source, window in (batches[0] if batches else {}).items()
+                           if source not in failed}
+                # 被截断的来源刚刚完整获取到高水位线，从该位置继续，无需向前重叠
+                for source in truncated & windows.keys():
+                    start = self.watermarks.get(source)
+                    windows[source] = (start, min(start + timedelta(days=self.max_window_days), now))
+                truncated.clear()
+                if runs == 0:
+                    windows.update({source: (None, None) for source in self.unwindowed_sources})
+                if not windows:
+                    return runs
+                for source, (start, end) in sorted(windows.items()):
+                    if end is None:
+                        continue
+                    logger.info(f"[第 {runs + 1} 次] {source}: {start.strftime('%Y-%m-%d %H:%M')} 至 "
+                                f"{end.strftime('%Y-%m-%d %H:%M')} (UTC)")
+                previous = {source: self.watermarks.get(source) for source in windows}
+                source_stats = self.run_pipeline(workers, windows) or {}
+                runs += 1
+
+                for source, (start, end) in windows.items():
+                    if end is None:
+                        continue
+                    # 获取失败或超时的来源保留高水位线，不再继续本次的后续窗口，下一次从原位置重试
+                    stats = source_stats.get(source, {})
+                    if stats.get('status') == 'ok':
+                        self.watermarks.advance(source, end)
+                    elif stats.get('status') == 'truncated':
+                        covered_until = datetime.fromisoformat(stats['covered_until'])
+                        logger.warning(f"来源 {source} 达到获取上限，高水位线只推进到 "
+                                       f"{covered_until.strftime('%Y-%m-%d %H:%M')} (UTC)")
+                        self.watermarks.advance(source, min(covered_until, end))
+                        truncated.add(source)
+                    else:
+                        failed.add(source)
+                        logger.warning(f"来源 {source} 本次获取未成功，保留高水位线")
+                        continue
+
+                    # 高水位线没有前进时（例如同一时间段内的论文超过获取上限）停止补抓，避免反复获取同一窗口
+                    if self.watermarks.get(source) <= (previous[source] or start):
+                        failed.add(source)
+                        logger.warning(f"来源 {source} 的高水位线没有前进，请调大MAX_RESULTS或缩短max_window_days")
+        finally:
+            self.lock.release()
@@ -0,0 +1,205 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from config import STORAGE
+from utils.metrics import count
+
+logger = logging.getLogger(__name__)
+
+
+class StorageManager:
+    """基于SQLite的本地文件清单，按配额以LRU方式淘汰PDF、页面图像和综述文件
+
+    - 文件在写入时登记大小，读取时更新最近访问时间，占用统计直接查询清单，无需遍历目录
+    - 每个文件可属于多篇论文（内容相同的页面图像被多篇论文共用），
+      属于任何一篇仍处于未完成阶段的论文的文件不会被淘汰
+    - 论文可以有别名（例如PDF文件名），页面图像按别名登记所属论文
+    """
+
+    def __init__(self, db_path, touch_interval=60):
+        self.db_path = db_path
+        self.touch_interval = touch_interval
+        self._touched = {}
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        # 下载线程和提取进程都会写入清单
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                path TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifact_owners (
+                path TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                PRIMARY KEY (path, owner)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS aliases (
+                alias TEXT PRIMARY KEY,
+                owner TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_lru ON artifacts(kind, last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_aliases_owner ON aliases(owner)")
+        self._conn.commit()
+
+    def record(self, path, kind, owner=None):
+        """登记新写入或首次发现的文件，并把它记为刚刚访问过
+
+        参数:
+            path (str): 文件路径
+            kind (str): 文件类别，对应配额中的键，例如 "pdf"、"image"、"summary"
+            owner (str, optional): 所属论文的规范键或别名
+        """
+        path = os.path.abspath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO artifacts (path, kind, bytes, created_at, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET kind = excluded.kind, bytes = excluded.bytes, "
+                "last_access = excluded.last_access",
+                (path, kind, size, now, now)
+            )
+            if owner:
+                self._conn.execute("INSERT OR IGNORE INTO artifact_owners (path, owner) VALUES (?, ?)", (path, owner))
+            self._conn.commit()
+            self._touched[path] = now
+
+    def touch(self, path):
+        """更新文件的最近访问时间，间隔不足touch_interval秒的重复访问不写入清单"""
+        path = os.path.abspath(path)
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(path, 0) < self.touch_interval:
+                return
+            self._touched[path] = now
+            self._conn.execute("UPDATE artifacts SET last_access = ? WHERE path = ?", (now, path))
+            self._conn.commit()
+
+    def alias(self, alias, owner):
+        """登记论文的别名，以别名登记的文件随论文一起被保护"""
+        if not alias or not owner or alias == owner:
+            return
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO aliases (alias, owner) VALUES (?, ?)", (alias, owner))
+            self._conn.commit()
+
+    def usage(self):
+        """返回各类文件的数量和占用字节数"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, COUNT(*), COALESCE(SUM(bytes), 0) FROM artifacts GROUP BY kind"
+            ).fetchall()
+        return {kind: {'files': files, 'bytes': total_bytes} for kind, files, total_bytes in rows}
+
+    def enforce(self, quotas, pinned_owners=(), low_watermark=0.9):
+        """按LRU淘汰超出配额的文件
+
+        参数:
+            quotas (dict): 文件类别到配额字节数的映射，None表示不限制
+            pinned_owners (iterable): 仍在处理中的论文规范键，属于这些论文的文件不会被淘汰
+            low_watermark (float): 超出配额时淘汰到配额的这一比例
+
+        返回:
+            dict: 文件类别到被淘汰文件路径列表的映射
+        """
+        evicted = {}
+        with self._lock:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS pinned (owner TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM temp.pinned")
+            self._conn.executemany("INSERT OR IGNORE INTO temp.pinned (owner) VALUES (?)",
+                                   ((owner,) for owner in pinned_owners))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO temp.pinned (owner) "
+                "SELECT alias FROM aliases WHERE owner IN (SELECT owner FROM temp.pinned)"
+            )
+
+            for kind, quota in quotas.items():
+                if quota is None:
+                    continue
+                used = self._conn.execute(
+                    "SELECT COALESCE(SUM(bytes), 0) FROM artifacts WHERE kind = ?", (kind,)
+                ).fetchone()[0]
+                if used <= quota:
+                    continue
+                target = quota * low_watermark
+                cursor = self._conn.execute(
+                    "SELECT a.path, a.bytes FROM artifacts a WHERE a.kind = ? AND NOT EXISTS ("
+                    "SELECT 1 FROM artifact_owners o JOIN temp.pinned p ON p.owner = o.owner "
+                    "WHERE o.path = a.path) ORDER BY a.last_access",
+                    (kind,)
+                )
+                paths = []
+                freed = 0
+                for path, size in cursor:
+                    if used - freed <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        logger.warning(f"淘汰文件失败 {path}: {str(e)}")
+                        continue
+                    paths.append(path)
+                    freed += size
+                cursor.close()
+
+                if paths:
+                    rows = [(path,) for path in paths]
+                    self._conn.executemany("DELETE FROM artifacts WHERE path = ?", rows)
+                    self._conn.executemany("DELETE FROM artifact_owners WHERE path = ?", rows)
+                    for path in paths:
+                        self._touched.pop(path, None)
+                    evicted[kind] = paths
+                    count("storage_files_evicted", len(paths), kind=kind)
+                    count("storage_bytes_evicted", freed, kind=kind)
+                    logger.info(f"存储配额: 淘汰 {len(paths)} 个 {kind} 文件，释放 {freed / 1024 / 1024:.1f} MB")
+                if used - freed > quota:
+                    logger.warning(f"{kind} 文件占用 {(used - freed) / 1024 / 1024:.1f} MB，"
+                                   f"其余文件属于处理中的论文，暂时无法降到配额以内")
+            self._conn.commit()
+        return evicted
+
+
+_shared_manager = None
+_shared_manager_pid = None
+_shared_manager_lock = threading.Lock()
+
+
+def get_storage_manager():
+    """获取进程内共享的存储清单
+
+    SQLite连接不能跨进程使用，子进程（包括fork出的进程）会创建自己的实例。
+    """
+    global _shared_manager, _shared_manager_pid
+    with _shared_manager_lock:
+        if _shared_manager is None or _shared_manager_pid != os.getpid():
+            _shared_manager = StorageManager(STORAGE["db_path"], STORAGE.get("touch_interval", 60))
+            _shared_manager_pid = os.getpid()
+        return _shared_manager
+
+
+def storage_quotas():
+    """把配置中以MB表示的配额换算为字节数"""
+    return {
+        kind: int(quota_mb * 1024 * 1024) if quota_mb is not None else None
+        for kind, quota_mb in STORAGE.get("quota_mb", {}).items()
+    }
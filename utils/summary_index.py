@@ -0,0 +1,132 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryIndex:
+    """基于SQLite的综述索引，缓存每篇综述预先渲染好的HTML卡片
+
+    以综述JSON文件路径为键，记录文件修改时间、生成日期和渲染好的卡片。
+    只有新增或修改过的综述文件才会重新解析和渲染，日报、周报和月报
+    直接按日期顺序读取缓存的卡片拼接，无需重新读取JSON或解析HTML。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                path TEXT PRIMARY KEY,
+                directory TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                card_version TEXT NOT NULL,
+                title TEXT,
+                source TEXT,
+                day TEXT NOT NULL,
+                generated_at TEXT NOT NULL,
+                card TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_day ON summaries(directory, day, generated_at)")
+        self._conn.commit()
+
+    def sync(self, paths, render_card, card_version="1"):
+        """把综述文件登记到索引中，只解析和渲染新增、修改过或卡片模板版本变化的文件
+
+        参数:
+            paths (iterable): 综述JSON文件路径
+            render_card (callable): 接收综述数据字典，返回卡片HTML
+            card_version (str): 卡片模板版本，模板变化时所有卡片重新渲染
+
+        返回:
+            int: 本次重新渲染的卡片数
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        with self._lock:
+            cached = {
+                path: (mtime, version)
+                for path, mtime, version in self._conn.execute("SELECT path, mtime, card_version FROM summaries")
+            }
+
+        rows = []
+        for path in paths:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if cached.get(path) == (mtime, card_version):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                card = render_card(data)
+            except Exception as e:
+                logger.error(f"渲染综述卡片失败 {path}: {str(e)}")
+                continue
+            paper = data.get('paper', {})
+            generated_at = data.get('generated_at') or ""
+            day = generated_at[:10] or datetime.fromtimestamp(mtime).strftime('%Y-%m-%d')
+            rows.append((path, os.path.dirname(path), mtime, card_version, paper.get('title'), paper.get('source'), day, generated_at, card))
+
+        if rows:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO summaries (path, directory, mtime, card_version, title, source, day, generated_at, card) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self._conn.commit()
+        return len(rows)
+
+    def sync_directory(self, directory, render_card, card_version="1"):
+        """登记目录中的所有综述文件，并移除文件已被删除的记录"""
+        paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith("_summary.json")]
+        rendered = self.sync(paths, render_card, card_version)
+        directory = os.path.abspath(directory)
+        existing = {os.path.abspath(path) for path in paths}
+        with self._lock:
+            stale = [
+                (path,) for (path,) in self._conn.execute("SELECT path FROM summaries WHERE directory = ?", (directory,))
+                if path not in existing
+            ]
+            if stale:
+                self._conn.executemany("DELETE FROM summaries WHERE path = ?", stale)
+                self._conn.commit()
+        return rendered
+
+    def iter_cards(self, directory, start_day, end_day):
+        """按日期（新到旧）逐条产生目录中日期范围内的 (日期, 卡片HTML)，日期格式为YYYY-MM-DD，两端都包含
+
+        分批从数据库读取，内存占用与论文总数无关。
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT day, card FROM summaries WHERE directory = ? AND day >= ? AND day <= ? "
+                "ORDER BY day DESC, generated_at",
+                (os.path.abspath(directory), start_day, end_day)
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(100)
+            if not rows:
+                return
+            yield from rows
+
+    def cards_for(self, paths):
+        """按给定顺序返回综述文件对应的卡片HTML，未登记的文件被忽略"""
+        paths = [os.path.abspath(path) for path in paths]
+        with self._lock:
+            cards = dict(self._conn.execute(
+                f"SELECT path, card FROM summaries WHERE path IN ({','.join('?' * len(paths))})", paths
+            ).fetchall()) if paths else {}
+        return [cards[path] for path in paths if path in cards]
+
@@ -0,0 +1,78 @@
+import re
+import math
+
+from config import TOKEN_ESTIMATOR
+
+# 中日韩字符、全角标点
+_CJK_PATTERN = re.compile(r'[　-〿㐀-䶿一-鿿豈-﫿＀-￯]')
+
+# 其他文本（英文、数字、符号）平均每个token对应的字符数
+CHARS_PER_TOKEN = TOKEN_ESTIMATOR.get("chars_per_token", 4.0)
+# 中文字符平均每个token对应的字符数
+CJK_CHARS_PER_TOKEN = TOKEN_ESTIMATOR.get("cjk_chars_per_token", 1.0)
+
+
+def estimate_tokens(text):
+    """估计文本的token数量
+
+    不依赖具体模型的分词器，按配置中针对所用模型校准的字符/token比例计算，
+    中文字符与其他字符分别计数。只用于提示词的预算控制。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    other = len(text) - cjk
+    return math.ceil(cjk / CJK_CHARS_PER_TOKEN + other / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """将文本截断到估计不超过max_tokens个token，尽量在空白处截断"""
+    if max_tokens <= 0 or not text:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # 二分查找满足预算的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+
+    truncated = text[:low]
+    cut = truncated.rfind(' ')
+    if cut > low * 0.8:
+        truncated = truncated[:cut]
+    return truncated
+
+
+def allocate_budget(token_counts, budget):
+    """在多段文本之间分配token预算
+
+    各段先平分预算，用不完的部分再分给较长的段落，
+    因此较短的段落完整保留，较长的段落被截断到相同的长度。
+
+    参数:
+        token_counts (list): 每段文本的token数
+        budget (int): 总预算
+
+    返回:
+        list: 每段文本分到的token数，与输入顺序一致
+    """
+    allocation = [0] * len(token_counts)
+    remaining = max(0, budget)
+    pending = sorted(range(len(token_counts)), key=lambda i: token_counts[i])
+    while pending:
+        share = remaining // len(pending)
+        index = pending[0]
+        if token_counts[index] > share:
+            # 剩余的段落都比平均份额长，各自截断到平均份额
+            for index in pending:
+                allocation[index] = share
+            break
+        allocation[index] = token_counts[index]
+        remaining -= token_counts[index]
+        pending.pop(0)
+    return allocation